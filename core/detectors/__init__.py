@@ -3,5 +3,40 @@ ONNX-optimized vehicle and ambulance detectors.
 """
 
 from .onnx_detector import ONNXYOLODetector, ONNXAmbulanceDetector
+from .preprocessing import LetterboxPreprocessor, InputBufferPool, get_shared_preprocessor
+from .nms import NMSEngine
+from .session_profiles import SessionProfile, SESSION_PRESETS, get_session_profile
+from .session_registry import SessionHandle, SessionRegistry, get_session_registry
+from .lane_mask import LaneMaskRaster
+from .zone_counter import parse_zones
+from .feature_cache import TrackFeatureCache
+from .region_features import RegionColorStats, COLOR_BINS
+from .feature_cascade import FeatureCascade
+from .ambulance_schedule import AmbulanceScheduler
+from .detections import Detections, FLAG_AMBULANCE, FLAG_FALLBACK, FLAG_RESCUED
 
-__all__ = ["ONNXYOLODetector", "ONNXAmbulanceDetector"]
+__all__ = [
+    "ONNXYOLODetector",
+    "ONNXAmbulanceDetector",
+    "LetterboxPreprocessor",
+    "InputBufferPool",
+    "get_shared_preprocessor",
+    "NMSEngine",
+    "SessionProfile",
+    "SESSION_PRESETS",
+    "get_session_profile",
+    "SessionHandle",
+    "SessionRegistry",
+    "get_session_registry",
+    "LaneMaskRaster",
+    "parse_zones",
+    "TrackFeatureCache",
+    "RegionColorStats",
+    "COLOR_BINS",
+    "FeatureCascade",
+    "AmbulanceScheduler",
+    "Detections",
+    "FLAG_AMBULANCE",
+    "FLAG_FALLBACK",
+    "FLAG_RESCUED",
+]
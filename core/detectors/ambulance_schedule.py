@@ -0,0 +1,137 @@
+"""
+Trigger-gated scheduling of the ambulance model
+
+The ambulance model rarely fires, so instead of running it on every
+detection frame it runs:
+- never while the lane (or, without a lane, the frame) holds no vehicles;
+- on every detection frame for escalation_frames after a trigger: a vehicle
+  with emergency-colour cues, a fallback (feature-based) candidate, or a
+  recent ambulance hit in the temporal history;
+- otherwise once every base_interval detection frames.
+Recent hits also override the empty-lane skip, since the vehicle model can
+miss an ambulance that the ambulance model would find.
+"""
+from typing import Any, Dict, Optional
+
+
+class AmbulanceScheduler:
+    """Decides per detection frame whether the ambulance model runs"""
+
+    def __init__(self, enabled: bool = False, base_interval: int = 5,
+                 escalation_frames: int = 30, skip_when_empty: bool = True):
+        """
+        Initialize scheduler
+
+        Args:
+            enabled: Without scheduling the model runs on every detection frame
+            base_interval: Detection frames between runs when nothing is triggered
+            escalation_frames: Frames the model keeps running every detection
+                frame after a trigger
+            skip_when_empty: Skip the model when there are no vehicles
+        """
+        self.enabled = bool(enabled)
+        self.base_interval = max(1, int(base_interval))
+        self.escalation_frames = max(0, int(escalation_frames))
+        self.skip_when_empty = bool(skip_when_empty)
+        self.escalated_until = None
+        self.frames_since_run = None
+        self.mode = 'every_frame' if not self.enabled else 'base'
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'frames': 0,
+            'runs': 0,
+            'skipped_empty': 0,
+            'skipped_base_rate': 0,
+            'escalated_runs': 0,
+            'triggers_color_cue': 0,
+            'triggers_recent_hit': 0,
+            'hits': 0,
+            'misses': 0
+        }
+
+    def is_escalated(self, frame_index: int) -> bool:
+        """True while a trigger keeps the model running every detection frame"""
+        return self.escalated_until is not None and frame_index <= self.escalated_until
+
+    def escalate(self, frame_index: int, reason: str):
+        """
+        Run the model every detection frame for escalation_frames
+
+        Args:
+            reason: 'color_cue' or 'recent_hit'
+        """
+        self.stats[f'triggers_{reason}'] += 1
+        self.escalated_until = frame_index + self.escalation_frames
+
+    def should_run(self, frame_index: int, num_vehicles: int,
+                   recent_hit: bool = False, color_cue: bool = False) -> bool:
+        """
+        Decide for one detection frame
+
+        Args:
+            frame_index: Current frame number
+            num_vehicles: Vehicle detections on the frame (inside the lane in
+                lane mode)
+            recent_hit: The temporal history has recent ambulance hits
+            color_cue: A vehicle candidate shows emergency-colour cues
+
+        Returns:
+            True if the ambulance model should run on this frame
+        """
+        self.stats['frames'] += 1
+        if not self.enabled:
+            self.mode = 'every_frame'
+            return self._run()
+
+        if recent_hit:
+            self.escalate(frame_index, 'recent_hit')
+        elif color_cue:
+            self.escalate(frame_index, 'color_cue')
+
+        if self.is_escalated(frame_index):
+            self.mode = 'escalated'
+            self.stats['escalated_runs'] += 1
+            return self._run()
+
+        if self.skip_when_empty and num_vehicles == 0:
+            self.mode = 'empty'
+            self.stats['skipped_empty'] += 1
+            return False
+
+        self.mode = 'base'
+        if self.frames_since_run is None or self.frames_since_run + 1 >= self.base_interval:
+            return self._run()
+
+        self.frames_since_run += 1
+        self.stats['skipped_base_rate'] += 1
+        return False
+
+    def _run(self) -> bool:
+        self.frames_since_run = 0
+        self.stats['runs'] += 1
+        return True
+
+    def record_result(self, num_detections: int):
+        """Record whether a model run produced any ambulance candidates"""
+        if num_detections > 0:
+            self.stats['hits'] += 1
+        else:
+            self.stats['misses'] += 1
+
+    def get_stats(self, frame_index: Optional[int] = None) -> Dict[str, Any]:
+        """Schedule state, run rate and hit/miss counters"""
+        stats = dict(self.stats)
+        frames = stats['frames']
+        runs = stats['runs']
+        stats.update({
+            'enabled': self.enabled,
+            'mode': self.mode,
+            'base_interval': self.base_interval,
+            'escalation_frames': self.escalation_frames,
+            'escalated': self.is_escalated(frame_index) if frame_index is not None else False,
+            'run_rate': runs / frames if frames else 0.0,
+            'hit_rate': stats['hits'] / runs if runs else 0.0
+        })
+        return stats
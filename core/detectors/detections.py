@@ -0,0 +1,250 @@
+"""
+Struct-of-arrays container for detection results
+"""
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+
+# Per-detection flag bits
+FLAG_AMBULANCE = 1 << 0   # Ambulance (model or fallback)
+FLAG_FALLBACK = 1 << 1    # Ambulance inferred from a vehicle detection's visual features
+FLAG_RESCUED = 1 << 2     # Very low confidence ambulance kept by feature validation
+
+
+class Detections:
+    """
+    Detection results backed by NumPy arrays
+
+    Core fields are boxes [N, 4] (x1, y1, x2, y2), scores [N], class_ids [N]
+    and flags [N]. Pipeline stages can attach additional per-detection
+    columns as extras (e.g. 'original_confidence'); rows without a value hold
+    NaN for numeric extras and None for object extras.
+
+    Dictionaries are only produced by to_dicts(), for API consumers.
+    """
+
+    def __init__(self, boxes: Optional[np.ndarray] = None, scores: Optional[np.ndarray] = None,
+                 class_ids: Optional[np.ndarray] = None, flags: Optional[np.ndarray] = None,
+                 extras: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Initialize detections
+
+        Args:
+            boxes: [N, 4] boxes in format [x1, y1, x2, y2]
+            scores: [N] confidences
+            class_ids: [N] class ids (defaults to 0)
+            flags: [N] FLAG_* bit sets (defaults to 0)
+            extras: Optional per-detection columns
+        """
+        self.boxes = (np.empty((0, 4), dtype=np.float32) if boxes is None
+                      else np.asarray(boxes, dtype=np.float32).reshape(-1, 4))
+        n = len(self.boxes)
+        self.scores = (np.zeros(n, dtype=np.float32) if scores is None
+                       else np.asarray(scores, dtype=np.float32).reshape(n))
+        self.class_ids = (np.zeros(n, dtype=np.int32) if class_ids is None
+                          else np.asarray(class_ids, dtype=np.int32).reshape(n))
+        self.flags = (np.zeros(n, dtype=np.uint8) if flags is None
+                      else np.asarray(flags, dtype=np.uint8).reshape(n))
+        self.extras = {}
+        for name, values in (extras or {}).items():
+            self.set_extra(name, values)
+
+    @classmethod
+    def empty(cls) -> 'Detections':
+        """Detections with no rows"""
+        return cls()
+
+    @classmethod
+    def from_dicts(cls, detections: List[Dict]) -> 'Detections':
+        """Build from the dictionary format returned by to_dicts()"""
+        if not detections:
+            return cls()
+        flags = [FLAG_AMBULANCE if det.get('class_name') == 'ambulance' else 0
+                 for det in detections]
+        return cls(
+            boxes=[det['bbox'] for det in detections],
+            scores=[det['confidence'] for det in detections],
+            class_ids=[det.get('class_id', 0) for det in detections],
+            flags=flags
+        )
+
+    @staticmethod
+    def concat(parts: Sequence['Detections']) -> 'Detections':
+        """
+        Concatenate several Detections
+
+        Extras missing from some parts are filled with NaN (numeric) or None.
+        """
+        parts = [p for p in parts if p is not None]
+        if not parts:
+            return Detections()
+        if len(parts) == 1:
+            return parts[0]
+
+        result = Detections(
+            boxes=np.concatenate([p.boxes for p in parts]),
+            scores=np.concatenate([p.scores for p in parts]),
+            class_ids=np.concatenate([p.class_ids for p in parts]),
+            flags=np.concatenate([p.flags for p in parts])
+        )
+
+        names = []
+        for p in parts:
+            names.extend(name for name in p.extras if name not in names)
+        for name in names:
+            columns = []
+            for p in parts:
+                if name in p.extras:
+                    columns.append(p.extras[name])
+                else:
+                    columns.append(_missing_column(
+                        _reference_dtype(parts, name), len(p)))
+            result.extras[name] = np.concatenate(columns)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __repr__(self) -> str:
+        return f"Detections(n={len(self)}, extras={list(self.extras)})"
+
+    def filter(self, keep: Union[np.ndarray, Sequence[int], slice]) -> 'Detections':
+        """
+        Select rows by boolean mask, index array or slice
+
+        Returns:
+            New Detections (the arrays are copies unless keep is a slice)
+        """
+        if not isinstance(keep, slice):
+            keep = np.asarray(keep)
+            if keep.dtype != bool:
+                keep = keep.astype(int)
+        result = Detections.__new__(Detections)
+        result.boxes = self.boxes[keep]
+        result.scores = self.scores[keep]
+        result.class_ids = self.class_ids[keep]
+        result.flags = self.flags[keep]
+        result.extras = {name: values[keep]
+                         for name, values in self.extras.items()}
+        return result
+
+    def offset(self, dx: float, dy: float) -> 'Detections':
+        """
+        Shift boxes by (dx, dy), e.g. from crop to full-frame coordinates
+
+        Returns:
+            New Detections sharing every array except boxes
+        """
+        result = self.filter(slice(None))
+        if dx or dy:
+            result.boxes = self.boxes + np.array([dx, dy, dx, dy], dtype=np.float32)
+        return result
+
+    def has_flag(self, flag: int) -> np.ndarray:
+        """Boolean mask of rows with the given flag bit set"""
+        return (self.flags & flag) != 0
+
+    def set_flag(self, flag: int, mask: Optional[np.ndarray] = None):
+        """Set a flag bit on all rows, or on the rows selected by mask"""
+        if mask is None:
+            self.flags |= np.uint8(flag)
+        else:
+            self.flags[mask] |= np.uint8(flag)
+
+    def class_mask(self, class_ids) -> np.ndarray:
+        """Boolean mask of rows whose class id is in class_ids"""
+        return np.isin(self.class_ids, np.fromiter(class_ids, dtype=np.int32))
+
+    def set_extra(self, name: str, values):
+        """Attach a per-detection column (a scalar is broadcast to all rows)"""
+        if np.isscalar(values) or values is None:
+            dtype = object if values is None or isinstance(values, str) else None
+            column = np.full(len(self), values, dtype=dtype)
+        elif isinstance(values, np.ndarray):
+            column = values
+        else:
+            values = list(values)
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                column = column.astype(np.float64)
+        if len(column) != len(self):
+            raise ValueError(
+                f"Extra '{name}' has {len(column)} values for {len(self)} detections")
+        self.extras[name] = column
+
+    def extra(self, name: str, default=np.nan) -> np.ndarray:
+        """Per-detection column, or an array filled with default if not attached"""
+        if name in self.extras:
+            return self.extras[name]
+        return np.full(len(self), default, dtype=None if np.isscalar(default) else object)
+
+    def centers(self) -> np.ndarray:
+        """[N, 2] box centers (float64)"""
+        boxes = self.boxes.astype(np.float64)
+        return (boxes[:, :2] + boxes[:, 2:]) / 2
+
+    def widths(self) -> np.ndarray:
+        """[N] box widths (float64)"""
+        return self.boxes[:, 2].astype(np.float64) - self.boxes[:, 0]
+
+    def heights(self) -> np.ndarray:
+        """[N] box heights (float64)"""
+        return self.boxes[:, 3].astype(np.float64) - self.boxes[:, 1]
+
+    def areas(self) -> np.ndarray:
+        """[N] box areas (float64)"""
+        return self.widths() * self.heights()
+
+    def class_names(self) -> List[str]:
+        """Display class per row: 'ambulance' for ambulance rows, else 'vehicle'"""
+        return ['ambulance' if flag & FLAG_AMBULANCE else 'vehicle'
+                for flag in self.flags.tolist()]
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Convert to the list-of-dicts format for API consumers
+
+        Returns:
+            List of dictionaries with keys 'bbox', 'confidence', 'class_id',
+            'class_name', plus any extras that are set for the row
+        """
+        boxes = self.boxes.tolist()
+        scores = self.scores.tolist()
+        class_ids = self.class_ids.tolist()
+        flags = self.flags.tolist()
+        extras = {name: values.tolist() for name, values in self.extras.items()}
+
+        detections = []
+        for i in range(len(self)):
+            det = {
+                'bbox': boxes[i],
+                'confidence': scores[i],
+                'class_id': class_ids[i],
+                'class_name': 'ambulance' if flags[i] & FLAG_AMBULANCE else str(class_ids[i])
+            }
+            if flags[i] & FLAG_FALLBACK:
+                det['fallback'] = True
+            for name, values in extras.items():
+                value = values[i]
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                det[name] = value
+            detections.append(det)
+        return detections
+
+
+def _reference_dtype(parts: Sequence[Detections], name: str):
+    """dtype of an extra in the first part that has it"""
+    for p in parts:
+        if name in p.extras:
+            return p.extras[name].dtype
+    return np.dtype(object)
+
+
+def _missing_column(dtype, length: int) -> np.ndarray:
+    """Placeholder values for rows that lack an extra"""
+    if np.issubdtype(dtype, np.floating):
+        return np.full(length, np.nan, dtype=dtype)
+    column = np.empty(length, dtype=object)
+    column[:] = None
+    return column
@@ -0,0 +1,176 @@
+"""
+Per-track cache of ambulance visual features
+
+Feature state is keyed by tracker object ID, so brightness history for
+flashing-light detection accumulates across frames, and the expensive
+spatial features are only recomputed every few frames or when the box moves.
+Entries are evicted when the tracker deregisters the track, when they have
+not been used for ttl_frames, or least-recently-used beyond max_tracks.
+"""
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Sequence
+
+# Features cached between recomputations (flashing lights is sampled every frame)
+CACHED_FEATURES = ('plus_cross_mark', 'ambulance_text', 'emergency_colors', 'light_patterns')
+
+
+def box_iou(box: Sequence[float], boxes: np.ndarray) -> np.ndarray:
+    """
+    IoU of one box with each of [N, 4] boxes
+
+    Args:
+        box: [x1, y1, x2, y2]
+        boxes: [N, 4] boxes
+
+    Returns:
+        [N] IoU values
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1, y1, x2, y2 = (float(v) for v in box)
+    inter_w = np.clip(np.minimum(x2, boxes[:, 2]) - np.maximum(x1, boxes[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(y2, boxes[:, 3]) - np.maximum(y1, boxes[:, 1]), 0, None)
+    intersection = inter_w * inter_h
+    union = ((x2 - x1) * (y2 - y1)
+             + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) - intersection)
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+class TrackFeatureCache:
+    """LRU/TTL cache of visual feature state per track"""
+
+    def __init__(self, max_tracks: int = 256, ttl_frames: int = 150,
+                 recompute_interval: int = 5, min_iou: float = 0.7,
+                 brightness_history: int = 8):
+        """
+        Initialize feature cache
+
+        Args:
+            max_tracks: Maximum number of cached tracks (least recently used evicted)
+            ttl_frames: Entries unused for this many frames are evicted
+            recompute_interval: Frames between recomputations of CACHED_FEATURES
+            min_iou: Recompute earlier when the box's IoU with the box the
+                features were computed on drops below this
+            brightness_history: Brightness samples kept for flashing detection
+        """
+        self.max_tracks = max(1, int(max_tracks))
+        self.ttl_frames = int(ttl_frames)
+        self.recompute_interval = max(1, int(recompute_interval))
+        self.min_iou = float(min_iou)
+        self.brightness_history = int(brightness_history)
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evicted_deregistered': 0,
+            'evicted_ttl': 0,
+            'evicted_lru': 0
+        }
+
+    def get(self, track_id: int, frame_index: int) -> Dict[str, Any]:
+        """
+        Entry of a track, created on first use
+
+        Returns:
+            Dictionary with 'brightness_history', 'brightness_frame',
+            'features', 'bbox', 'computed_frame' and 'last_seen'
+        """
+        entry = self.entries.get(track_id)
+        if entry is None:
+            entry = {
+                'brightness_history': deque(maxlen=self.brightness_history),
+                'brightness_frame': None,
+                'features': None,
+                'bbox': None,
+                'computed_frame': None,
+                'last_seen': frame_index
+            }
+            self.entries[track_id] = entry
+            while len(self.entries) > self.max_tracks:
+                self.entries.popitem(last=False)
+                self.stats['evicted_lru'] += 1
+        else:
+            self.entries.move_to_end(track_id)
+        entry['last_seen'] = frame_index
+        return entry
+
+    def add_brightness(self, entry: Dict[str, Any], brightness: float, frame_index: int):
+        """Record one brightness sample per frame (a repeat on the same frame replaces it)"""
+        history = entry['brightness_history']
+        if entry['brightness_frame'] == frame_index and history:
+            history[-1] = brightness
+        else:
+            history.append(brightness)
+            entry['brightness_frame'] = frame_index
+
+    def cached_features(self, entry: Dict[str, Any], bbox: Sequence[float],
+                        frame_index: int) -> Optional[Dict[str, float]]:
+        """
+        CACHED_FEATURES of an entry if they are still fresh for this box
+
+        Returns:
+            The cached values (only the features computed so far, which may
+            be a subset), or None when they have to be recomputed
+        """
+        if entry['features'] is None:
+            self.stats['misses'] += 1
+            return None
+        if frame_index - entry['computed_frame'] >= self.recompute_interval:
+            self.stats['misses'] += 1
+            return None
+        if box_iou(entry['bbox'], np.asarray([bbox]))[0] < self.min_iou:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry['features']
+
+    def store_features(self, entry: Dict[str, Any], bbox: Sequence[float],
+                       frame_index: int, features: Dict[str, float],
+                       names: Sequence[str] = CACHED_FEATURES, merge: bool = False):
+        """
+        Remember freshly computed features
+
+        Args:
+            names: Features that were computed (others in CACHED_FEATURES
+                are left out of the cache)
+            merge: Add to the entry's still-fresh cached features instead of
+                starting a new recompute window
+        """
+        values = {name: features[name] for name in names if name in CACHED_FEATURES}
+        if merge and entry['features'] is not None:
+            entry['features'].update(values)
+            return
+        if not values:
+            return
+        entry['features'] = values
+        entry['bbox'] = [float(v) for v in bbox]
+        entry['computed_frame'] = frame_index
+
+    def evict(self, track_id: int):
+        """Drop a track's state (called when the tracker deregisters it)"""
+        if self.entries.pop(track_id, None) is not None:
+            self.stats['evicted_deregistered'] += 1
+
+    def expire(self, frame_index: int):
+        """Drop entries unused for ttl_frames"""
+        # Entries are in least-recently-used order
+        while self.entries:
+            track_id, entry = next(iter(self.entries.items()))
+            if frame_index - entry['last_seen'] < self.ttl_frames:
+                break
+            del self.entries[track_id]
+            self.stats['evicted_ttl'] += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size, hit rate and eviction counters"""
+        stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['tracks'] = len(self.entries)
+        return stats
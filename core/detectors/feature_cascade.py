@@ -0,0 +1,160 @@
+"""
+Cost-ordered cascade over the ambulance feature detectors
+
+The ambulance feature boost is a weighted sum of five detector scores, each
+with a known maximum. When a caller only needs to know whether the boost
+exceeds a threshold (the vehicle-as-ambulance fallback), the cascade runs
+the cheap detectors first and stops as soon as the score so far plus the
+most the remaining detectors could add can no longer exceed it.
+"""
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+# Weight of each detector score in the total boost
+FEATURE_WEIGHTS = {
+    'flashing_lights': 0.35,   # Most important
+    'plus_cross_mark': 0.25,   # Very distinctive
+    'ambulance_text': 0.15,    # Helpful but less reliable
+    'emergency_colors': 0.15,  # Supporting evidence
+    'light_patterns': 0.10     # Additional confirmation
+}
+
+# Highest score each detector returns
+FEATURE_MAX_SCORES = {
+    'flashing_lights': 0.35,
+    'plus_cross_mark': 0.25,
+    'ambulance_text': 0.15,
+    'emergency_colors': 0.15,
+    'light_patterns': 0.10
+}
+
+MAX_TOTAL_BOOST = 0.4
+
+# Cheapest first: grayscale mean (flashing, also needed every frame for the
+# brightness history), one LUT pass over HSV, a threshold and opening on the
+# V channel, red mask contours, and CLAHE + Canny for text
+DEFAULT_ORDER = ('flashing_lights', 'emergency_colors', 'light_patterns',
+                 'plus_cross_mark', 'ambulance_text')
+
+
+def total_boost(features: Dict[str, float]) -> float:
+    """Weighted, capped feature boost"""
+    total = (
+        features['flashing_lights'] * FEATURE_WEIGHTS['flashing_lights'] +
+        features['plus_cross_mark'] * FEATURE_WEIGHTS['plus_cross_mark'] +
+        features['ambulance_text'] * FEATURE_WEIGHTS['ambulance_text'] +
+        features['emergency_colors'] * FEATURE_WEIGHTS['emergency_colors'] +
+        features['light_patterns'] * FEATURE_WEIGHTS['light_patterns']
+    )
+    return min(total, MAX_TOTAL_BOOST)
+
+
+class FeatureCascade:
+    """Runs feature detectors in cost order with optional early exit and per-stage stats"""
+
+    def __init__(self, order: Sequence[str] = DEFAULT_ORDER):
+        """
+        Initialize cascade
+
+        Args:
+            order: Detector names, cheapest first
+        """
+        unknown = set(order) - set(FEATURE_WEIGHTS)
+        if unknown or len(set(order)) != len(FEATURE_WEIGHTS):
+            raise ValueError(
+                f"Cascade order must list each of {list(FEATURE_WEIGHTS)} once, got {list(order)}")
+        self.order = tuple(order)
+        self.max_contribution = {name: FEATURE_WEIGHTS[name] * FEATURE_MAX_SCORES[name]
+                                 for name in self.order}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stage_stats = {name: {'runs': 0, 'hits': 0, 'time': 0.0} for name in self.order}
+        self.stats = {
+            'evaluations': 0,
+            'thresholded': 0,
+            'early_exits': 0,
+            'accepted': 0,
+            'cached_scores': 0
+        }
+
+    def run(self, evaluate: Callable[[str], float],
+            accept_threshold: Optional[float] = None,
+            known: Optional[Dict[str, float]] = None,
+            always: Iterable[str] = ()) -> Tuple[Dict[str, float], Tuple[str, ...]]:
+        """
+        Score a region
+
+        Args:
+            evaluate: Function returning the score of the named detector
+            accept_threshold: Stop once total_boost can no longer exceed this
+                (None runs every detector)
+            known: Scores that are already available (e.g. cached), used as is
+            always: Detectors that run even after an early exit (e.g. ones
+                that keep per-frame history)
+
+        Returns:
+            (features, computed): all five scores (0.0 for detectors that were
+            skipped) plus 'total_boost', and the names that were evaluated now
+        """
+        known = known or {}
+        always = set(always)
+        features = {name: 0.0 for name in self.order}
+        computed = []
+        score = 0.0
+        remaining = sum(self.max_contribution.values())
+        exited = False
+
+        self.stats['evaluations'] += 1
+        if accept_threshold is not None:
+            self.stats['thresholded'] += 1
+
+        # Known scores cost nothing, so they go first
+        stages = [n for n in self.order if n in known] + [n for n in self.order if n not in known]
+        for name in stages:
+            if (not exited and accept_threshold is not None
+                    and score + remaining <= accept_threshold):
+                exited = True
+                self.stats['early_exits'] += 1
+            remaining -= self.max_contribution[name]
+
+            if name in known:
+                value = known[name]
+                self.stats['cached_scores'] += 1
+            elif exited and name not in always:
+                continue
+            else:
+                start = time.perf_counter()
+                value = evaluate(name)
+                stage = self.stage_stats[name]
+                stage['time'] += time.perf_counter() - start
+                stage['runs'] += 1
+                if value > 0:
+                    stage['hits'] += 1
+                computed.append(name)
+
+            features[name] = value
+            score += value * FEATURE_WEIGHTS[name]
+
+        features['total_boost'] = total_boost(features)
+        if accept_threshold is not None and features['total_boost'] > accept_threshold:
+            self.stats['accepted'] += 1
+        return features, tuple(computed)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Per-stage run counts, hit rates and timings"""
+        stages = {}
+        for name in self.order:
+            stage = self.stage_stats[name]
+            runs = stage['runs']
+            stages[name] = {
+                'runs': runs,
+                'hit_rate': stage['hits'] / runs if runs else 0.0,
+                'avg_ms': stage['time'] / runs * 1000 if runs else 0.0,
+                'total_ms': stage['time'] * 1000
+            }
+        stats = dict(self.stats)
+        thresholded = stats['thresholded']
+        stats['early_exit_rate'] = stats['early_exits'] / thresholded if thresholded else 0.0
+        stats['stages'] = stages
+        return stats
@@ -0,0 +1,173 @@
+"""
+Frame buffer ownership for the detection hot path
+
+Full frames are only copied where annotation needs a private copy, and then
+into preallocated buffers instead of fresh allocations. Frame history is kept
+downscaled. Every copy is counted so the per-frame memcpy volume can be
+checked.
+"""
+import cv2
+import numpy as np
+from collections import deque
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+
+class CopyCounter:
+    """Bytes of frame data copied per frame and in total"""
+
+    def __init__(self):
+        self.frame_bytes = 0
+        self.last_frame_bytes = 0
+        self.total_bytes = 0
+        self.frames = 0
+
+    def add(self, nbytes: int):
+        """Record a copy on the current frame"""
+        self.frame_bytes += int(nbytes)
+        self.total_bytes += int(nbytes)
+
+    def next_frame(self):
+        """Close the current frame's count"""
+        self.last_frame_bytes = self.frame_bytes
+        self.frame_bytes = 0
+        self.frames += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Per-frame and total copy volume"""
+        return {
+            'last_frame_bytes': self.last_frame_bytes,
+            'avg_frame_bytes': self.total_bytes / self.frames if self.frames else 0.0,
+            'total_bytes': self.total_bytes,
+            'frames': self.frames
+        }
+
+
+class FrameBufferRing:
+    """
+    Fixed number of preallocated frame buffers handed out round-robin
+
+    A buffer is reused after `size` further calls to next()/copy(), so the
+    ring must be larger than the number of frames a consumer keeps alive.
+    """
+
+    def __init__(self, size: int = 2, counter: Optional[CopyCounter] = None):
+        """
+        Initialize buffer ring
+
+        Args:
+            size: Number of buffers
+            counter: Optional counter that copy() reports to
+        """
+        self.size = max(1, int(size))
+        self.counter = counter
+        self._buffers = [None] * self.size
+        self._index = 0
+        self.allocations = 0
+
+    def resize(self, size: int):
+        """Change the number of buffers (existing buffers are dropped)"""
+        self.size = max(1, int(size))
+        self._buffers = [None] * self.size
+        self._index = 0
+
+    def next(self, shape: Sequence[int], dtype=np.uint8) -> np.ndarray:
+        """
+        Next buffer of the given shape, allocated only when the shape changes
+
+        Returns:
+            Buffer with undefined contents
+        """
+        shape = tuple(shape)
+        buffer = self._buffers[self._index]
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[self._index] = buffer
+            self.allocations += 1
+        self._index = (self._index + 1) % self.size
+        return buffer
+
+    def copy(self, frame: np.ndarray) -> np.ndarray:
+        """Copy a frame into the next buffer"""
+        buffer = self.next(frame.shape, frame.dtype)
+        np.copyto(buffer, frame)
+        if self.counter is not None:
+            self.counter.add(frame.nbytes)
+        return buffer
+
+
+class FrameHistory:
+    """
+    The last few frames, downscaled into preallocated buffers
+
+    Frames are reduced to at most max_width pixels wide; crop() maps a
+    full-resolution box onto a stored frame.
+    """
+
+    def __init__(self, maxlen: int = 5, max_width: int = 320,
+                 counter: Optional[CopyCounter] = None):
+        """
+        Initialize frame history
+
+        Args:
+            maxlen: Number of frames kept
+            max_width: Width of the stored frames (smaller frames are kept as is)
+            counter: Optional counter that append() reports to
+        """
+        self.maxlen = maxlen
+        self.max_width = max_width
+        self.counter = counter
+        self.scale = 1.0
+        self._frames = deque(maxlen=maxlen)
+        # One buffer per slot: the buffer handed out next is the oldest frame,
+        # which the append below evicts
+        self._ring = FrameBufferRing(maxlen)
+
+    def _stored_size(self, frame_shape: Tuple[int, ...]) -> Tuple[int, int]:
+        """(width, height) of a stored frame"""
+        height, width = frame_shape[:2]
+        if width <= self.max_width:
+            return width, height
+        return self.max_width, max(1, int(round(height * self.max_width / width)))
+
+    def append(self, frame: np.ndarray):
+        """Store a downscaled copy of frame"""
+        width, height = self._stored_size(frame.shape)
+        buffer = self._ring.next((height, width) + frame.shape[2:], frame.dtype)
+        if (width, height) == (frame.shape[1], frame.shape[0]):
+            np.copyto(buffer, frame)
+        else:
+            cv2.resize(frame, (width, height), dst=buffer, interpolation=cv2.INTER_AREA)
+        self.scale = width / frame.shape[1]
+        self._frames.append(buffer)
+        if self.counter is not None:
+            self.counter.add(buffer.nbytes)
+
+    def crop(self, index: int, bbox: Sequence[float]) -> np.ndarray:
+        """
+        Region of a stored frame
+
+        Args:
+            index: Frame index (-1 = latest)
+            bbox: [x1, y1, x2, y2] in full-resolution coordinates
+
+        Returns:
+            View of the stored (downscaled) frame
+        """
+        frame = self._frames[index]
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = (int(round(v * self.scale)) for v in bbox)
+        x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+        y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+        return frame[y1:y2, x1:x2]
+
+    def clear(self):
+        self._frames.clear()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self._frames[index]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self._frames)
@@ -0,0 +1,129 @@
+"""
+Rasterized lane / zone masks for point-in-lane lookups
+
+A lane configuration is compiled once into a label image of the frame size
+(0 = outside, 1..K = zone index + 1). Membership of any number of points is
+then a single NumPy fancy-index instead of one cv2.pointPolygonTest call per
+point.
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class LaneMaskRaster:
+    """Label raster of one or more lane/zone polygons"""
+
+    def __init__(self, polygons: Optional[Sequence[np.ndarray]] = None):
+        """
+        Initialize lane mask raster
+
+        Args:
+            polygons: Zone polygons ([N, 2] points each). Where zones
+                overlap, the later zone wins.
+        """
+        self.polygons: List[np.ndarray] = []
+        self.raster: Optional[np.ndarray] = None
+        self._raster_key = None
+        self._version = 0
+        self.stats = {
+            'rebuilds': 0,
+            'lookups': 0,
+            'points': 0
+        }
+        self.set_polygons(polygons or [])
+
+    def set_polygons(self, polygons: Sequence[np.ndarray]):
+        """Replace the zone polygons; the raster is rebuilt on next use"""
+        self.polygons = [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons]
+        self._version += 1
+
+    @property
+    def num_zones(self) -> int:
+        return len(self.polygons)
+
+    @property
+    def dtype(self):
+        """uint8 holds up to 255 zones, more need uint16"""
+        return np.uint8 if self.num_zones < 256 else np.uint16
+
+    def _extent(self) -> Tuple[int, int]:
+        """(height, width) just covering every polygon"""
+        if not self.polygons:
+            return (1, 1)
+        points = np.concatenate(self.polygons)
+        return (max(1, int(points[:, 1].max()) + 1), max(1, int(points[:, 0].max()) + 1))
+
+    def ensure(self, frame_shape: Optional[Tuple[int, ...]] = None) -> np.ndarray:
+        """
+        Get the raster, rebuilding it only when the frame size or polygons changed
+
+        Args:
+            frame_shape: Frame shape (height, width, ...). Without it the raster
+                covers the polygons' extent, which answers lookups identically.
+
+        Returns:
+            [H, W] label raster
+        """
+        if frame_shape is not None:
+            shape = tuple(frame_shape[:2])
+        elif self.raster is not None:
+            return self.raster
+        else:
+            shape = self._extent()
+
+        key = (shape, self._version)
+        if key != self._raster_key:
+            raster = np.zeros(shape, dtype=self.dtype)
+            for label, polygon in enumerate(self.polygons, start=1):
+                cv2.fillPoly(raster, [polygon], int(label))
+            self.raster = raster
+            self._raster_key = key
+            self.stats['rebuilds'] += 1
+        return self.raster
+
+    def labels_at(self, points: np.ndarray) -> np.ndarray:
+        """
+        Zone label at each point
+
+        Args:
+            points: [N, 2] (x, y) points in frame coordinates
+
+        Returns:
+            [N] labels (0 = outside every zone, i + 1 = inside polygon i)
+        """
+        raster = self.ensure()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        labels = np.zeros(len(points), dtype=raster.dtype)
+        if len(points) == 0:
+            return labels
+
+        xs = np.rint(points[:, 0]).astype(np.intp)
+        ys = np.rint(points[:, 1]).astype(np.intp)
+        height, width = raster.shape
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        labels[inside] = raster[ys[inside], xs[inside]]
+
+        self.stats['lookups'] += 1
+        self.stats['points'] += len(points)
+        return labels
+
+    def contains(self, points: np.ndarray, label: Optional[int] = None) -> np.ndarray:
+        """
+        Boolean mask of points inside any zone, or inside the zone with the given label
+
+        Args:
+            points: [N, 2] (x, y) points in frame coordinates
+            label: Zone label (1-based); None means any zone
+        """
+        labels = self.labels_at(points)
+        if label is None:
+            return labels > 0
+        return labels == label
+
+    def get_stats(self) -> Dict[str, int]:
+        """Rebuild and lookup counters"""
+        stats = dict(self.stats)
+        stats['zones'] = self.num_zones
+        stats['shape'] = None if self.raster is None else tuple(self.raster.shape)
+        return stats
@@ -0,0 +1,377 @@
+"""
+Non-maximum suppression engine for the ONNX detectors
+
+Provides a top-k prefilter, class-aware (batched) NMS and interchangeable
+backends, plus a micro-benchmark that compares them on recorded candidate
+sets:
+
+    python core/detectors/nms.py --candidates recorded_candidates.npz
+"""
+import time
+import argparse
+import cv2
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+NMS_BACKENDS = ('numpy', 'opencv')
+
+
+def bbox_iou(box1: np.ndarray, box2: np.ndarray) -> np.ndarray:
+    """
+    Calculate IoU between two sets of boxes
+
+    Args:
+        box1: [N, 4] array of boxes in format [x1, y1, x2, y2]
+        box2: [M, 4] array of boxes in format [x1, y1, x2, y2]
+
+    Returns:
+        [N, M] array of IoU values
+    """
+    # Expand dimensions for broadcasting
+    box1 = np.expand_dims(box1, 1)  # [N, 1, 4]
+    box2 = np.expand_dims(box2, 0)  # [1, M, 4]
+
+    # Calculate intersection coordinates
+    x1 = np.maximum(box1[..., 0], box2[..., 0])  # [N, M]
+    y1 = np.maximum(box1[..., 1], box2[..., 1])  # [N, M]
+    x2 = np.minimum(box1[..., 2], box2[..., 2])  # [N, M]
+    y2 = np.minimum(box1[..., 3], box2[..., 3])  # [N, M]
+
+    # Calculate intersection area
+    intersection = np.maximum(0, x2 - x1) * \
+        np.maximum(0, y2 - y1)  # [N, M]
+
+    # Calculate union area
+    area1 = (box1[..., 2] - box1[..., 0]) * \
+        (box1[..., 3] - box1[..., 1])  # [N, 1]
+    area2 = (box2[..., 2] - box2[..., 0]) * \
+        (box2[..., 3] - box2[..., 1])  # [1, M]
+    union = area1 + area2 - intersection  # [N, M]
+
+    # Add small epsilon to avoid division by zero
+    return intersection / (union + 1e-6)
+
+
+def topk_prefilter(scores: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, in no particular order
+
+    Uses argpartition, so it is O(N) rather than a full sort.
+
+    Args:
+        scores: [N] array of scores
+        top_k: Number of candidates to keep (None or <= 0 keeps all)
+
+    Returns:
+        Indices of kept candidates
+    """
+    n = len(scores)
+    if not top_k or top_k <= 0 or n <= top_k:
+        return np.arange(n)
+    return np.argpartition(scores, n - top_k)[n - top_k:]
+
+
+def offset_boxes_by_class(boxes: np.ndarray, class_ids: np.ndarray) -> np.ndarray:
+    """
+    Shift boxes of each class into their own coordinate range
+
+    After the shift, boxes of different classes never overlap, so a single
+    NMS pass behaves like one NMS per class. The step between classes is the
+    full coordinate span, so this also holds for unclipped boxes with
+    negative coordinates.
+    """
+    if len(boxes) == 0:
+        return boxes
+    span = float(np.max(boxes) - np.min(boxes)) + 1.0
+    offsets = class_ids.astype(boxes.dtype) * span
+    return boxes + offsets[:, None]
+
+
+def nms_numpy(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float,
+              class_ids: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Greedy NMS with coordinates and areas computed once up front
+
+    Args:
+        boxes: [N, 4] array of boxes in format [x1, y1, x2, y2]
+        scores: [N] array of scores
+        iou_threshold: IoU threshold for NMS
+        class_ids: Optional [N] class ids; boxes only suppress their own class
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.array([], dtype=int)
+
+    if class_ids is not None:
+        boxes = offset_boxes_by_class(boxes, class_ids)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+
+    # Sort by score (descending)
+    order = np.argsort(scores)[::-1]
+
+    keep = []
+    while order.size > 0:
+        # Keep the box with highest score
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        # IoU of the kept box with the remaining ones
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        intersection = w * h
+        ious = intersection / (areas[i] + areas[rest] - intersection + 1e-6)
+
+        # Remove boxes with IoU > threshold
+        order = rest[ious <= iou_threshold]
+
+    return np.array(keep, dtype=int)
+
+
+def nms_opencv(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float,
+               class_ids: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    NMS through OpenCV's C++ implementation (cv2.dnn.NMSBoxesBatched)
+
+    Args:
+        boxes: [N, 4] array of boxes in format [x1, y1, x2, y2]
+        scores: [N] array of scores
+        iou_threshold: IoU threshold for NMS
+        class_ids: Optional [N] class ids; boxes only suppress their own class
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.array([], dtype=int)
+
+    # OpenCV expects (x, y, w, h)
+    xywh = np.empty_like(boxes, dtype=np.float64)
+    xywh[:, :2] = boxes[:, :2]
+    xywh[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+    score_list = scores.astype(np.float64).tolist()
+    # Every candidate already passed the confidence threshold
+    score_threshold = float(np.min(scores)) - 1.0
+
+    if class_ids is not None:
+        keep = cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), score_list, class_ids.astype(np.int32).tolist(),
+            score_threshold, iou_threshold)
+    else:
+        keep = cv2.dnn.NMSBoxes(
+            xywh.tolist(), score_list, score_threshold, iou_threshold)
+
+    return np.array(keep, dtype=int).flatten()
+
+
+_BACKEND_FUNCTIONS = {
+    'numpy': nms_numpy,
+    'opencv': nms_opencv,
+}
+
+
+def _opencv_batched_available() -> bool:
+    """NMSBoxesBatched only exists in OpenCV >= 4.7"""
+    return hasattr(cv2, 'dnn') and hasattr(cv2.dnn, 'NMSBoxesBatched')
+
+
+class NMSEngine:
+    """Configurable NMS: top-k prefilter, class-aware suppression and backend choice"""
+
+    def __init__(self, iou_threshold: float = 0.45, backend: str = 'numpy',
+                 top_k: Optional[int] = 1000, class_agnostic: bool = False,
+                 record_limit: int = 0):
+        """
+        Initialize NMS engine
+
+        Args:
+            iou_threshold: IoU threshold for NMS
+            backend: One of NMS_BACKENDS
+            top_k: Keep only this many highest-scoring candidates before NMS
+                (None or 0 disables the prefilter)
+            class_agnostic: Let boxes of different classes suppress each other
+            record_limit: Keep up to this many recent candidate sets for
+                benchmarking (0 disables recording)
+        """
+        if backend not in NMS_BACKENDS:
+            raise ValueError(
+                f"Unknown NMS backend '{backend}', expected one of {NMS_BACKENDS}")
+
+        if backend == 'opencv' and not _opencv_batched_available():
+            print("cv2.dnn.NMSBoxesBatched not available, falling back to numpy NMS")
+            backend = 'numpy'
+
+        self.iou_threshold = iou_threshold
+        self.backend = backend
+        self.top_k = top_k
+        self.class_agnostic = class_agnostic
+        self._nms = _BACKEND_FUNCTIONS[backend]
+
+        self.recorded = deque(maxlen=record_limit) if record_limit > 0 else None
+
+    def __call__(self, boxes: np.ndarray, scores: np.ndarray,
+                 class_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Run NMS
+
+        Args:
+            boxes: [N, 4] array of boxes in format [x1, y1, x2, y2]
+            scores: [N] array of scores
+            class_ids: Optional [N] class ids (ignored when class_agnostic)
+
+        Returns:
+            Indices into the input arrays of kept boxes, highest score first
+        """
+        if len(boxes) == 0:
+            return np.array([], dtype=int)
+
+        if self.recorded is not None:
+            self.recorded.append((boxes.copy(), scores.copy(),
+                                  None if class_ids is None else class_ids.copy()))
+
+        candidates = topk_prefilter(scores, self.top_k)
+        if len(candidates) < len(scores):
+            boxes = boxes[candidates]
+            scores = scores[candidates]
+            if class_ids is not None:
+                class_ids = class_ids[candidates]
+
+        if self.class_agnostic:
+            class_ids = None
+
+        keep = self._nms(boxes, scores, self.iou_threshold, class_ids)
+        return candidates[keep]
+
+    def save_recording(self, path: str) -> int:
+        """
+        Save recorded candidate sets to an .npz file for benchmark_nms()
+
+        Returns:
+            Number of candidate sets written
+        """
+        if not self.recorded:
+            return 0
+        return save_candidate_sets(path, list(self.recorded))
+
+
+def save_candidate_sets(path: str, candidate_sets: List[Tuple]) -> int:
+    """Save (boxes, scores, class_ids) tuples to a compressed .npz file"""
+    arrays = {}
+    for i, (boxes, scores, class_ids) in enumerate(candidate_sets):
+        arrays[f'boxes_{i}'] = boxes
+        arrays[f'scores_{i}'] = scores
+        if class_ids is not None:
+            arrays[f'class_ids_{i}'] = class_ids
+    np.savez_compressed(path, **arrays)
+    return len(candidate_sets)
+
+
+def load_candidate_sets(path: str) -> List[Tuple]:
+    """Load candidate sets written by save_candidate_sets()"""
+    with np.load(path) as data:
+        count = sum(1 for key in data.files if key.startswith('boxes_'))
+        candidate_sets = []
+        for i in range(count):
+            class_key = f'class_ids_{i}'
+            candidate_sets.append((
+                data[f'boxes_{i}'],
+                data[f'scores_{i}'],
+                data[class_key] if class_key in data.files else None
+            ))
+    return candidate_sets
+
+
+def synthetic_candidate_set(num_objects: int = 60, boxes_per_object: int = 12,
+                            num_classes: int = 4, seed: int = 0) -> Tuple:
+    """
+    Dense-traffic-like candidate set: clusters of jittered boxes per object,
+    the way raw YOLO output looks before NMS
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(40, 600, (num_objects, 2))
+    sizes = rng.uniform(15, 120, (num_objects, 2))
+    classes = rng.integers(0, num_classes, num_objects)
+
+    n = num_objects * boxes_per_object
+    jitter = rng.normal(0, 3, (n, 4))
+    c = np.repeat(centers, boxes_per_object, axis=0)
+    s = np.repeat(sizes, boxes_per_object, axis=0)
+    boxes = np.column_stack([c - s / 2, c + s / 2]) + jitter
+    scores = rng.uniform(0.3, 0.95, n).astype(np.float32)
+    class_ids = np.repeat(classes, boxes_per_object)
+
+    return boxes.astype(np.float32), scores, class_ids
+
+
+def benchmark_nms(candidate_sets: List[Tuple], iou_threshold: float = 0.45,
+                  top_k: Optional[int] = 1000, repeats: int = 20) -> Dict[str, Dict]:
+    """
+    Compare NMS configurations on the same candidate sets
+
+    Returns:
+        Dictionary of configuration name -> {'mean_ms', 'kept', 'agreement'},
+        where agreement is the fraction of sets whose kept indices match the
+        numpy backend without prefilter
+    """
+    configs = {
+        'numpy': NMSEngine(iou_threshold, 'numpy', top_k=None),
+        'numpy+topk': NMSEngine(iou_threshold, 'numpy', top_k=top_k),
+    }
+    if _opencv_batched_available():
+        configs['opencv'] = NMSEngine(iou_threshold, 'opencv', top_k=None)
+        configs['opencv+topk'] = NMSEngine(iou_threshold, 'opencv', top_k=top_k)
+
+    reference = [set(configs['numpy'](b, s, c).tolist())
+                 for b, s, c in candidate_sets]
+
+    results = {}
+    for name, engine in configs.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            kept = [engine(b, s, c) for b, s, c in candidate_sets]
+        elapsed = time.perf_counter() - start
+
+        matches = sum(1 for k, ref in zip(kept, reference) if set(k.tolist()) == ref)
+        results[name] = {
+            'mean_ms': elapsed / (repeats * len(candidate_sets)) * 1000,
+            'kept': int(sum(len(k) for k in kept)),
+            'agreement': matches / len(candidate_sets)
+        }
+    return results
+
+
+def main():
+    """Run the NMS micro-benchmark"""
+    parser = argparse.ArgumentParser(description="NMS backend micro-benchmark")
+    parser.add_argument("--candidates", type=str, nargs='*', default=[],
+                        help="Recorded candidate sets (.npz from NMSEngine.save_recording)")
+    parser.add_argument("--iou", type=float, default=0.45, help="IoU threshold")
+    parser.add_argument("--top-k", type=int, default=1000, help="Top-k prefilter size")
+    parser.add_argument("--repeats", type=int, default=20, help="Timing repeats")
+    args = parser.parse_args()
+
+    candidate_sets = []
+    for path in args.candidates:
+        candidate_sets.extend(load_candidate_sets(path))
+    if not candidate_sets:
+        print("No recorded candidates given, using synthetic dense-traffic sets")
+        candidate_sets = [synthetic_candidate_set(num_objects=n, seed=n)
+                          for n in (20, 60, 150)]
+
+    sizes = [len(s[1]) for s in candidate_sets]
+    print(f"{len(candidate_sets)} candidate sets, "
+          f"{min(sizes)}-{max(sizes)} candidates each")
+
+    results = benchmark_nms(candidate_sets, args.iou, args.top_k, args.repeats)
+    print(f"{'backend':<14}{'mean ms':>10}{'kept':>8}{'agreement':>12}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['mean_ms']:>10.3f}{r['kept']:>8}{r['agreement']:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
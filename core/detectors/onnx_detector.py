@@ -8,11 +8,45 @@ import onnxruntime as ort
 from typing import List, Dict, Tuple, Optional
 import time
 
+from .preprocessing import get_shared_preprocessor, InputBufferPool
+from .nms import NMSEngine, nms_numpy, bbox_iou
+from .detections import Detections, FLAG_AMBULANCE
+from .session_profiles import SessionProfile, get_session_profile
+from .session_registry import SessionRegistry, get_session_registry
+
+
+def apply_input_size(detector, input_size: Optional[int]):
+    """
+    Run a detector at a custom input size when its model's input shape allows it
+
+    Args:
+        detector: ONNXYOLODetector or ONNXAmbulanceDetector with its session
+            input shape loaded
+        input_size: Square input size (rounded to a multiple of 32)
+    """
+    if not input_size or input_size == detector.input_width == detector.input_height:
+        return
+    if isinstance(detector.input_shape[2], int) or isinstance(detector.input_shape[3], int):
+        print(f"⚠️ Model input shape {detector.input_shape} is static, "
+              f"ignoring input size {input_size}")
+        return
+    # YOLO strides need multiples of 32
+    size = max(32, int(round(input_size / 32)) * 32)
+    detector.input_height = detector.input_width = size
+    print(f"Using input size {size}x{size}")
+    detector.warmup()
+
 
 class ONNXYOLODetector:
     """ONNX Runtime-based YOLO detector for optimized inference"""
 
-    def __init__(self, model_path: str, conf_thres: float = 0.25, iou_thres: float = 0.45):
+    def __init__(self, model_path: str, conf_thres: float = 0.25, iou_thres: float = 0.45,
+                 nms_backend: str = 'numpy', nms_top_k: int = 1000,
+                 class_agnostic_nms: bool = False,
+                 session_profile: Optional[SessionProfile] = None,
+                 use_io_binding: Optional[bool] = None,
+                 session_registry: Optional[SessionRegistry] = None,
+                 input_size: Optional[int] = None):
         """
         Initialize ONNX Runtime YOLO detector
 
@@ -20,25 +54,34 @@ class ONNXYOLODetector:
             model_path: Path to ONNX model
             conf_thres: Confidence threshold
             iou_thres: NMS IoU threshold
+            nms_backend: NMS implementation ('numpy' or 'opencv')
+            nms_top_k: Highest-scoring candidates kept before NMS
+            class_agnostic_nms: Let different classes suppress each other
+            session_profile: ONNX Runtime session settings (defaults to the
+                profile configured in detection_config.yaml)
+            use_io_binding: Reuse bound input/output buffers across frames
+                (defaults to the session profile's setting)
+            session_registry: Registry providing the model session (defaults
+                to the process-wide registry)
+            input_size: Square input size to run at (e.g. 320 for cropped
+                lane ROIs); only honoured by models with dynamic input shapes
         """
         self.conf_thres = conf_thres
         self.iou_thres = iou_thres
+        self.nms = NMSEngine(iou_thres, backend=nms_backend, top_k=nms_top_k,
+                             class_agnostic=class_agnostic_nms)
 
         # Normalize path for Windows
         model_path = os.path.normpath(model_path)
 
-        # Initialize ONNX Runtime session
-        providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
-        providers = [
-            p for p in providers if p in ort.get_available_providers()]
-
-        # Set session options for better performance
-        sess_options = ort.SessionOptions()
-        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Sessions come from the process-wide registry, so a restarted
+        # detector reuses the already loaded and warmed model
+        self.session_profile = session_profile or get_session_profile()
+        self.registry = session_registry or get_session_registry()
+        self.model_path = model_path
 
         print(f"Loading model from: {model_path}")
-        print(f"Using providers: {providers}")
+        print(f"Session profile: {self.session_profile.name}")
         print(f"ONNX Runtime version: {ort.__version__}")
 
         try:
@@ -49,34 +92,34 @@ class ONNXYOLODetector:
             file_size = os.path.getsize(model_path)
             print(f"Model file size: {file_size / (1024*1024):.2f} MB")
 
-            # Try to load the model
-            print(f"Loading ONNX model with providers: {providers}...")
-            self.session = ort.InferenceSession(
-                model_path, sess_options, providers=providers)
-            print(
-                f"✅ Model loaded successfully with providers: {self.session.get_providers()}")
+            loads = self.registry.stats['loads']
+            self.handle = self.registry.acquire(
+                model_path, self.session_profile, use_io_binding)
+            if self.registry.stats['loads'] > loads:
+                print(f"✅ Model loaded and warmed up in {self.handle.load_time * 1000:.0f} ms "
+                      f"with providers: {self.handle.get_providers()}")
+            else:
+                print(f"✅ Reusing warmed-up model session "
+                      f"(providers: {self.handle.get_providers()}, refs: {self.handle.refcount})")
 
-            # Get input details
-            print(f"Getting model input details...")
-            self.input_name = self.session.get_inputs()[0].name
+            self.session = self.handle.session
+            self.runner = self.handle.runner
+            self.input_name = self.handle.input_name
             # (batch, channel, height, width)
-            self.input_shape = self.session.get_inputs()[0].shape
+            self.input_shape = self.handle.input_shape
+            self.input_height = self.handle.input_height
+            self.input_width = self.handle.input_width
+            apply_input_size(self, input_size)
             print(f"Input name: {self.input_name}, shape: {self.input_shape}")
 
-            # Handle dynamic input shapes
-            self.input_height = self.input_shape[2] if isinstance(
-                self.input_shape[2], int) else 640
-            self.input_width = self.input_shape[3] if isinstance(
-                self.input_shape[3], int) else 640
+            # Letterboxing is shared with every detector of the same input size
+            self.preprocessor = get_shared_preprocessor(
+                self.input_width, self.input_height)
+            # Per-thread input buffers reused across frames
+            self.input_buffers = InputBufferPool(
+                self.input_width, self.input_height)
 
-            print(f"Model input shape: {self.input_shape}")
-            print(
-                f"Model output names: {[out.name for out in self.session.get_outputs()]}")
-
-            # Warm up the model
-            print(f"Warming up model...")
-            self.warmup()
-            print(f"✅ Model warmup completed")
+            print(f"Model output names: {self.handle.output_names}")
 
         except Exception as e:
             import traceback
@@ -89,55 +132,40 @@ class ONNXYOLODetector:
         """Warm up the model with dummy input"""
         dummy_input = np.zeros(
             (1, 3, self.input_height, self.input_width), dtype=np.float32)
-        _ = self.session.run(None, {self.input_name: dummy_input})
+        _ = self.runner.run(dummy_input)
+
+    def get_preprocess_stats(self) -> Dict[str, int]:
+        """Input buffer allocation statistics"""
+        return self.input_buffers.get_stats()
+
+    def get_inference_stats(self) -> Dict[str, int]:
+        """IOBinding run statistics"""
+        return self.runner.get_stats()
+
+    def close(self):
+        """Release the model session back to the registry (it stays loaded)"""
+        if getattr(self, 'handle', None) is not None:
+            self.registry.release(self.handle)
+            self.handle = None
 
     def preprocess(self, img: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
         """
         Preprocess image for YOLO model
 
+        The returned tensor lives in this thread's reusable input buffer and
+        is overwritten by the next call.
+
         Args:
             img: Input image (BGR format)
 
         Returns:
-            Tuple of (preprocessed image, ratio, (new_width, new_height))
+            Tuple of (preprocessed image, ratio, (dx, dy))
         """
-        # Convert BGR to RGB
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        # Get image shape
-        img_height, img_width = img.shape[:2]
-
-        # Calculate ratio for resizing
-        ratio = min(self.input_width / img_width,
-                    self.input_height / img_height)
-        new_width = int(img_width * ratio)
-        new_height = int(img_height * ratio)
-
-        # Resize with aspect ratio
-        if (new_width, new_height) != (img_width, img_height):
-            img = cv2.resize(img, (new_width, new_height),
-                             interpolation=cv2.INTER_LINEAR)
-
-        # Create a blank canvas with target size
-        canvas = np.full(
-            (self.input_height, self.input_width, 3), 114, dtype=np.uint8)
-
-        # Calculate padding
-        dx = (self.input_width - new_width) // 2
-        dy = (self.input_height - new_height) // 2
-
-        # Place the resized image on the canvas
-        canvas[dy:dy+new_height, dx:dx+new_width] = img
-
-        # Normalize and transpose to NCHW format
-        canvas = canvas.astype(np.float32) / 255.0
-        canvas = np.transpose(canvas, (2, 0, 1))  # HWC to CHW
-        canvas = np.expand_dims(canvas, axis=0)   # Add batch dimension
-
-        return canvas, ratio, (dx, dy)
+        preprocessed = self.preprocessor(img, self.input_buffers.get())
+        return preprocessed['tensor'], preprocessed['ratio'], preprocessed['pad']
 
     def postprocess(self, outputs: np.ndarray, ratio: float, pad: Tuple[int, int],
-                    img_shape: Tuple[int, int], conf_thres: float = None) -> List[Dict]:
+                    img_shape: Tuple[int, int], conf_thres: float = None) -> Detections:
         """
         Postprocess YOLO model outputs
 
@@ -149,7 +177,7 @@ class ONNXYOLODetector:
             conf_thres: Confidence threshold
 
         Returns:
-            List of detection dictionaries
+            Detections in original image coordinates
         """
         if conf_thres is None:
             conf_thres = self.conf_thres
@@ -178,7 +206,7 @@ class ONNXYOLODetector:
             # Filter by confidence threshold
             mask = max_scores >= conf_thres
             if not np.any(mask):
-                return []
+                return Detections.empty()
 
             # Apply mask to get valid detections
             valid_boxes = box_data[mask]  # (n, 4)
@@ -201,16 +229,15 @@ class ONNXYOLODetector:
             # Stack into boxes array
             boxes = np.column_stack([x1, y1, x2, y2])
 
-            # Apply NMS in model input space
+            # Apply class-aware NMS in model input space
             if len(boxes) > 0:
-                keep_indices = self.non_max_suppression(
-                    boxes, valid_scores, self.iou_thres)
+                keep_indices = self.nms(boxes, valid_scores, valid_class_ids)
                 boxes = boxes[keep_indices]
                 valid_scores = valid_scores[keep_indices]
                 valid_class_ids = valid_class_ids[keep_indices]
 
             if len(boxes) == 0:
-                return []
+                return Detections.empty()
 
             # Convert from model input space to original image space
             # Step 1: Remove padding (subtract offset)
@@ -226,36 +253,22 @@ class ONNXYOLODetector:
             boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, img_width)
             boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, img_height)
 
-            # Convert to detection format
-            detections = []
-            invalid_count = 0
-            for i in range(len(boxes)):
-                x1, y1, x2, y2 = boxes[i]
-
-                # Skip invalid boxes (zero area after clipping)
-                if x2 <= x1 or y2 <= y1:
-                    invalid_count += 1
-                    continue
-
-                detections.append({
-                    'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                    'confidence': float(valid_scores[i]),
-                    'class_id': int(valid_class_ids[i]),
-                    'class_name': str(int(valid_class_ids[i]))
-                })
+            # Skip invalid boxes (zero area after clipping)
+            valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
 
-            return detections
+            return Detections(boxes[valid], valid_scores[valid],
+                              valid_class_ids[valid])
 
         except Exception as e:
             print(f"Error in postprocess: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return Detections.empty()
 
     @staticmethod
     def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
         """
-        Non-maximum suppression
+        Class-agnostic non-maximum suppression
 
         Args:
             boxes: [N, 4] array of boxes in format [x1, y1, x2, y2]
@@ -265,32 +278,7 @@ class ONNXYOLODetector:
         Returns:
             Indices of kept boxes
         """
-        if len(boxes) == 0:
-            return np.array([], dtype=int)
-
-        # Sort by score (descending)
-        order = np.argsort(scores)[::-1]
-        boxes = boxes[order]
-        scores = scores[order]
-
-        keep = []
-
-        while len(boxes) > 0:
-            # Keep the box with highest score
-            keep.append(order[0])
-
-            if len(boxes) == 1:
-                break
-
-            # Calculate IoU with remaining boxes
-            ious = ONNXYOLODetector.bbox_iou(boxes[0:1], boxes[1:])[0]
-
-            # Remove boxes with IoU > threshold
-            mask = ious <= iou_threshold
-            boxes = boxes[1:][mask]
-            order = order[1:][mask]
-
-        return np.array(keep, dtype=int)
+        return nms_numpy(boxes, scores, iou_threshold)
 
     @staticmethod
     def bbox_iou(box1: np.ndarray, box2: np.ndarray) -> np.ndarray:
@@ -304,60 +292,34 @@ class ONNXYOLODetector:
         Returns:
             [N, M] array of IoU values
         """
-        # Expand dimensions for broadcasting
-        box1 = np.expand_dims(box1, 1)  # [N, 1, 4]
-        box2 = np.expand_dims(box2, 0)  # [1, M, 4]
-
-        # Calculate intersection coordinates
-        x1 = np.maximum(box1[..., 0], box2[..., 0])  # [N, M]
-        y1 = np.maximum(box1[..., 1], box2[..., 1])  # [N, M]
-        x2 = np.minimum(box1[..., 2], box2[..., 2])  # [N, M]
-        y2 = np.minimum(box1[..., 3], box2[..., 3])  # [N, M]
-
-        # Calculate intersection area
-        intersection = np.maximum(0, x2 - x1) * \
-            np.maximum(0, y2 - y1)  # [N, M]
-
-        # Calculate union area
-        area1 = (box1[..., 2] - box1[..., 0]) * \
-            (box1[..., 3] - box1[..., 1])  # [N, 1]
-        area2 = (box2[..., 2] - box2[..., 0]) * \
-            (box2[..., 3] - box2[..., 1])  # [1, M]
-        union = area1 + area2 - intersection  # [N, M]
-
-        # Calculate IoU
-        # Add small epsilon to avoid division by zero
-        iou = intersection / (union + 1e-6)
-
-        return iou
-
-    def detect(self, img: np.ndarray, conf_thres: float = None) -> List[Dict]:
+        return bbox_iou(box1, box2)
+
+    def detect(self, img: np.ndarray, conf_thres: float = None,
+               preprocessed: Optional[Dict] = None) -> Detections:
         """
         Run inference on a single image
 
         Args:
             img: Input image (BGR format)
             conf_thres: Confidence threshold (overrides class default if provided)
+            preprocessed: Letterboxed frame from a shared preprocessor; reused
+                when it matches this model's input size and the image shape
 
         Returns:
-            List of detections, each as a dictionary with keys:
-                - 'bbox': [x1, y1, x2, y2] in original image coordinates
-                - 'confidence': Detection confidence
-                - 'class_id': Class ID
-                - 'class_name': Class name
+            Detections with boxes [x1, y1, x2, y2] in original image
+            coordinates; use to_dicts() for the dictionary format
         """
-        # Store original image shape
-        img_height, img_width = img.shape[:2]
-
-        # Preprocess image
-        img_preprocessed, ratio, pad = self.preprocess(img)
+        # Preprocess image unless a matching letterboxed frame was supplied
+        if not self.preprocessor.matches(preprocessed, img.shape):
+            preprocessed = self.preprocessor(img, self.input_buffers.get())
 
         # Run inference
-        outputs = self.session.run(None, {self.input_name: img_preprocessed})
+        outputs = self.runner.run(preprocessed['tensor'])
 
         # Postprocess outputs
         detections = self.postprocess(
-            outputs, ratio, pad, (img_height, img_width), conf_thres)
+            outputs, preprocessed['ratio'], preprocessed['pad'],
+            preprocessed['img_shape'], conf_thres)
 
         return detections
 
@@ -365,31 +327,39 @@ class ONNXYOLODetector:
 class ONNXAmbulanceDetector:
     """ONNX Runtime-based ambulance detector using the optimized model"""
 
-    def __init__(self, model_path: str, conf_thres: float = 0.1):
+    def __init__(self, model_path: str, conf_thres: float = 0.1,
+                 session_profile: Optional[SessionProfile] = None,
+                 use_io_binding: Optional[bool] = None,
+                 session_registry: Optional[SessionRegistry] = None,
+                 input_size: Optional[int] = None):
         """
         Initialize ONNX Runtime ambulance detector
 
         Args:
             model_path: Path to ONNX model
             conf_thres: Confidence threshold
+            session_profile: ONNX Runtime session settings (defaults to the
+                profile configured in detection_config.yaml)
+            use_io_binding: Reuse bound input/output buffers across frames
+                (defaults to the session profile's setting)
+            session_registry: Registry providing the model session (defaults
+                to the process-wide registry)
+            input_size: Square input size to run at (e.g. 320 for cropped
+                lane ROIs); only honoured by models with dynamic input shapes
         """
         self.conf_thres = conf_thres
 
         # Normalize path for Windows
         model_path = os.path.normpath(model_path)
 
-        # Initialize ONNX Runtime session
-        providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
-        providers = [
-            p for p in providers if p in ort.get_available_providers()]
-
-        # Set session options for better performance
-        sess_options = ort.SessionOptions()
-        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Sessions come from the process-wide registry, so a restarted
+        # detector reuses the already loaded and warmed model
+        self.session_profile = session_profile or get_session_profile()
+        self.registry = session_registry or get_session_registry()
+        self.model_path = model_path
 
         print(f"Loading ambulance model from: {model_path}")
-        print(f"Using providers: {providers}")
+        print(f"Session profile: {self.session_profile.name}")
         print(f"ONNX Runtime version: {ort.__version__}")
 
         try:
@@ -402,36 +372,36 @@ class ONNXAmbulanceDetector:
             print(
                 f"Ambulance model file size: {file_size / (1024*1024):.2f} MB")
 
-            # Try to load the model
-            print(
-                f"Loading ambulance ONNX model with providers: {providers}...")
-            self.session = ort.InferenceSession(
-                model_path, sess_options, providers=providers)
-            print(
-                f"✅ Ambulance model loaded successfully with providers: {self.session.get_providers()}")
+            loads = self.registry.stats['loads']
+            self.handle = self.registry.acquire(
+                model_path, self.session_profile, use_io_binding)
+            if self.registry.stats['loads'] > loads:
+                print(f"✅ Ambulance model loaded and warmed up in {self.handle.load_time * 1000:.0f} ms "
+                      f"with providers: {self.handle.get_providers()}")
+            else:
+                print(f"✅ Reusing warmed-up ambulance model session "
+                      f"(providers: {self.handle.get_providers()}, refs: {self.handle.refcount})")
 
-            # Get input details
-            print(f"Getting ambulance model input details...")
-            self.input_name = self.session.get_inputs()[0].name
+            self.session = self.handle.session
+            self.runner = self.handle.runner
+            self.input_name = self.handle.input_name
             # (batch, channel, height, width)
-            self.input_shape = self.session.get_inputs()[0].shape
+            self.input_shape = self.handle.input_shape
+            self.input_height = self.handle.input_height
+            self.input_width = self.handle.input_width
+            apply_input_size(self, input_size)
             print(
                 f"Ambulance input name: {self.input_name}, shape: {self.input_shape}")
 
-            # Handle dynamic input shapes
-            self.input_height = self.input_shape[2] if isinstance(
-                self.input_shape[2], int) else 640
-            self.input_width = self.input_shape[3] if isinstance(
-                self.input_shape[3], int) else 640
+            # Letterboxing is shared with every detector of the same input size
+            self.preprocessor = get_shared_preprocessor(
+                self.input_width, self.input_height)
+            # Per-thread input buffers reused across frames
+            self.input_buffers = InputBufferPool(
+                self.input_width, self.input_height)
 
-            print(f"Ambulance model input shape: {self.input_shape}")
             print(
-                f"Ambulance model output names: {[out.name for out in self.session.get_outputs()]}")
-
-            # Warm up the model
-            print(f"Warming up ambulance model...")
-            self.warmup()
-            print(f"✅ Ambulance model warmup completed")
+                f"Ambulance model output names: {self.handle.output_names}")
 
         except Exception as e:
             import traceback
@@ -444,192 +414,277 @@ class ONNXAmbulanceDetector:
         """Warm up the model with dummy input"""
         dummy_input = np.zeros(
             (1, 3, self.input_height, self.input_width), dtype=np.float32)
-        _ = self.session.run(None, {self.input_name: dummy_input})
+        _ = self.runner.run(dummy_input)
+
+    def get_preprocess_stats(self) -> Dict[str, int]:
+        """Input buffer allocation statistics"""
+        return self.input_buffers.get_stats()
+
+    def get_inference_stats(self) -> Dict[str, int]:
+        """IOBinding run statistics"""
+        return self.runner.get_stats()
+
+    def close(self):
+        """Release the model session back to the registry (it stays loaded)"""
+        if getattr(self, 'handle', None) is not None:
+            self.registry.release(self.handle)
+            self.handle = None
 
     def preprocess(self, img: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
         """
         Preprocess image for YOLO model
 
+        The returned tensor lives in this thread's reusable input buffer and
+        is overwritten by the next call.
+
         Args:
             img: Input image (BGR format)
 
         Returns:
             Tuple of (preprocessed image, ratio, (dx, dy))
         """
-        # Convert BGR to RGB
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        preprocessed = self.preprocessor(img, self.input_buffers.get())
+        return preprocessed['tensor'], preprocessed['ratio'], preprocessed['pad']
 
-        # Get image shape
-        img_height, img_width = img.shape[:2]
+    def _decode_candidates(self, outputs: List[np.ndarray],
+                           conf_thres: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Decode raw model outputs into candidate boxes above a confidence floor
 
-        # Calculate ratio for resizing
-        ratio = min(self.input_width / img_width,
-                    self.input_height / img_height)
-        new_width = int(img_width * ratio)
-        new_height = int(img_height * ratio)
+        Args:
+            outputs: Model outputs from ONNX runtime
+            conf_thres: Lowest confidence to keep
 
-        # Resize with aspect ratio
-        if (new_width, new_height) != (img_width, img_height):
-            img = cv2.resize(img, (new_width, new_height),
-                             interpolation=cv2.INTER_LINEAR)
+        Returns:
+            Tuple of (boxes [N, 4] as x1, y1, x2, y2 in model input space,
+            confidences [N]), or None if the output format is not supported
+        """
+        # Try YOLOv8/v11 format first (1x5x8400)
+        if not (len(outputs) == 1 and len(outputs[0].shape) == 3 and outputs[0].shape[0] == 1):
+            return None
+
+        # Output is 1x5x8400 where 5 = (x, y, w, h, conf)
+        # Transpose to (8400, 5) - correct format for processing
+        output = outputs[0].transpose(0, 2, 1).squeeze(0)
+
+        # Apply confidence threshold before touching the boxes
+        confidences = output[:, 4]
+        mask = confidences >= conf_thres
+        if not np.any(mask):
+            return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+
+        filtered_boxes = output[mask, :4]
+        filtered_confidences = confidences[mask]
+
+        # The coordinates are already in pixel space relative to model input (640x640)
+        # Convert center coordinates to corner coordinates
+        x_center = filtered_boxes[:, 0]
+        y_center = filtered_boxes[:, 1]
+        width = filtered_boxes[:, 2]
+        height = filtered_boxes[:, 3]
+
+        boxes_xyxy = np.column_stack([
+            x_center - width / 2,
+            y_center - height / 2,
+            x_center + width / 2,
+            y_center + height / 2
+        ])
+
+        return boxes_xyxy, filtered_confidences
+
+    def _select_detections(self, boxes_xyxy: np.ndarray, confidences: np.ndarray,
+                           conf_thres: float, ratio: float, pad: Tuple[int, int],
+                           img_shape: Tuple[int, int]) -> Detections:
+        """
+        Threshold, suppress and rescale decoded candidates
 
-        # Create a blank canvas with target size
-        canvas = np.full(
-            (self.input_height, self.input_width, 3), 114, dtype=np.uint8)
+        Args:
+            boxes_xyxy: [N, 4] candidate boxes in model input space
+            confidences: [N] candidate confidences
+            conf_thres: Confidence threshold for this selection
+            ratio: Scale ratio used in preprocessing
+            pad: Padding (dx, dy) used in preprocessing
+            img_shape: Original image shape (height, width)
+
+        Returns:
+            Ambulance detections in original image coordinates
+        """
+        mask = confidences >= conf_thres
+        if not np.any(mask):
+            return Detections.empty()
+
+        boxes_xyxy = boxes_xyxy[mask]
+        confidences = confidences[mask]
+
+        # Apply NMS in model input space
+        nms_threshold = 0.4
+        keep_indices = cv2.dnn.NMSBoxes(
+            boxes_xyxy.tolist(),
+            confidences.flatten().tolist(),
+            conf_thres,
+            nms_threshold
+        )
+
+        if len(keep_indices) == 0:
+            return Detections.empty()
+
+        # Get the filtered detections
+        if isinstance(keep_indices, tuple) or isinstance(keep_indices, list):
+            keep_indices = np.array(keep_indices).flatten()
+        else:  # numpy array
+            keep_indices = keep_indices.flatten()
+
+        # Fancy indexing copies, so the shared candidate arrays stay untouched
+        boxes_xyxy = boxes_xyxy[keep_indices]
+        confidences = confidences[keep_indices]
+
+        img_height, img_width = img_shape
+        dx, dy = pad
 
-        # Calculate padding
-        dx = (self.input_width - new_width) // 2
-        dy = (self.input_height - new_height) // 2
+        # Convert from model input space to original image space
+        # Step 1: Remove padding (subtract offset)
+        boxes_xyxy[:, [0, 2]] -= dx
+        boxes_xyxy[:, [1, 3]] -= dy
 
-        # Place the resized image on the canvas
-        canvas[dy:dy+new_height, dx:dx+new_width] = img
+        # Step 2: Scale back to original image size
+        boxes_xyxy /= ratio
 
-        # Normalize and transpose to NCHW format
-        canvas = canvas.astype(np.float32) / 255.0
-        canvas = np.transpose(canvas, (2, 0, 1))  # HWC to CHW
-        canvas = np.expand_dims(canvas, axis=0)   # Add batch dimension
+        # Clip to original image boundaries
+        boxes_xyxy[:, [0, 2]] = np.clip(boxes_xyxy[:, [0, 2]], 0, img_width)
+        boxes_xyxy[:, [1, 3]] = np.clip(boxes_xyxy[:, [1, 3]], 0, img_height)
 
-        return canvas, ratio, (dx, dy)
+        # Skip invalid boxes (zero area after clipping)
+        valid = (boxes_xyxy[:, 2] > boxes_xyxy[:, 0]) & (
+            boxes_xyxy[:, 3] > boxes_xyxy[:, 1])
+        n = int(np.count_nonzero(valid))
 
-    def detect(self, img: np.ndarray, conf_thres: float = None) -> List[Dict]:
+        # Ambulance class is 0
+        return Detections(boxes_xyxy[valid], confidences[valid],
+                          np.zeros(n, dtype=np.int32),
+                          np.full(n, FLAG_AMBULANCE, dtype=np.uint8))
+
+    def detect_candidates(self, img: np.ndarray, min_conf: float = None,
+                          preprocessed: Optional[Dict] = None) -> Optional[Dict]:
         """
-        Detect ambulances in the image
+        Run the ambulance session once and keep every decoded candidate
+
+        The result can be thresholded any number of times with
+        select_candidates() without running the model again.
 
         Args:
             img: Input image (BGR format)
-            conf_thres: Confidence threshold (overrides class default if provided)
+            min_conf: Lowest confidence worth keeping (defaults to conf_thres)
+            preprocessed: Letterboxed frame from a shared preprocessor; reused
+                when it matches this model's input size and the image shape
 
         Returns:
-            List of detections, each as a dictionary with keys:
-                - 'bbox': [x1, y1, x2, y2] in original image coordinates
-                - 'confidence': Detection confidence
-                - 'class_id': Always 0 for ambulance
-                - 'class_name': 'ambulance'
+            Dictionary with 'boxes', 'confidences', 'ratio', 'pad' and
+            'img_shape', or None if the model output format is not supported
         """
-        if conf_thres is None:
-            conf_thres = self.conf_thres
+        if min_conf is None:
+            min_conf = self.conf_thres
 
-        # Store original image shape
-        img_height, img_width = img.shape[:2]
-
-        # Preprocess image
-        img_preprocessed, ratio, (dx, dy) = self.preprocess(img)
+        # Preprocess image unless a matching letterboxed frame was supplied
+        if not self.preprocessor.matches(preprocessed, img.shape):
+            preprocessed = self.preprocessor(img, self.input_buffers.get())
 
         # Run inference
-        outputs = self.session.run(None, {self.input_name: img_preprocessed})
+        outputs = self.runner.run(preprocessed['tensor'])
+
+        decoded = self._decode_candidates(outputs, min_conf)
+        if decoded is None:
+            return None
+
+        boxes_xyxy, confidences = decoded
+        return {
+            'boxes': boxes_xyxy,
+            'confidences': confidences,
+            'ratio': preprocessed['ratio'],
+            'pad': preprocessed['pad'],
+            'img_shape': preprocessed['img_shape']
+        }
+
+    def select_candidates(self, candidates: Optional[Dict], conf_thres: float) -> Detections:
+        """
+        Produce final detections from cached candidates at a given threshold
+
+        Args:
+            candidates: Result of detect_candidates()
+            conf_thres: Confidence threshold
+
+        Returns:
+            List of detections in the same format as detect()
+        """
+        if not candidates or len(candidates['confidences']) == 0:
+            return Detections.empty()
+
+        return self._select_detections(
+            candidates['boxes'], candidates['confidences'], conf_thres,
+            candidates['ratio'], candidates['pad'], candidates['img_shape'])
+
+    def detect_multi_threshold(self, img: np.ndarray, conf_levels: List[float],
+                               preprocessed: Optional[Dict] = None) -> Dict[float, Detections]:
+        """
+        Detect ambulances at several confidence levels from a single inference
+
+        Unlike adjusting conf_thres between detect() calls, this does not
+        mutate the detector, so one instance can be shared between threads.
 
-        # Process outputs (assuming single class - ambulance)
-        detections = []
+        Args:
+            img: Input image (BGR format)
+            conf_levels: Confidence thresholds to evaluate
+            preprocessed: Optional letterboxed frame (see detect_candidates)
+
+        Returns:
+            Dictionary mapping each confidence level to its detections
+        """
+        if not conf_levels:
+            return {}
+
+        candidates = self.detect_candidates(
+            img, min(conf_levels), preprocessed)
+
+        return {
+            conf_level: self.select_candidates(candidates, conf_level)
+            for conf_level in conf_levels
+        }
+
+    def detect(self, img: np.ndarray, conf_thres: float = None,
+               preprocessed: Optional[Dict] = None) -> Detections:
+        """
+        Detect ambulances in the image
+
+        Args:
+            img: Input image (BGR format)
+            conf_thres: Confidence threshold (overrides class default if provided)
+            preprocessed: Optional letterboxed frame (see detect_candidates)
+
+        Returns:
+            Detections flagged FLAG_AMBULANCE (class id 0); to_dicts() gives
+            class_name 'ambulance'
+        """
+        if conf_thres is None:
+            conf_thres = self.conf_thres
 
         # The output format might be different, let's handle multiple formats
         try:
-            # Try YOLOv8/v11 format first (1x5x8400)
-            if len(outputs) == 1 and len(outputs[0].shape) == 3 and outputs[0].shape[0] == 1:
-                # Output is 1x5x8400 where 5 = (x, y, w, h, conf)
-                output = outputs[0]  # Get first batch (1, 5, 8400)
-
-                # Transpose to (8400, 5) - correct format for processing
-                output = output.transpose(0, 2, 1).squeeze(0)  # (1, 8400, 5)
-
-                # Extract box coordinates and confidence
-                # x_center, y_center, width, height (normalized)
-                boxes = output[:, :4]
-                confidences = output[:, 4]  # confidence scores
-
-                # Apply confidence threshold
-                mask = confidences >= conf_thres
-
-                if not np.any(mask):
-                    return []
-
-                # Filter detections
-                filtered_boxes = boxes[mask]
-                filtered_confidences = confidences[mask]
-
-                if len(filtered_boxes) == 0:
-                    return []
-
-                # The coordinates are already in pixel space relative to model input (640x640)
-                # Convert center coordinates to corner coordinates
-                x_center = filtered_boxes[:, 0]
-                y_center = filtered_boxes[:, 1]
-                width = filtered_boxes[:, 2]
-                height = filtered_boxes[:, 3]
-
-                # Convert to corner format (in model input space)
-                x1 = x_center - width / 2
-                y1 = y_center - height / 2
-                x2 = x_center + width / 2
-                y2 = y_center + height / 2
-
-                # Stack into boxes array
-                boxes_xyxy = np.column_stack([x1, y1, x2, y2])
-
-                # Apply NMS in model input space
-                nms_threshold = 0.4
-                keep_indices = cv2.dnn.NMSBoxes(
-                    boxes_xyxy.tolist(),
-                    filtered_confidences.flatten().tolist(),
-                    conf_thres,
-                    nms_threshold
-                )
-
-                if len(keep_indices) == 0:
-                    return []
-
-                # Get the filtered detections
-                if isinstance(keep_indices, tuple) or isinstance(keep_indices, list):
-                    keep_indices = np.array(keep_indices).flatten()
-                else:  # numpy array
-                    keep_indices = keep_indices.flatten()
-
-                boxes_xyxy = boxes_xyxy[keep_indices]
-                filtered_confidences = filtered_confidences[keep_indices]
-
-                if len(boxes_xyxy) > 0:
-                    print(f"Ambulance detected! {len(boxes_xyxy)} detections.")
-
-                # Convert from model input space to original image space
-                # Step 1: Remove padding (subtract offset)
-                boxes_xyxy[:, 0] -= dx  # x1
-                boxes_xyxy[:, 1] -= dy  # y1
-                boxes_xyxy[:, 2] -= dx  # x2
-                boxes_xyxy[:, 3] -= dy  # y2
-
-                # Step 2: Scale back to original image size
-                boxes_xyxy /= ratio
-
-                # Clip to original image boundaries
-                boxes_xyxy[:, [0, 2]] = np.clip(
-                    boxes_xyxy[:, [0, 2]], 0, img_width)
-                boxes_xyxy[:, [1, 3]] = np.clip(
-                    boxes_xyxy[:, [1, 3]], 0, img_height)
-
-                # Create detections
-                detections = []
-                for i in range(len(boxes_xyxy)):
-                    x1, y1, x2, y2 = boxes_xyxy[i]
-
-                    # Skip invalid boxes (zero area after clipping)
-                    if x2 <= x1 or y2 <= y1:
-                        continue
-
-                    detections.append({
-                        'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                        'confidence': float(filtered_confidences[i]),
-                        'class_id': 0,  # Ambulance class
-                        'class_name': 'ambulance'
-                    })
-
-                return detections
+            candidates = self.detect_candidates(
+                img, conf_thres, preprocessed)
 
             # Handle other output formats if needed
-            else:
-                return []
+            if candidates is None:
+                return Detections.empty()
+
+            detections = self.select_candidates(candidates, conf_thres)
+
+            if len(detections) > 0:
+                print(f"Ambulance detected! {len(detections)} detections.")
+
+            return detections
 
         except Exception as e:
             print(f"Error processing detections: {str(e)}")
-            return []
+            return Detections.empty()
 
 
 def test_onnx_detection():
@@ -688,12 +743,18 @@ def test_onnx_detection():
         # Make a copy for display
         display_frame = frame.copy()
 
+        # Letterbox once; both detectors reuse it when input shapes match
+        preprocessed = vehicle_detector.preprocessor(
+            frame, vehicle_detector.input_buffers.get())
+
         # Run vehicle detection
-        vehicle_detections = vehicle_detector.detect(frame)
+        vehicle_detections = vehicle_detector.detect(
+            frame, preprocessed=preprocessed)
 
         # Run ambulance detection
         start_inference = time.time()
-        ambulance_detections = ambulance_detector.detect(frame)
+        ambulance_detections = ambulance_detector.detect(
+            frame, preprocessed=preprocessed)
         inference_time = (time.time() - start_inference) * 1000  # in ms
 
         # Update detection history
@@ -712,7 +773,7 @@ def test_onnx_detection():
             last_ambulance_time = time.time()
 
         # Draw vehicle detections (semi-transparent)
-        for det in vehicle_detections:
+        for det in vehicle_detections.to_dicts():
             x1, y1, x2, y2 = map(int, det['bbox'])
             conf = det['confidence']
             class_name = det.get('class_name', 'vehicle')
@@ -738,7 +799,7 @@ def test_onnx_detection():
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_BLACK, 2)
 
         # Draw ambulance detections with enhanced visualization
-        for det in ambulance_detections:
+        for det in ambulance_detections.to_dicts():
             x1, y1, x2, y2 = map(int, det['bbox'])
             conf = det['confidence']
 
@@ -0,0 +1,273 @@
+"""
+Shared letterbox preprocessing for the ONNX detectors
+"""
+import cv2
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional
+
+# Grey value used by YOLO for letterbox padding
+LETTERBOX_PAD_VALUE = 114
+
+
+@lru_cache(maxsize=32)
+def letterbox_geometry(img_width: int, img_height: int,
+                       input_width: int, input_height: int) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+    """
+    Compute letterbox geometry for a source resolution
+
+    Frames from one camera share a resolution, so the result is cached.
+
+    Args:
+        img_width: Source image width
+        img_height: Source image height
+        input_width: Model input width
+        input_height: Model input height
+
+    Returns:
+        Tuple of (ratio, (new_width, new_height), (dx, dy))
+    """
+    # Calculate ratio for resizing
+    ratio = min(input_width / img_width, input_height / img_height)
+    new_width = int(img_width * ratio)
+    new_height = int(img_height * ratio)
+
+    # Calculate padding
+    dx = (input_width - new_width) // 2
+    dy = (input_height - new_height) // 2
+
+    return ratio, (new_width, new_height), (dx, dy)
+
+
+class PreprocessBuffers:
+    """Reusable letterbox canvas and input tensor for one detector thread"""
+
+    def __init__(self, input_width: int = 640, input_height: int = 640):
+        """
+        Allocate input buffers
+
+        Args:
+            input_width: Model input width
+            input_height: Model input height
+        """
+        self.input_width = input_width
+        self.input_height = input_height
+
+        self.canvas = np.full(
+            (input_height, input_width, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+        self.tensor = np.empty((1, 3, input_height, input_width), dtype=np.float32)
+
+        # Geometry the canvas padding currently matches
+        self.geometry = None
+
+        self.stats = {
+            'frames': 0,
+            'allocations': 2,
+            'allocated_bytes': self.canvas.nbytes + self.tensor.nbytes,
+            'geometry_changes': 0
+        }
+
+    def prepare(self, geometry: Tuple[float, Tuple[int, int], Tuple[int, int]]) -> np.ndarray:
+        """
+        Get the canvas region the resized image has to be written into
+
+        The padding is only repainted when the letterbox geometry changes,
+        i.e. when the source resolution changes.
+        """
+        if geometry != self.geometry:
+            self.canvas.fill(LETTERBOX_PAD_VALUE)
+            self.geometry = geometry
+            self.stats['geometry_changes'] += 1
+
+        _, (new_width, new_height), (dx, dy) = geometry
+        return self.canvas[dy:dy+new_height, dx:dx+new_width]
+
+
+class InputBufferPool:
+    """Per-thread PreprocessBuffers, so a detector stays safe to share between threads"""
+
+    def __init__(self, input_width: int = 640, input_height: int = 640):
+        self.input_width = input_width
+        self.input_height = input_height
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buffers: List[PreprocessBuffers] = []
+
+    def get(self) -> PreprocessBuffers:
+        """Buffers owned by the calling thread"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = PreprocessBuffers(self.input_width, self.input_height)
+            self._local.buffers = buffers
+            with self._lock:
+                self._buffers.append(buffers)
+        return buffers
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Allocation statistics summed over all threads
+
+        In steady state 'allocations' stays constant while 'frames' grows.
+        """
+        with self._lock:
+            buffers = list(self._buffers)
+
+        stats = {
+            'threads': len(buffers),
+            'frames': 0,
+            'allocations': 0,
+            'allocated_bytes': 0,
+            'geometry_changes': 0
+        }
+        for buf in buffers:
+            for key, value in buf.stats.items():
+                stats[key] += value
+        return stats
+
+
+class LetterboxPreprocessor:
+    """Turns BGR frames into NCHW float tensors for one model input size"""
+
+    def __init__(self, input_width: int = 640, input_height: int = 640):
+        """
+        Initialize letterbox preprocessor
+
+        Args:
+            input_width: Model input width
+            input_height: Model input height
+        """
+        self.input_width = input_width
+        self.input_height = input_height
+
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        """Model input size as (width, height)"""
+        return (self.input_width, self.input_height)
+
+    def geometry(self, img_shape: Tuple[int, ...]) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+        """Letterbox geometry for an image of the given (height, width, ...) shape"""
+        img_height, img_width = img_shape[:2]
+        return letterbox_geometry(img_width, img_height,
+                                  self.input_width, self.input_height)
+
+    def __call__(self, img: np.ndarray, buffers: Optional[PreprocessBuffers] = None) -> Dict:
+        """
+        Letterbox an image
+
+        Args:
+            img: Input image (BGR format)
+            buffers: Reusable buffers to write into. The returned tensor is
+                then a view of buffers.tensor and is overwritten by the next
+                call with the same buffers.
+
+        Returns:
+            Dictionary with keys:
+                - 'tensor': (1, 3, H, W) float32 RGB tensor in [0, 1]
+                - 'ratio': Scale ratio
+                - 'pad': Padding (dx, dy)
+                - 'img_shape': Original image shape (height, width)
+                - 'input_size': Model input size (width, height)
+        """
+        geometry = self.geometry(img.shape)
+        ratio, (new_width, new_height), (dx, dy) = geometry
+        img_height, img_width = img.shape[:2]
+
+        if buffers is not None:
+            tensor = self._letterbox_into(img, geometry, buffers)
+        else:
+            tensor = self._letterbox(img, geometry)
+
+        return {
+            'tensor': tensor,
+            'ratio': ratio,
+            'pad': (dx, dy),
+            'img_shape': (img_height, img_width),
+            'input_size': self.input_size
+        }
+
+    def _letterbox(self, img: np.ndarray, geometry) -> np.ndarray:
+        """Allocating letterbox path"""
+        _, (new_width, new_height), (dx, dy) = geometry
+        img_height, img_width = img.shape[:2]
+
+        # Resize with aspect ratio. Resizing is per-channel, so the BGR->RGB
+        # swap is deferred to the much smaller canvas.
+        if (new_width, new_height) != (img_width, img_height):
+            img = cv2.resize(img, (new_width, new_height),
+                             interpolation=cv2.INTER_LINEAR)
+
+        # Create a blank canvas with target size
+        canvas = np.full(
+            (self.input_height, self.input_width, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+
+        # Place the resized image on the canvas
+        canvas[dy:dy+new_height, dx:dx+new_width] = img
+
+        # Convert BGR to RGB, normalize and transpose to NCHW format
+        canvas = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB)
+        tensor = canvas.astype(np.float32) / 255.0
+        tensor = np.transpose(tensor, (2, 0, 1))  # HWC to CHW
+        tensor = np.expand_dims(tensor, axis=0)   # Add batch dimension
+
+        return tensor
+
+    def _letterbox_into(self, img: np.ndarray, geometry, buffers: PreprocessBuffers) -> np.ndarray:
+        """Zero-allocation letterbox path writing into preallocated buffers"""
+        _, (new_width, new_height), _ = geometry
+        img_height, img_width = img.shape[:2]
+
+        # Resize straight into the canvas region
+        region = buffers.prepare(geometry)
+        if (new_width, new_height) != (img_width, img_height):
+            cv2.resize(img, (new_width, new_height), dst=region,
+                       interpolation=cv2.INTER_LINEAR)
+        else:
+            np.copyto(region, img)
+
+        # BGR->RGB, HWC->CHW and normalisation in one pass per channel
+        canvas = buffers.canvas
+        tensor = buffers.tensor
+        for channel in range(3):
+            np.divide(canvas[:, :, 2 - channel], np.float32(255.0),
+                      out=tensor[0, channel])
+
+        buffers.stats['frames'] += 1
+        return tensor
+
+    def matches(self, preprocessed: Optional[Dict], img_shape: Tuple[int, ...] = None) -> bool:
+        """
+        Check whether a preprocessed frame can be fed to this preprocessor's model
+
+        Args:
+            preprocessed: Result of a LetterboxPreprocessor call
+            img_shape: Shape of the image the caller is about to detect on
+
+        Returns:
+            True if the input size (and image shape, if given) match
+        """
+        if not preprocessed:
+            return False
+        if tuple(preprocessed['input_size']) != self.input_size:
+            return False
+        if img_shape is not None and tuple(preprocessed['img_shape']) != tuple(img_shape[:2]):
+            return False
+        return True
+
+
+# Preprocessors shared by every detector with the same input size
+_shared_preprocessors: Dict[Tuple[int, int], LetterboxPreprocessor] = {}
+
+
+def get_shared_preprocessor(input_width: int, input_height: int) -> LetterboxPreprocessor:
+    """
+    Get the process-wide preprocessor for a model input size
+
+    Detectors with matching input shapes get the same instance, so one
+    letterboxed frame can be handed to several sessions.
+    """
+    key = (input_width, input_height)
+    if key not in _shared_preprocessors:
+        _shared_preprocessors[key] = LetterboxPreprocessor(
+            input_width, input_height)
+    return _shared_preprocessors[key]
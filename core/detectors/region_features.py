@@ -0,0 +1,114 @@
+"""
+Shared colour-space intermediates for the ambulance feature detectors
+
+A RegionColorStats wraps one vehicle ROI and converts it to HSV and to
+grayscale at most once, however many feature detectors read it. Colour bins
+(HSV ranges with cv2.inRange semantics) are evaluated together: a per-channel
+lookup table maps each pixel to a bitmask of the bins it falls in, so one
+np.bincount over the bitmasks yields the pixel count of every bin.
+"""
+import cv2
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+# HSV ranges (inclusive, OpenCV 8-bit HSV: H 0-179, S and V 0-255)
+COLOR_BINS: Dict[str, Tuple[Sequence[int], Sequence[int]]] = {
+    # Medical cross
+    'cross_red': ([0, 70, 70], [10, 255, 255]),
+    'cross_red2': ([170, 70, 70], [180, 255, 255]),
+    # Emergency colour patterns
+    'bright_red': ([0, 120, 120], [10, 255, 255]),
+    'bright_red2': ([170, 120, 120], [180, 255, 255]),
+    'bright_blue': ([100, 120, 120], [130, 255, 255]),
+    'white': ([0, 0, 180], [180, 30, 255]),
+    'bright_yellow': ([20, 120, 120], [30, 255, 255]),
+    'orange': ([10, 120, 120], [20, 255, 255]),
+}
+
+BIN_NAMES = list(COLOR_BINS)
+BIN_BITS = {name: 1 << i for i, name in enumerate(BIN_NAMES)}
+
+
+def _build_lookup_tables() -> np.ndarray:
+    """[1, 256, 3] uint8 LUT: bit i of channel c is set if the value is inside bin i on c"""
+    lut = np.zeros((256, 3), dtype=np.uint8)
+    values = np.arange(256)
+    for name, (lower, upper) in COLOR_BINS.items():
+        for channel in range(3):
+            inside = (values >= lower[channel]) & (values <= upper[channel])
+            lut[inside, channel] |= BIN_BITS[name]
+    return lut.reshape(1, 256, 3)
+
+
+BIN_LUT = _build_lookup_tables()
+# [256, num_bins]: which bins each bitmask value belongs to
+BIN_MEMBERSHIP = ((np.arange(256)[:, None] >> np.arange(len(BIN_NAMES))) & 1).astype(np.int64)
+
+
+class RegionColorStats:
+    """
+    Lazily computed, shared intermediates of one ROI
+
+    Only what a detector asks for is computed, and each piece only once.
+    """
+
+    def __init__(self, region: np.ndarray):
+        """
+        Initialize from a BGR region
+
+        Args:
+            region: [H, W, 3] BGR ROI (not modified)
+        """
+        self.region = region
+        self.shape = region.shape[:2]
+        self.num_pixels = region.shape[0] * region.shape[1]
+        self._hsv = None
+        self._gray = None
+        self._codes = None
+        self._bin_counts = None
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV conversion of the region"""
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.region, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale conversion of the region"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.region, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def value(self) -> np.ndarray:
+        """V channel of the HSV conversion (a view)"""
+        return self.hsv[:, :, 2]
+
+    @property
+    def codes(self) -> np.ndarray:
+        """[H, W] uint8 bitmask of the colour bins each pixel falls in"""
+        if self._codes is None:
+            h_bits, s_bits, v_bits = cv2.split(cv2.LUT(self.hsv, BIN_LUT))
+            self._codes = cv2.bitwise_and(cv2.bitwise_and(h_bits, s_bits), v_bits)
+        return self._codes
+
+    def mask(self, *names: str) -> np.ndarray:
+        """uint8 mask (0/255) of pixels in any of the named bins, like cv2.inRange"""
+        bits = 0
+        for name in names:
+            bits |= BIN_BITS[name]
+        return cv2.compare(cv2.bitwise_and(self.codes, bits), 0, cv2.CMP_GT)
+
+    def bin_counts(self) -> Dict[str, int]:
+        """Pixel count of every colour bin, from one pass over the bitmasks"""
+        if self._bin_counts is None:
+            histogram = np.bincount(self.codes.ravel(), minlength=256)
+            counts = histogram @ BIN_MEMBERSHIP
+            self._bin_counts = dict(zip(BIN_NAMES, counts.tolist()))
+        return self._bin_counts
+
+    def fractions(self) -> Dict[str, float]:
+        """Fraction of the region's pixels in every colour bin"""
+        return {name: count / self.num_pixels for name, count in self.bin_counts().items()}
@@ -0,0 +1,282 @@
+"""
+ONNX Runtime session profiles
+
+A profile bundles the session options for one deployment scenario: thread
+counts, the process-wide shared thread pool, spin-wait policy, memory arena
+and pattern options and the execution provider order. Profiles are selected
+in the `onnxruntime` section of config/detection_config.yaml:
+
+    detection:
+      onnxruntime:
+        profile: latency          # default, latency, throughput, low_power
+        intra_op_num_threads: 4   # any preset value can be overridden
+"""
+import os
+import threading
+import cv2
+import onnxruntime as ort
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.config.detection_config import get_detection_setting
+
+DEFAULT_PROVIDERS = ['CUDAExecutionProvider', 'CPUExecutionProvider']
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def _physical_cores() -> int:
+    """Best guess at the number of physical cores"""
+    logical = os.cpu_count() or 1
+    # Assume SMT on machines with more than a handful of logical cores
+    return max(1, logical // 2) if logical > 4 else logical
+
+
+# Named presets. 0 threads means "let ONNX Runtime decide".
+SESSION_PRESETS: Dict[str, Dict[str, Any]] = {
+    # Historical behaviour: ORT defaults, one thread pool per session
+    'default': {},
+    # One frame at a time as fast as possible: both sessions share a pool
+    # sized to the physical cores and keep their threads spinning between runs
+    'latency': {
+        'intra_op_num_threads': _physical_cores(),
+        'inter_op_num_threads': 1,
+        'shared_thread_pool': True,
+        'allow_spinning': True,
+        'use_io_binding': True,
+        'opencv_threads': 1,
+    },
+    # Several streams in parallel: a shared pool, no spinning so idle
+    # threads do not steal cores from the other streams
+    'throughput': {
+        'intra_op_num_threads': _physical_cores(),
+        'inter_op_num_threads': 1,
+        'shared_thread_pool': True,
+        'allow_spinning': False,
+        'use_io_binding': True,
+        'opencv_threads': 2,
+    },
+    # Edge devices / laptops on battery: few threads, no spinning, no arena
+    'low_power': {
+        'intra_op_num_threads': 2,
+        'inter_op_num_threads': 1,
+        'shared_thread_pool': True,
+        'allow_spinning': False,
+        'enable_cpu_mem_arena': False,
+        'use_io_binding': True,
+        'providers': ['CPUExecutionProvider'],
+        'opencv_threads': 1,
+    },
+}
+
+# Sizes of the process-wide ONNX Runtime thread pool, once created
+_global_thread_pool: Optional[Tuple[int, int]] = None
+_global_thread_pool_lock = threading.Lock()
+
+
+class SessionProfile:
+    """ONNX Runtime session settings shared by the vehicle and ambulance detectors"""
+
+    def __init__(self, name: str = 'default',
+                 intra_op_num_threads: int = 0,
+                 inter_op_num_threads: int = 0,
+                 shared_thread_pool: bool = False,
+                 allow_spinning: Optional[bool] = None,
+                 enable_cpu_mem_arena: bool = True,
+                 enable_mem_pattern: bool = True,
+                 execution_mode: str = 'sequential',
+                 graph_optimization_level: str = 'all',
+                 providers: Optional[List[str]] = None,
+                 use_io_binding: bool = False,
+                 opencv_threads: Optional[int] = None):
+        """
+        Initialize session profile
+
+        Args:
+            name: Profile name (for logging)
+            intra_op_num_threads: Threads inside one operator (0 = ORT default)
+            inter_op_num_threads: Threads across operators (0 = ORT default)
+            shared_thread_pool: Use one process-wide thread pool for every
+                session instead of one pool per session
+            allow_spinning: Keep pool threads spinning between runs
+                (None = ORT default)
+            enable_cpu_mem_arena: Use the CPU memory arena
+            enable_mem_pattern: Preallocate memory based on recorded patterns
+            execution_mode: 'sequential' or 'parallel'
+            graph_optimization_level: 'disable', 'basic', 'extended' or 'all'
+            providers: Execution providers in order of preference
+            use_io_binding: Run through IOBinding with reusable output buffers
+            opencv_threads: cv2.setNumThreads value (None leaves OpenCV alone)
+        """
+        if execution_mode not in _EXECUTION_MODES:
+            raise ValueError(
+                f"Unknown execution_mode '{execution_mode}', expected one of {list(_EXECUTION_MODES)}")
+        if graph_optimization_level not in _GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(
+                f"Unknown graph_optimization_level '{graph_optimization_level}', "
+                f"expected one of {list(_GRAPH_OPTIMIZATION_LEVELS)}")
+
+        self.name = name
+        self.intra_op_num_threads = int(intra_op_num_threads)
+        self.inter_op_num_threads = int(inter_op_num_threads)
+        self.shared_thread_pool = bool(shared_thread_pool)
+        self.allow_spinning = allow_spinning
+        self.enable_cpu_mem_arena = bool(enable_cpu_mem_arena)
+        self.enable_mem_pattern = bool(enable_mem_pattern)
+        self.execution_mode = execution_mode
+        self.graph_optimization_level = graph_optimization_level
+        self.providers = list(providers) if providers else list(DEFAULT_PROVIDERS)
+        self.use_io_binding = bool(use_io_binding)
+        self.opencv_threads = opencv_threads
+
+    @classmethod
+    def from_preset(cls, preset: str, **overrides) -> 'SessionProfile':
+        """
+        Build a profile from a named preset
+
+        Args:
+            preset: One of SESSION_PRESETS
+            **overrides: Values replacing the preset's
+
+        Returns:
+            SessionProfile
+        """
+        if preset not in SESSION_PRESETS:
+            raise ValueError(
+                f"Unknown session profile '{preset}', expected one of {list(SESSION_PRESETS)}")
+        settings = dict(SESSION_PRESETS[preset])
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(name=preset, **settings)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'SessionProfile':
+        """
+        Build a profile from the `onnxruntime` config section
+
+        Args:
+            config: Dictionary with an optional 'profile' preset name plus
+                overrides for any SessionProfile argument
+
+        Returns:
+            SessionProfile
+        """
+        config = dict(config or {})
+        preset = config.pop('profile', 'default') or 'default'
+        return cls.from_preset(preset, **config)
+
+    def available_providers(self) -> List[str]:
+        """Configured providers that this ONNX Runtime build supports, CPU always last"""
+        available = ort.get_available_providers()
+        providers = [p for p in self.providers if p in available]
+        if 'CPUExecutionProvider' not in providers:
+            providers.append('CPUExecutionProvider')
+        return providers
+
+    def session_options(self) -> ort.SessionOptions:
+        """Create SessionOptions for this profile"""
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[
+            self.graph_optimization_level]
+        sess_options.execution_mode = _EXECUTION_MODES[self.execution_mode]
+        sess_options.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        sess_options.enable_mem_pattern = self.enable_mem_pattern
+
+        if self.shared_thread_pool:
+            self._ensure_global_thread_pool()
+
+        if _global_thread_pool is not None:
+            # Once the process-wide pool exists every session has to use it
+            sess_options.use_per_session_threads = False
+        else:
+            sess_options.intra_op_num_threads = self.intra_op_num_threads
+            sess_options.inter_op_num_threads = self.inter_op_num_threads
+
+        if self.allow_spinning is not None:
+            spinning = '1' if self.allow_spinning else '0'
+            sess_options.add_session_config_entry(
+                'session.intra_op.allow_spinning', spinning)
+            sess_options.add_session_config_entry(
+                'session.inter_op.allow_spinning', spinning)
+
+        return sess_options
+
+    def apply_process_settings(self):
+        """Apply process-wide settings that are not part of a session (OpenCV threads)"""
+        if self.opencv_threads is not None:
+            cv2.setNumThreads(int(self.opencv_threads))
+
+    def _ensure_global_thread_pool(self):
+        """Create the process-wide thread pool on first use"""
+        global _global_thread_pool
+
+        requested = (self.intra_op_num_threads, self.inter_op_num_threads)
+        with _global_thread_pool_lock:
+            if _global_thread_pool is None:
+                ort.set_global_thread_pool_sizes(*requested)
+                _global_thread_pool = requested
+                print(f"Created shared ONNX Runtime thread pool "
+                      f"(intra={requested[0]}, inter={requested[1]})")
+            elif _global_thread_pool != requested:
+                # The pool can only be created once per process
+                print(f"⚠️ Shared thread pool already sized {_global_thread_pool}, "
+                      f"ignoring profile '{self.name}' request for {requested}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Profile settings as a dictionary (for logging and the dashboard)"""
+        return {
+            'name': self.name,
+            'intra_op_num_threads': self.intra_op_num_threads,
+            'inter_op_num_threads': self.inter_op_num_threads,
+            'shared_thread_pool': self.shared_thread_pool,
+            'allow_spinning': self.allow_spinning,
+            'enable_cpu_mem_arena': self.enable_cpu_mem_arena,
+            'enable_mem_pattern': self.enable_mem_pattern,
+            'execution_mode': self.execution_mode,
+            'graph_optimization_level': self.graph_optimization_level,
+            'providers': list(self.providers),
+            'use_io_binding': self.use_io_binding,
+            'opencv_threads': self.opencv_threads,
+        }
+
+    def cache_key(self) -> Tuple:
+        """Hashable identity of the settings a session is created with"""
+        settings = self.to_dict()
+        # Not part of the session itself
+        for name in ('name', 'use_io_binding', 'opencv_threads'):
+            del settings[name]
+        settings['providers'] = tuple(settings['providers'])
+        return tuple(sorted(settings.items()))
+
+
+_configured_profile: Optional[SessionProfile] = None
+
+
+def get_session_profile(reload: bool = False) -> SessionProfile:
+    """
+    Get the session profile configured in config/detection_config.yaml
+
+    The profile's process-wide settings are applied the first time it is
+    loaded.
+    """
+    global _configured_profile
+
+    if _configured_profile is None or reload:
+        try:
+            profile = SessionProfile.from_config(
+                get_detection_setting('onnxruntime', {}))
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ Invalid onnxruntime settings ({e}), using default profile")
+            profile = SessionProfile()
+        profile.apply_process_settings()
+        _configured_profile = profile
+
+    return _configured_profile
@@ -0,0 +1,229 @@
+"""
+Process-wide registry of warmed-up ONNX Runtime sessions
+
+Loading and warming a model takes seconds, while the detector state built on
+top of it (tracker, counters, temporal history) is cheap. Detectors acquire
+their sessions here, keyed by model path, session profile and IOBinding
+setting, so a restarted detector gets the already-warmed session back instead
+of reloading the model. Handles are reference counted; released handles stay
+loaded until evict() or clear() is called.
+"""
+import os
+import time
+import threading
+import numpy as np
+import onnxruntime as ort
+from typing import Dict, List, Optional, Tuple
+
+from .session_profiles import SessionProfile
+from .io_binding import BoundSession
+
+
+class SessionHandle:
+    """A loaded, warmed-up model session shared by every detector using it"""
+
+    def __init__(self, key: Tuple, model_path: str, profile: SessionProfile,
+                 use_io_binding: bool):
+        """
+        Load and warm up the model
+
+        Args:
+            key: Registry key of this handle
+            model_path: Normalized path to the ONNX model
+            profile: Session profile the session is created with
+            use_io_binding: Run through IOBinding with reusable output buffers
+        """
+        self.key = key
+        self.model_path = model_path
+        self.profile = profile
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+
+        start = time.perf_counter()
+        self.session = ort.InferenceSession(
+            model_path, profile.session_options(),
+            providers=profile.available_providers())
+
+        self.input_name = self.session.get_inputs()[0].name
+        # (batch, channel, height, width)
+        self.input_shape = self.session.get_inputs()[0].shape
+        self.output_names = [out.name for out in self.session.get_outputs()]
+
+        # Handle dynamic input shapes
+        self.input_height = self.input_shape[2] if isinstance(
+            self.input_shape[2], int) else 640
+        self.input_width = self.input_shape[3] if isinstance(
+            self.input_shape[3], int) else 640
+
+        # Session.run() or IOBinding with reusable output buffers
+        self.runner = BoundSession(self.session, self.input_name, use_io_binding)
+
+        self.warmup()
+        self.load_time = time.perf_counter() - start
+
+        self.refcount = 0
+        self.acquisitions = 0
+        self.last_released = None
+
+    def warmup(self):
+        """Warm up the model with dummy input"""
+        dummy_input = np.zeros(
+            (1, 3, self.input_height, self.input_width), dtype=np.float32)
+        _ = self.runner.run(dummy_input)
+
+    def get_providers(self) -> List[str]:
+        """Providers the session actually runs on"""
+        return self.session.get_providers()
+
+    def to_dict(self) -> Dict:
+        """Handle state (for logging and the dashboard)"""
+        return {
+            'model_path': self.model_path,
+            'profile': self.profile.name,
+            'io_binding': self.runner.enabled,
+            'refcount': self.refcount,
+            'acquisitions': self.acquisitions,
+            'load_time_ms': self.load_time * 1000,
+            'idle_seconds': (time.time() - self.last_released
+                             if self.refcount == 0 and self.last_released else 0.0)
+        }
+
+
+class SessionRegistry:
+    """Reference-counted cache of SessionHandles"""
+
+    def __init__(self):
+        self._handles: Dict[Tuple, SessionHandle] = {}
+        self._lock = threading.RLock()
+        self.stats = {
+            'loads': 0,
+            'hits': 0,
+            'releases': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def make_key(model_path: str, profile: SessionProfile, use_io_binding: bool) -> Tuple:
+        """Registry key: normalized absolute model path, profile settings, IOBinding"""
+        path = os.path.normcase(os.path.abspath(os.path.normpath(model_path)))
+        return (path, profile.cache_key(), bool(use_io_binding))
+
+    def acquire(self, model_path: str, profile: SessionProfile,
+                use_io_binding: Optional[bool] = None) -> SessionHandle:
+        """
+        Get a warmed-up session, loading the model on first use
+
+        Every acquire() must be paired with a release().
+
+        Args:
+            model_path: Path to the ONNX model
+            profile: Session profile
+            use_io_binding: Use IOBinding (defaults to the profile's setting)
+
+        Returns:
+            SessionHandle
+        """
+        if use_io_binding is None:
+            use_io_binding = profile.use_io_binding
+        key = self.make_key(model_path, profile, use_io_binding)
+
+        # Loading under the lock keeps two detectors from loading the same model
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = SessionHandle(key, os.path.normpath(model_path),
+                                       profile, use_io_binding)
+                self._handles[key] = handle
+                self.stats['loads'] += 1
+            else:
+                self.stats['hits'] += 1
+            handle.refcount += 1
+            handle.acquisitions += 1
+            return handle
+
+    def release(self, handle: Optional[SessionHandle]):
+        """
+        Drop one reference to a handle
+
+        The session stays loaded (and warm) for the next acquire().
+        """
+        if handle is None:
+            return
+        with self._lock:
+            if handle.refcount <= 0:
+                return
+            handle.refcount -= 1
+            self.stats['releases'] += 1
+            if handle.refcount == 0:
+                handle.last_released = time.time()
+
+    def evict(self, model_path: Optional[str] = None,
+              profile: Optional[SessionProfile] = None,
+              idle_seconds: Optional[float] = None,
+              force: bool = False) -> int:
+        """
+        Unload cached sessions
+
+        Args:
+            model_path: Only evict sessions of this model (None = all models)
+            profile: Only evict sessions created with this profile
+            idle_seconds: Only evict sessions released at least this long ago
+            force: Also evict sessions that are still referenced; detectors
+                holding them keep working but the session is no longer shared
+
+        Returns:
+            Number of evicted sessions
+        """
+        now = time.time()
+        path = (os.path.normcase(os.path.abspath(os.path.normpath(model_path)))
+                if model_path else None)
+        profile_key = profile.cache_key() if profile is not None else None
+
+        with self._lock:
+            evicted = []
+            for key, handle in self._handles.items():
+                if path is not None and key[0] != path:
+                    continue
+                if profile_key is not None and key[1] != profile_key:
+                    continue
+                if handle.refcount > 0 and not force:
+                    continue
+                if (idle_seconds is not None and handle.refcount == 0
+                        and now - (handle.last_released or now) < idle_seconds):
+                    continue
+                evicted.append(key)
+
+            for key in evicted:
+                del self._handles[key]
+            self.stats['evictions'] += len(evicted)
+            return len(evicted)
+
+    def clear(self) -> int:
+        """Unload every cached session, referenced or not"""
+        return self.evict(force=True)
+
+    def get_stats(self) -> Dict:
+        """Load/hit counters and the state of every cached session"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['sessions'] = [handle.to_dict()
+                                 for handle in self._handles.values()]
+            return stats
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+_default_registry: Optional[SessionRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """Get the process-wide session registry"""
+    global _default_registry
+
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = SessionRegistry()
+        return _default_registry
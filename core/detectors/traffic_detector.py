@@ -18,6 +18,19 @@ import argparse
 
 # Import our ONNX-based detectors
 from .onnx_detector import ONNXYOLODetector, ONNXAmbulanceDetector
+from .session_profiles import get_session_profile
+from shared.config.detection_config import get_detection_setting
+from .detections import Detections, FLAG_AMBULANCE, FLAG_FALLBACK, FLAG_RESCUED
+from .nms import nms_numpy
+from .lane_mask import LaneMaskRaster
+from .zone_counter import parse_zones
+from .frame_buffers import CopyCounter, FrameBufferRing, FrameHistory
+from .feature_cache import TrackFeatureCache, box_iou
+from .region_features import RegionColorStats
+from .feature_cascade import FeatureCascade
+from .ambulance_schedule import AmbulanceScheduler
+from ..trackers.counting import parse_count_lines
+from ..trackers.bytetrack import ByteTrackVehicleTracker, create_tracker
 
 # Set up logging
 logging.basicConfig(
@@ -65,307 +78,6 @@ VEHICLE_COLORS = {
 }
 
 
-class ONNXVehicleTracker:
-    """Improved vehicle tracking system using ONNX models"""
-
-    def __init__(self, max_disappeared: int = 30, max_distance: float = 100):
-        """Initialize tracker"""
-        self.next_id = 0
-        # {id: {'bbox': [x1,y1,x2,y2], 'class': 'car', 'confidence': 0.8, 'history': []}}
-        self.objects = {}
-        self.disappeared = {}  # {id: frames_disappeared}
-        self.max_disappeared = max_disappeared
-        self.max_distance = max_distance
-
-        # Enhanced smoothing parameters
-        self.smoothing_factor = 0.65
-        self.history_length = 7
-
-        # For counting unique vehicles
-        self.counted_vehicles = set()
-        self.total_count = 0
-
-        # For trajectory visualization
-        self.trajectory_points = {}
-        self.max_trajectory_length = 20
-
-        # Line crossing detection (legacy - kept for backward compatibility)
-        self.crossed_ids = set()
-        self.line_y = None
-
-        # Zone-based counting (new approach)
-        self.counted_ids = set()  # IDs that have been counted
-        self.zone_entry_positions = {}  # {id: entry_y_position}
-        self.min_movement_to_count = 50  # Minimum pixels moved through zone to count
-
-        # Color palette for tracks
-        self.color_palette = [
-            (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
-            (255, 0, 255), (0, 255, 255), (128, 0, 128), (255, 165, 0),
-            (0, 128, 255), (255, 20, 147), (34, 139, 34), (255, 140, 0)
-        ]
-        self.track_colors = {}
-
-    def update(self, detections: List[Dict]):
-        """Update tracker with new detections"""
-        if len(detections) == 0:
-            # No detections, mark all as disappeared
-            for object_id in list(self.disappeared.keys()):
-                self.disappeared[object_id] += 1
-                if self.disappeared[object_id] > self.max_disappeared:
-                    self._deregister(object_id)
-            return self.objects
-
-        # Initialize arrays for tracking
-        if len(self.objects) == 0:
-            # First frame, register all detections
-            for det in detections:
-                self._register(det)
-        else:
-            # Match detections to existing objects
-            object_ids = list(self.objects.keys())
-            object_centers = [
-                self._get_center(self.objects[obj_id]['bbox'])
-                for obj_id in object_ids
-            ]
-
-            # Calculate distances between objects and detections
-            detection_centers = [self._get_center(
-                det['bbox']) for det in detections]
-
-            # Simple nearest neighbor matching
-            matched_detections = set()
-            matched_objects = set()
-
-            for i, obj_id in enumerate(object_ids):
-                if obj_id in matched_objects:
-                    continue
-
-                obj_center = object_centers[i]
-                min_dist = float('inf')
-                best_match = -1
-
-                for j, det_center in enumerate(detection_centers):
-                    if j in matched_detections:
-                        continue
-
-                    dist = np.linalg.norm(
-                        np.array(obj_center) - np.array(det_center))
-                    if dist < min_dist and dist < self.max_distance:
-                        min_dist = dist
-                        best_match = j
-
-                if best_match != -1:
-                    # Update existing object
-                    obj_id = object_ids[i]
-                    det = detections[best_match]
-
-                    # Smooth the bounding box
-                    old_bbox = self.objects[obj_id]['bbox']
-                    new_bbox = det['bbox']
-                    smoothed_bbox = self._smooth_bbox(old_bbox, new_bbox)
-
-                    # Update object
-                    self.objects[obj_id].update({
-                        'bbox': smoothed_bbox,
-                        'class': det.get('class_name', 'vehicle'),
-                        'confidence': det['confidence']
-                    })
-
-                    # Reset disappeared counter
-                    self.disappeared[obj_id] = 0
-
-                    # Update trajectory
-                    self._update_trajectory(obj_id, smoothed_bbox)
-
-                    matched_detections.add(best_match)
-                    matched_objects.add(obj_id)
-
-            # Handle unmatched detections (new objects)
-            for i, det in enumerate(detections):
-                if i not in matched_detections:
-                    self._register(det)
-
-            # Handle disappeared objects
-            for obj_id in list(self.objects.keys()):
-                if obj_id not in matched_objects:
-                    self.disappeared[obj_id] += 1
-                    if self.disappeared[obj_id] > self.max_disappeared:
-                        self._deregister(obj_id)
-
-        return self.objects
-
-    def _register(self, detection: Dict):
-        """Register a new object"""
-        object_id = self.next_id
-        self.next_id += 1
-
-        self.objects[object_id] = {
-            'bbox': detection['bbox'].copy(),
-            'class': detection.get('class_name', 'vehicle'),
-            'confidence': detection['confidence'],
-            'history': [detection['bbox'].copy()]
-        }
-
-        self.disappeared[object_id] = 0
-        self.trajectory_points[object_id] = deque(
-            maxlen=self.max_trajectory_length)
-        self._update_trajectory(object_id, detection['bbox'])
-
-        # Assign a color to this track
-        if object_id not in self.track_colors:
-            self.track_colors[object_id] = self.color_palette[object_id % len(
-                self.color_palette)]
-
-        return object_id
-
-    def _deregister(self, object_id: int):
-        """Deregister an object"""
-        if object_id in self.objects:
-            del self.objects[object_id]
-        if object_id in self.disappeared:
-            del self.disappeared[object_id]
-        if object_id in self.trajectory_points:
-            del self.trajectory_points[object_id]
-
-    def _get_center(self, bbox: List[float]) -> Tuple[float, float]:
-        """Get center point of bounding box"""
-        x1, y1, x2, y2 = bbox
-        return ((x1 + x2) / 2, (y1 + y2) / 2)
-
-    def _smooth_bbox(self, old_bbox: List[float], new_bbox: List[float]) -> List[float]:
-        """Smooth bounding box coordinates"""
-        return [
-            int(old * (1 - self.smoothing_factor) + new * self.smoothing_factor)
-            for old, new in zip(old_bbox, new_bbox)
-        ]
-
-    def _update_trajectory(self, object_id: int, bbox: List[float]):
-        """Update trajectory for an object"""
-        if object_id not in self.trajectory_points:
-            self.trajectory_points[object_id] = deque(
-                maxlen=self.max_trajectory_length)
-
-        # Add center point to trajectory
-        center = self._get_center(bbox)
-        self.trajectory_points[object_id].append(center)
-
-    def is_moving_towards_camera(self, object_id: int, min_frames: int = 5) -> bool:
-        """
-        Check if vehicle is moving towards camera (towards bottom of frame).
-        Returns True if the vehicle's Y position is increasing over time.
-        """
-        if object_id not in self.trajectory_points:
-            return False
-
-        points = list(self.trajectory_points[object_id])
-        if len(points) < min_frames:
-            return False
-
-        # Check the last N points
-        recent_points = points[-min_frames:]
-
-        # Calculate average Y movement
-        y_movements = []
-        for i in range(len(recent_points) - 1):
-            y_diff = recent_points[i + 1][1] - recent_points[i][1]
-            y_movements.append(y_diff)
-
-        if not y_movements:
-            return False
-
-        # Average movement towards bottom (positive Y direction)
-        avg_movement = sum(y_movements) / len(y_movements)
-
-        # Consider moving towards camera if average movement is positive (downward)
-        # Small threshold to avoid noise
-        return avg_movement > 0.5
-
-    def is_in_lane(self, object_id: int, lane_polygon: np.ndarray) -> bool:
-        """
-        Check if vehicle is within the defined lane polygon.
-        """
-        if object_id not in self.objects:
-            return False
-
-        bbox = self.objects[object_id]['bbox']
-        center = self._get_center(bbox)
-
-        # Use OpenCV's pointPolygonTest
-        result = cv2.pointPolygonTest(lane_polygon, center, False)
-
-        # result >= 0 means inside or on the polygon
-        return result >= 0
-
-    def check_zone_counting(self, object_id: int) -> bool:
-        """
-        Zone-based counting: Count vehicles that have moved significantly through the zone.
-        This replaces the line-crossing method for lane-based detection.
-
-        Returns True if vehicle should be counted (first time meeting criteria)
-        """
-        # Already counted
-        if object_id in self.counted_ids:
-            return False
-
-        # Need trajectory data
-        if object_id not in self.trajectory_points or len(self.trajectory_points[object_id]) < 5:
-            return False
-
-        points = list(self.trajectory_points[object_id])
-
-        # Track entry position if not already tracked
-        if object_id not in self.zone_entry_positions:
-            # Y coordinate of first detection
-            self.zone_entry_positions[object_id] = points[0][1]
-
-        # Get current position
-        entry_y = self.zone_entry_positions[object_id]
-        current_y = points[-1][1]
-
-        # Calculate movement through zone (positive = moving down/towards camera)
-        movement = current_y - entry_y
-
-        # Count if vehicle has moved significantly through the zone towards camera
-        if movement >= self.min_movement_to_count:
-            self.counted_ids.add(object_id)
-            return True
-
-        return False
-
-    def check_line_crossing(self, object_id: int, line_y: int) -> bool:
-        """Check if an object has crossed the counting line (legacy method)"""
-        if object_id in self.crossed_ids:
-            return False
-
-        if object_id not in self.trajectory_points or len(self.trajectory_points[object_id]) < 2:
-            return False
-
-        # Get the last two points in the trajectory
-        points = list(self.trajectory_points[object_id])
-        y_prev = points[-2][1]
-        y_curr = points[-1][1]
-
-        # Check if the line was crossed
-        if y_prev > line_y >= y_curr or y_prev <= line_y < y_curr:
-            self.crossed_ids.add(object_id)
-            return True
-
-        return False
-
-    def draw_trajectories(self, frame: np.ndarray):
-        """Draw trajectories for all tracked objects"""
-        for object_id, points in self.trajectory_points.items():
-            if object_id not in self.track_colors:
-                continue
-
-            color = self.track_colors[object_id]
-            points = np.array(list(points), np.int32).reshape((-1, 1, 2))
-            if len(points) > 1:
-                cv2.polylines(frame, [points], isClosed=False,
-                              color=color, thickness=2, lineType=cv2.LINE_AA)
-
-
 class ONNXTrafficDetector:
     """Traffic detector using ONNX models for optimized inference"""
 
@@ -393,11 +105,52 @@ class ONNXTrafficDetector:
         else:
             self.lane_config_path = lane_config_path if lane_config_path else "config/lane_config.json"
         self.lane_polygon = None
+        # Label raster of the lane, for vectorized point-in-lane lookups
+        self.lane_mask = None
+        # Named counting zones (a plain lane config is a single zone)
+        self.zones = []
+        self.zone_polygons = []
         self.lane_enabled = False
         self.direction_filter_enabled = False
         self.filtered_vehicle_count = 0  # Vehicles filtered out
         self.load_lane_config()
 
+        # Lane-ROI inference: in zone-based mode the models only see the
+        # lane polygon's padded bounding rectangle instead of the whole frame
+        roi_config = get_detection_setting('roi_inference', {}) or {}
+        self.roi_inference_enabled = bool(roi_config.get('enabled', False))
+        self.roi_padding = float(roi_config.get('padding', 0.1))
+        self.roi_min_padding = int(roi_config.get('min_padding', 16))
+        self.roi_input_size = roi_config.get('input_size')
+        self.inference_roi = None  # (x1, y1, x2, y2) in frame coordinates
+        self._inference_roi_key = None
+
+        # Tinted lane layer and its mask, cropped to the zones' bounding box
+        self._lane_overlay = None
+        self._lane_overlay_key = None
+
+        # Detection interval: full inference every N frames, tracker
+        # prediction in between. The adaptive mode raises N (up to
+        # max_interval) when processing cannot keep up with target_fps.
+        interval_config = get_detection_setting('detection_interval', {}) or {}
+        self.base_detection_interval = max(
+            1, int(get_detection_setting('process_every_n_frames', 1) or 1))
+        self.adaptive_interval_enabled = bool(interval_config.get('adaptive', False))
+        self.target_fps = float(interval_config.get('target_fps', 30))
+        self.max_detection_interval = max(
+            self.base_detection_interval, int(interval_config.get('max_interval', 4)))
+        self.detection_interval = self.base_detection_interval
+        self.frames_since_detection = 0
+        self.last_ambulance_candidate_frame = None
+        # Moving averages of processing time with and without inference
+        self.detection_frame_time = None
+        self.predicted_frame_time = None
+        self.interval_stats = {
+            'detection_frames': 0,
+            'predicted_frames': 0,
+            'forced_by_ambulance': 0
+        }
+
         # Enhanced temporal smoothing (inspired by dedicated detector)
         self.ambulance_detection_history = deque(maxlen=20)  # Increased window
         self.ambulance_confidence_history = deque(
@@ -449,18 +202,62 @@ class ONNXTrafficDetector:
         self.roi_enabled = True
 
         # Advanced visual cues detection
-        # Store frames for flashing detection
-        self.previous_frames = deque(maxlen=5)
-        self.ambulance_visual_features = {}  # Store detected features per detection
+        # Full-frame copies per frame, for checking the memcpy volume
+        self.copy_counter = CopyCounter()
+        # Store frames for flashing detection (downscaled, preallocated)
+        self.previous_frames = FrameHistory(maxlen=5, counter=self.copy_counter)
+        # Buffers render() annotates when the caller's frame must stay untouched
+        self.render_buffers = FrameBufferRing(2, counter=self.copy_counter)
+        # Visual feature state per tracker object (brightness history, cached features)
+        cache_config = get_detection_setting('feature_cache', {}) or {}
+        self.feature_cache = TrackFeatureCache(
+            max_tracks=cache_config.get('max_tracks', 256),
+            ttl_frames=cache_config.get('ttl_frames', 150),
+            recompute_interval=cache_config.get('recompute_interval', 5),
+            min_iou=cache_config.get('min_iou', 0.7))
+        # Feature detectors in cost order, with early exit for threshold checks
+        self.feature_cascade = FeatureCascade()
+        # Minimum IoU between a detection and a track to share its feature state
+        self.feature_match_iou = float(cache_config.get('match_iou', 0.3))
+        self._feature_tracks_frame = None
+        self._feature_track_ids = []
+        self._feature_track_boxes = np.empty((0, 4))
+
+        # Ambulance model scheduling: low base rate, every detection frame
+        # after emergency-colour cues or recent hits, skipped on an empty lane
+        schedule_config = get_detection_setting('ambulance_schedule', {}) or {}
+        self.ambulance_scheduler = AmbulanceScheduler(
+            enabled=schedule_config.get('enabled', False),
+            base_interval=schedule_config.get('base_interval', 5),
+            escalation_frames=schedule_config.get('escalation_frames', 30),
+            skip_when_empty=schedule_config.get('skip_when_empty', True))
+        self.recent_hit_frames = max(1, int(schedule_config.get('recent_hit_frames', 5)))
+
+        # Letterboxed tensor of the current frame, shared between both models
+        self._frame_preprocessed = None
+
+        # Initialize tracker
+        self.tracker = create_tracker(get_detection_setting('tracker', {}) or {})
+        self.tracker.deregister_callbacks.append(self.feature_cache.evict)
+        # Zone state lives in the tracker's track store, next to the tracks
+        self.tracker.counting.set_zones(self.zones if self.lane_enabled else [])
+
+        # Vehicle detections below vehicle_confidence_threshold are dropped,
+        # except that ByteTrack's low-confidence stage receives those down
+        # to its low_threshold (the vehicle model keeps them for it)
+        self.vehicle_confidence_threshold = 0.3
+        self.tracker_confidence_threshold = self.vehicle_confidence_threshold
+        if isinstance(self.tracker, ByteTrackVehicleTracker):
+            self.tracker_confidence_threshold = min(
+                self.vehicle_confidence_threshold, self.tracker.low_threshold)
 
         # Initialize models
         self._initialize_models()
 
-        # Initialize tracker
-        self.tracker = ONNXVehicleTracker()
-
-        # Line for counting (y-coordinate, horizontal line at 2/3 of frame height)
-        self.count_line_y = None
+        # Counting lines (fractions of the frame size), placed on the first frame;
+        # the default is a horizontal line at 2/3 of the frame height
+        self.count_lines_config = (get_detection_setting('counting', {}) or {}).get('lines')
+        self.count_lines_shape = None
 
     def _initialize_models(self):
         """Initialize ONNX models"""
@@ -482,6 +279,11 @@ class ONNXTrafficDetector:
             logger.debug(
                 f"Looking for ambulance model at: {ambulance_model_path}")
 
+            # Both sessions share one profile (and its thread pool, if enabled)
+            session_profile = get_session_profile()
+            logger.info(
+                f"ONNX Runtime session profile: {session_profile.to_dict()}")
+
             # Initialize vehicle detector
             if os.path.exists(vehicle_model_path):
                 logger.info(f"Loading vehicle model from {vehicle_model_path}")
@@ -489,8 +291,11 @@ class ONNXTrafficDetector:
                     logger.info(
                         f"Vehicle model file size: {os.path.getsize(vehicle_model_path) / (1024*1024):.2f} MB")
                     # Lowered to 0.3 for better detection on new systems
+                    # (ByteTrack: down to its low_threshold)
                     self.vehicle_model = ONNXYOLODetector(
-                        vehicle_model_path, conf_thres=0.3)
+                        vehicle_model_path, conf_thres=self.tracker_confidence_threshold,
+                        session_profile=session_profile,
+                        input_size=self._roi_model_input_size())
                     logger.info("✅ Vehicle model loaded successfully!")
                 except Exception as e:
                     logger.error(
@@ -512,7 +317,9 @@ class ONNXTrafficDetector:
                         f"Ambulance model file size: {os.path.getsize(ambulance_model_path) / (1024*1024):.2f} MB")
                     # Use multiple confidence levels balanced for real ambulance detection
                     self.ambulance_model = ONNXAmbulanceDetector(
-                        ambulance_model_path, conf_thres=0.01)  # Lower base threshold
+                        ambulance_model_path, conf_thres=0.01,  # Lower base threshold
+                        session_profile=session_profile,
+                        input_size=self._roi_model_input_size())
                     # More sensitive levels including very low
                     self.ambulance_confidence_levels = [0.15, 0.08, 0.04, 0.02]
                     logger.info("✅ Ambulance model loaded successfully!")
@@ -538,6 +345,30 @@ class ONNXTrafficDetector:
             logger.error(f"Full traceback:\n{traceback.format_exc()}")
             raise
 
+    def stop(self):
+        """
+        Release the model sessions
+
+        The sessions stay loaded and warm in the session registry, so the next
+        detector (e.g. after switching video source) starts without reloading
+        the models. Safe to call more than once.
+        """
+        for model in (self.vehicle_model, self.ambulance_model):
+            if model is not None:
+                model.close()
+        logger.info("Detector stopped, model sessions released")
+
+    def reset_counters(self):
+        """Reset vehicle counts without touching tracks or model state"""
+        self.vehicle_count = 0
+        self.filtered_vehicle_count = 0
+        if self.tracker is not None:
+            # Vehicles already counted in the zone are not counted again;
+            # line crossings are forgotten, as before
+            self.tracker.counting.reset_counts()
+            self.tracker.counting.clear_crossings()
+        logger.info("Vehicle counters reset")
+
     def load_lane_config(self):
         """Load lane configuration from JSON file"""
         from shared.config.video_config_manager import get_video_config_path, has_video_config, load_video_config
@@ -578,21 +409,29 @@ class ONNXTrafficDetector:
             with open(self.lane_config_path, 'r') as f:
                 config = json.load(f)
 
-            lane_points = config.get('lane_points', [])
-            if len(lane_points) < 3:
+            # Either a list of named zones or a single lane_points polygon
+            zones = parse_zones(config)
+            if not zones:
                 logger.warning(
                     "Lane config has less than 3 points. Lane filtering disabled.")
                 self.lane_enabled = False
                 return
 
+            self.zones = zones
+            self.zone_polygons = [zone['points'] for zone in zones]
             # Convert to numpy array for OpenCV
-            self.lane_polygon = np.array(lane_points, dtype=np.int32)
+            lane_points = config.get('lane_points', [])
+            self.lane_polygon = (np.array(lane_points, dtype=np.int32) if len(lane_points) >= 3
+                                 else self.zone_polygons[0])
+            # Rasterized at frame size on the first frame; label i + 1 = zone i
+            self.lane_mask = LaneMaskRaster(self.zone_polygons)
             self.lane_enabled = True
             # Direction filtering disabled - lane area already defines approach zone
             self.direction_filter_enabled = False
 
             logger.info(
-                f"Lane configuration loaded: {len(lane_points)} points")
+                f"Lane configuration loaded: {len(zones)} zone(s) "
+                f"({', '.join(zone['name'] for zone in zones)})")
             logger.info("Lane-based filtering ENABLED")
             logger.info(
                 "Direction filtering DISABLED (lane area defines the detection zone)")
@@ -601,164 +440,164 @@ class ONNXTrafficDetector:
             logger.error(f"Error loading lane config: {e}")
             self.lane_enabled = False
 
-    def _filter_vehicle_detections(self, detections: List[Dict]) -> List[Dict]:
-        """Filter detections to only include vehicles (no persons, animals, etc.)"""
-        vehicle_detections = []
+    def _roi_model_input_size(self) -> Optional[int]:
+        """Model input size for lane-ROI inference (None keeps the model's own)"""
+        if self.roi_inference_enabled and self.lane_enabled and self.roi_input_size:
+            return int(self.roi_input_size)
+        return None
 
-        # Debug counters
-        total_detections = 0
-        filtered_in = 0
-        filtered_out = 0
-        persons_filtered = 0
+    def _get_inference_roi(self, frame_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Padded bounding rectangle of the lane polygon, clipped to the frame
 
-        for det in detections:
-            class_id = det['class_id']
-            confidence = det['confidence']
+        Returns:
+            (x1, y1, x2, y2) or None when the whole frame is used
+        """
+        if not (self.roi_inference_enabled and self.lane_enabled) or not self.zone_polygons:
+            return None
 
-            total_detections += 1
+        # Recomputed only when the frame size or lane polygons change
+        zone_points = np.concatenate(self.zone_polygons)
+        key = (frame_shape[:2], zone_points.tobytes())
+        if key == self._inference_roi_key:
+            return self.inference_roi
+
+        frame_height, frame_width = frame_shape[:2]
+        x, y, w, h = cv2.boundingRect(zone_points)
+        pad_x = max(self.roi_min_padding, int(w * self.roi_padding))
+        pad_y = max(self.roi_min_padding, int(h * self.roi_padding))
+        x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+        x2, y2 = min(frame_width, x + w + pad_x), min(frame_height, y + h + pad_y)
+
+        if x2 <= x1 or y2 <= y1 or (x1, y1, x2, y2) == (0, 0, frame_width, frame_height):
+            roi = None
+        else:
+            roi = (x1, y1, x2, y2)
+            logger.info(
+                f"Lane-ROI inference: cropping {frame_width}x{frame_height} frames to "
+                f"{x2 - x1}x{y2 - y1} at ({x1}, {y1}) "
+                f"({(x2 - x1) * (y2 - y1) / (frame_width * frame_height):.0%} of the frame)")
 
-            # ✅ CRITICAL FILTER: Exclude persons (class_id 0) and other non-vehicles
-            # Person class ID is typically 0 in YOLO/COCO models
-            if class_id == 0:
-                persons_filtered += 1
-                if self.frame_count % 60 == 0:  # Log occasionally
-                    logger.debug(
-                        f"❌ Filtered out person detection (class_id=0, conf={confidence:.2f})")
-                continue
+        self._inference_roi_key = key
+        self.inference_roi = roi
+        return roi
 
-            # Only keep known vehicle classes
-            if class_id in VEHICLE_CLASSES:
-                filtered_in += 1
+    def _get_lane_overlay(self, frame_shape: Tuple[int, ...]) -> Optional[Dict[str, Any]]:
+        """
+        Tinted lane layer and polygon mask, built once per resolution
 
-                # Map to generic "vehicle" class
-                det['class_name'] = 'vehicle'
-                # Keep original for reference
-                det['original_class_id'] = class_id
+        Returns:
+            Dictionary with the clipped bounding box 'roi' (x1, y1, x2, y2),
+            'mask' [h, w] uint8 and 'tint' [h, w, 3] layer, or None when no
+            zone is inside the frame
+        """
+        zone_points = np.concatenate(self.zone_polygons)
+        key = (frame_shape[:2], zone_points.tobytes())
+        if key == self._lane_overlay_key:
+            return self._lane_overlay
+
+        frame_height, frame_width = frame_shape[:2]
+        x, y, w, h = cv2.boundingRect(zone_points)
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(frame_width, x + w), min(frame_height, y + h)
+
+        overlay = None
+        if x2 > x1 and y2 > y1:
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(mask, self.zone_polygons, 255, offset=(-x1, -y1))
+            tint = np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+            tint[:] = (0, 255, 0)
+            overlay = {
+                'roi': (x1, y1, x2, y2),
+                'mask': mask,
+                'tint': tint,
+                'blended': np.empty_like(tint)
+            }
 
-                # Lane-based filtering: Only include vehicles inside the lane
-                if self.lane_enabled and self.lane_polygon is not None:
-                    # Get vehicle center point
-                    bbox = det['bbox']
-                    center_x = (bbox[0] + bbox[2]) / 2
-                    center_y = (bbox[1] + bbox[3]) / 2
+        self._lane_overlay_key = key
+        self._lane_overlay = overlay
+        return overlay
 
-                    # Check if inside lane polygon
-                    result = cv2.pointPolygonTest(
-                        self.lane_polygon, (center_x, center_y), False)
+    def _blend_lane_overlay(self, frame: np.ndarray, alpha: float = 0.2):
+        """Tint the lane polygons in place, blending only inside their bounding box"""
+        overlay = self._get_lane_overlay(frame.shape)
+        if overlay is None:
+            return
 
-                    if result < 0:
-                        # Vehicle is OUTSIDE the lane, skip it
-                        filtered_out += 1
-                        continue
+        x1, y1, x2, y2 = overlay['roi']
+        region = frame[y1:y2, x1:x2]
+        blended = cv2.addWeighted(overlay['tint'], alpha, region, 1 - alpha, 0,
+                                  dst=overlay['blended'])
+        # region is a view, so copyTo writes straight into the frame
+        cv2.copyTo(blended, overlay['mask'], region)
 
-                vehicle_detections.append(det)
-            else:
-                # Unknown class ID
-                filtered_out += 1
-                if self.frame_count % 60 == 0:  # Log occasionally
-                    logger.debug(
-                        f"❌ Filtered out unknown class_id={class_id} (conf={confidence:.2f})")
+    def _filter_vehicle_detections(self, detections: Detections,
+                                   min_confidence: Optional[float] = None) -> Detections:
+        """
+        Filter detections to only include vehicles (no persons, animals, etc.)
+
+        Args:
+            detections: Vehicle model detections
+            min_confidence: Lowest confidence to keep (default
+                vehicle_confidence_threshold)
+        """
+        if min_confidence is None:
+            min_confidence = self.vehicle_confidence_threshold
+        total_detections = len(detections)
+
+        # ✅ CRITICAL FILTER: Exclude persons (class_id 0) and other non-vehicles
+        # Person class ID is typically 0 in YOLO/COCO models
+        person_mask = detections.class_ids == 0
+
+        # Only keep known vehicle classes; they are reported as generic "vehicle"
+        vehicle_mask = detections.class_mask(VEHICLE_CLASSES) & (detections.scores >= min_confidence)
+        filtered_in = int(np.count_nonzero(vehicle_mask))
+
+        # Lane-based filtering: Only include vehicles inside the lane
+        keep = vehicle_mask
+        if self.lane_enabled and self.lane_mask is not None and filtered_in:
+            # One raster lookup for all detection centres
+            in_lane = self.lane_mask.contains(detections.centers())
+            keep = vehicle_mask & in_lane
+
+        vehicle_detections = detections.filter(keep)
 
         # Debug logging every 60 frames
         if self.frame_count % 60 == 0:
+            persons_filtered = int(np.count_nonzero(person_mask))
+            filtered_out = total_detections - persons_filtered - len(vehicle_detections)
+            if persons_filtered:
+                logger.debug(
+                    f"❌ Filtered out {persons_filtered} person detection(s) (class_id=0)")
             logger.debug(
                 f"Vehicle Filter: Total={total_detections}, Persons filtered={persons_filtered}, "
                 f"Valid vehicles={filtered_in}, Outside lane={filtered_out}, Final count={len(vehicle_detections)}")
 
         return vehicle_detections
 
-    def _apply_nms_to_ambulance_detections(self, detections: List[Dict], iou_threshold: float = 0.4) -> List[Dict]:
+    def _apply_nms_to_ambulance_detections(self, detections: Detections, iou_threshold: float = 0.4) -> Detections:
         """Apply Non-Maximum Suppression to ambulance detections to reduce duplicates"""
         if len(detections) <= 1:
             return detections
 
-        # Convert to format suitable for NMS
-        boxes = []
-        scores = []
-        indices = []
-
-        for i, det in enumerate(detections):
-            bbox = det['bbox']
-            confidence = det['confidence']
-
-            boxes.append([bbox[0], bbox[1], bbox[2], bbox[3]])
-            scores.append(confidence)
-            indices.append(i)
-
-        boxes = np.array(boxes, dtype=np.float32)
-        scores = np.array(scores, dtype=np.float32)
-
         # Apply OpenCV's NMS
         try:
             keep_indices = cv2.dnn.NMSBoxes(
-                boxes.tolist(),
-                scores.tolist(),
+                detections.boxes.tolist(),
+                detections.scores.tolist(),
                 score_threshold=0.01,  # Very low threshold since we already filtered
                 nms_threshold=iou_threshold
             )
-
-            if len(keep_indices) > 0:
-                keep_indices = keep_indices.flatten()
-                return [detections[i] for i in keep_indices]
-            else:
-                return []
+            return detections.filter(np.array(keep_indices, dtype=int).flatten())
         except:
-            # Fallback to simple overlap removal if OpenCV NMS fails
-            return self._simple_nms_fallback(detections, iou_threshold)
-
-    def _simple_nms_fallback(self, detections: List[Dict], iou_threshold: float) -> List[Dict]:
-        """Simple NMS fallback implementation"""
-        if not detections:
-            return []
-
-        # Sort by confidence (highest first)
-        sorted_detections = sorted(
-            detections, key=lambda x: x['confidence'], reverse=True)
-        keep = []
-
-        while sorted_detections:
-            # Take the highest confidence detection
-            current = sorted_detections.pop(0)
-            keep.append(current)
-
-            # Remove overlapping detections
-            remaining = []
-            for det in sorted_detections:
-                iou = self._calculate_iou(current['bbox'], det['bbox'])
-                if iou < iou_threshold:
-                    remaining.append(det)
-
-            sorted_detections = remaining
-
-        return keep
-
-    def _calculate_iou(self, box1: List[float], box2: List[float]) -> float:
-        """Calculate Intersection over Union (IoU) between two bounding boxes"""
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
-
-        # Calculate intersection area
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0
+            # Fallback to the numpy implementation if OpenCV NMS fails
+            return detections.filter(nms_numpy(
+                detections.boxes, detections.scores, iou_threshold))
 
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-
-        # Calculate union area
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
-
-        return intersection / union if union > 0 else 0.0
-
-    def _filter_ambulance_detections(self, detections: List[Dict], frame_shape: Tuple[int, int]) -> List[Dict]:
+    def _filter_ambulance_detections(self, detections: Detections, frame_shape: Tuple[int, int]) -> Detections:
         """Enhanced ambulance detection filtering with size validation and NMS"""
-        if not detections:
-            return []
+        if len(detections) == 0:
+            return detections
 
         # Step 1: Apply size and shape filtering
         size_filtered = self._apply_size_shape_filtering(
@@ -774,162 +613,139 @@ class ONNXTrafficDetector:
 
         return calibrated
 
-    def _apply_size_shape_filtering(self, detections: List[Dict], frame_shape: Tuple[int, int]) -> List[Dict]:
+    def _apply_size_shape_filtering(self, detections: Detections, frame_shape: Tuple[int, int]) -> Detections:
         """Apply size and shape-based filtering for ambulance detections"""
-        filtered_detections = []
+        if len(detections) == 0:
+            return detections
+
         h, w = frame_shape[:2]
 
-        for det in detections:
-            bbox = det['bbox']
-            confidence = det['confidence']
-
-            x1, y1, x2, y2 = bbox
-            width = x2 - x1
-            height = y2 - y1
-            area = width * height
-
-            # Calculate relative size (as percentage of frame)
-            relative_area = area / (w * h)
-            aspect_ratio = width / height if height > 0 else 0
-
-            # Enhanced filtering criteria:
-            # 1. Minimum size - more restrictive to reduce false positives
-            min_area_threshold = 0.0008  # 0.08% of frame area
-
-            # 2. Maximum size - ambulances shouldn't be too large
-            max_area_threshold = 0.25    # 25% of frame area
-
-            # 3. Realistic aspect ratio for ambulances
-            min_aspect_ratio = 0.5       # Not too tall
-            max_aspect_ratio = 3.0       # Not too wide
-
-            # 4. Adaptive confidence threshold based on size and position
-            if relative_area < 0.002:    # Very small detections (distant)
-                confidence_threshold = 0.20  # Higher threshold for distant objects
-            elif relative_area < 0.01:   # Small detections
-                confidence_threshold = 0.15  # Medium threshold
-            else:                        # Regular size detections
-                confidence_threshold = 0.12  # Base threshold
-
-            # 5. Minimum pixel dimensions (absolute)
-            # At least 1.5% of frame width
-            min_width = max(20, int(w * 0.015))
-            # At least 1.2% of frame height
-            min_height = max(15, int(h * 0.012))
-
-            # 6. Position-based filtering (ambulances unlikely at frame edges)
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-            edge_margin = 0.05  # 5% margin from edges
-
-            in_valid_region = (edge_margin * w <= center_x <= (1 - edge_margin) * w and
-                               edge_margin * h <= center_y <= (1 - edge_margin) * h)
-
-            # Apply all filters
-            if (confidence >= confidence_threshold and
-                min_area_threshold <= relative_area <= max_area_threshold and
-                min_aspect_ratio <= aspect_ratio <= max_aspect_ratio and
-                width >= min_width and height >= min_height and
-                    in_valid_region):
-
-                # Add validation metadata
-                det['validation'] = {
-                    'relative_area': relative_area,
-                    'aspect_ratio': aspect_ratio,
-                    'pixel_area': area,
-                    'confidence_threshold_used': confidence_threshold
-                }
-
-                filtered_detections.append(det)
-
-        return filtered_detections
-
-    def _calibrate_detection_confidence(self, detections: List[Dict], frame_shape: Tuple[int, int]) -> List[Dict]:
+        width = detections.widths()
+        height = detections.heights()
+        area = width * height
+
+        # Calculate relative size (as percentage of frame)
+        relative_area = area / (w * h)
+        aspect_ratio = np.divide(width, height, out=np.zeros_like(width),
+                                 where=height > 0)
+
+        # Enhanced filtering criteria:
+        # 1. Minimum size - more restrictive to reduce false positives
+        min_area_threshold = 0.0008  # 0.08% of frame area
+
+        # 2. Maximum size - ambulances shouldn't be too large
+        max_area_threshold = 0.25    # 25% of frame area
+
+        # 3. Realistic aspect ratio for ambulances
+        min_aspect_ratio = 0.5       # Not too tall
+        max_aspect_ratio = 3.0       # Not too wide
+
+        # 4. Adaptive confidence threshold based on size and position
+        confidence_threshold = np.where(
+            relative_area < 0.002, 0.20,     # Very small detections (distant)
+            np.where(relative_area < 0.01,
+                     0.15,                   # Small detections
+                     0.12))                  # Regular size detections
+
+        # 5. Minimum pixel dimensions (absolute)
+        # At least 1.5% of frame width
+        min_width = max(20, int(w * 0.015))
+        # At least 1.2% of frame height
+        min_height = max(15, int(h * 0.012))
+
+        # 6. Position-based filtering (ambulances unlikely at frame edges)
+        centers = detections.centers()
+        center_x = centers[:, 0]
+        center_y = centers[:, 1]
+        edge_margin = 0.05  # 5% margin from edges
+
+        in_valid_region = ((edge_margin * w <= center_x) & (center_x <= (1 - edge_margin) * w) &
+                           (edge_margin * h <= center_y) & (center_y <= (1 - edge_margin) * h))
+
+        # Apply all filters
+        keep = ((detections.scores.astype(np.float64) >= confidence_threshold) &
+                (min_area_threshold <= relative_area) & (relative_area <= max_area_threshold) &
+                (min_aspect_ratio <= aspect_ratio) & (aspect_ratio <= max_aspect_ratio) &
+                (width >= min_width) & (height >= min_height) &
+                in_valid_region)
+
+        # Validation metadata for the detections that passed
+        detections.set_extra('relative_area', np.where(keep, relative_area, np.nan))
+        detections.set_extra('aspect_ratio', np.where(keep, aspect_ratio, np.nan))
+
+        return detections.filter(keep)
+
+    def _calibrate_detection_confidence(self, detections: Detections, frame_shape: Tuple[int, int]) -> Detections:
         """Calibrate detection confidence based on context and validation metrics"""
-        calibrated_detections = []
-
-        for det in detections:
-            bbox = det['bbox']
-            original_confidence = det['confidence']
-
-            # Base calibration factors
-            calibration_factor = 1.0
-
-            # Factor 1: Size-based calibration
-            if 'validation' in det:
-                relative_area = det['validation']['relative_area']
-                aspect_ratio = det['validation']['aspect_ratio']
-
-                # Prefer medium-sized detections
-                if 0.005 <= relative_area <= 0.05:  # Optimal size range
-                    calibration_factor *= 1.1
-                elif relative_area < 0.002:  # Very small - reduce confidence
-                    calibration_factor *= 0.8
-                elif relative_area > 0.1:    # Very large - reduce confidence
-                    calibration_factor *= 0.7
-
-                # Prefer realistic aspect ratios
-                if 0.8 <= aspect_ratio <= 2.2:  # Typical ambulance proportions
-                    calibration_factor *= 1.05
-
-            # Factor 2: Position-based calibration
-            x1, y1, x2, y2 = bbox
-            center_y = (y1 + y2) / 2
-            frame_height = frame_shape[0]
-
-            # Ambulances more likely in middle-to-lower part of frame (road level)
-            relative_y = center_y / frame_height
-            if 0.4 <= relative_y <= 0.8:  # Road level
-                calibration_factor *= 1.1
-            elif relative_y < 0.3:  # Sky level - unlikely
-                calibration_factor *= 0.6
-
-            # Apply calibration
-            calibrated_confidence = min(
-                original_confidence * calibration_factor, 1.0)
-
-            # Adaptive final threshold based on detection characteristics
-            final_threshold = self._get_adaptive_confidence_threshold(
-                det, calibrated_confidence)
-
-            if calibrated_confidence >= final_threshold:
-                det['confidence'] = calibrated_confidence
-                det['original_confidence'] = original_confidence
-                det['calibration_factor'] = calibration_factor
-                det['adaptive_threshold_used'] = final_threshold
-                calibrated_detections.append(det)
-
-        return calibrated_detections
-
-    def _get_adaptive_confidence_threshold(self, detection: Dict, calibrated_confidence: float) -> float:
-        """Get adaptive confidence threshold based on detection characteristics"""
-        base_threshold = 0.08
+        if len(detections) == 0:
+            return detections
+
+        original_confidence = detections.scores.astype(np.float64)
+
+        # Base calibration factors
+        calibration_factor = np.ones(len(detections))
+
+        # Factor 1: Size-based calibration (NaN without validation metadata)
+        relative_area = detections.extra('relative_area')
+        aspect_ratio = detections.extra('aspect_ratio')
+
+        # Prefer medium-sized detections; reduce very small and very large ones
+        calibration_factor *= np.where(
+            (0.005 <= relative_area) & (relative_area <= 0.05), 1.1,
+            np.where(relative_area < 0.002, 0.8,
+                     np.where(relative_area > 0.1, 0.7, 1.0)))
+
+        # Prefer realistic aspect ratios (typical ambulance proportions)
+        calibration_factor *= np.where(
+            (0.8 <= aspect_ratio) & (aspect_ratio <= 2.2), 1.05, 1.0)
+
+        # Factor 2: Position-based calibration
+        # Ambulances more likely in middle-to-lower part of frame (road level),
+        # unlikely at sky level
+        relative_y = detections.centers()[:, 1] / frame_shape[0]
+        calibration_factor *= np.where(
+            (0.4 <= relative_y) & (relative_y <= 0.8), 1.1,
+            np.where(relative_y < 0.3, 0.6, 1.0))
+
+        # Apply calibration
+        calibrated_confidence = np.minimum(
+            original_confidence * calibration_factor, 1.0)
+
+        # Adaptive final threshold based on detection characteristics
+        final_threshold = self._get_adaptive_confidence_thresholds(detections)
+
+        keep = calibrated_confidence >= final_threshold
+        calibrated = detections.filter(keep)
+        calibrated.scores = calibrated_confidence[keep].astype(np.float32)
+        calibrated.set_extra('original_confidence', original_confidence[keep])
+        calibrated.set_extra('calibration_factor', calibration_factor[keep])
+
+        return calibrated
+
+    def _get_adaptive_confidence_thresholds(self, detections: Detections) -> np.ndarray:
+        """Get adaptive confidence thresholds based on detection characteristics"""
+        base_threshold = np.full(len(detections), 0.08)
 
         if not self.adaptive_confidence_enabled:
             return base_threshold
 
         # Factor 1: Feature presence - lower threshold if strong features detected
-        if 'features' in detection:
-            features = detection['features']
-            total_feature_score = features.get('total_boost', 0.0)
-
-            # Strong ambulance features = lower threshold needed
-            if total_feature_score > 0.2:  # Very strong features
-                base_threshold *= 0.4  # Much lower threshold
-            elif total_feature_score > 0.1:  # Good features
-                base_threshold *= 0.6  # Lower threshold
-            elif total_feature_score > 0.05:  # Some features
-                base_threshold *= 0.8  # Slightly lower threshold
+        # (NaN for detections without feature analysis)
+        total_feature_score = detections.extra('feature_boost')
+
+        # Very strong / good / some features = progressively lower threshold
+        base_threshold *= np.where(
+            total_feature_score > 0.2, 0.4,
+            np.where(total_feature_score > 0.1, 0.6,
+                     np.where(total_feature_score > 0.05, 0.8, 1.0)))
 
         # Factor 2: Size-based adjustment - larger ambulances can have lower threshold
-        if 'validation' in detection:
-            relative_area = detection['validation'].get('relative_area', 0.01)
+        relative_area = detections.extra('relative_area')
 
-            # Larger detections are more likely to be real
-            if relative_area > 0.02:  # Large detection
-                base_threshold *= 0.7
-            elif relative_area > 0.01:  # Medium detection
-                base_threshold *= 0.85
+        # Larger detections are more likely to be real
+        base_threshold *= np.where(
+            relative_area > 0.02, 0.7,
+            np.where(relative_area > 0.01, 0.85, 1.0))
 
         # Factor 3: Temporal consistency - if we've been detecting something consistently
         if hasattr(self, 'ambulance_detection_history') and len(self.ambulance_detection_history) >= 5:
@@ -946,64 +762,82 @@ class ONNXTrafficDetector:
         min_threshold = 0.03
         max_threshold = 0.15
 
-        return max(min_threshold, min(base_threshold, max_threshold))
+        return np.clip(base_threshold, min_threshold, max_threshold)
 
-    def _validate_very_low_confidence_detections(self, detections: List[Dict], frame: np.ndarray,
-                                                 vehicle_detections: List[Dict]) -> List[Dict]:
+    def _validate_very_low_confidence_detections(self, detections: Detections, frame: np.ndarray,
+                                                 vehicle_detections: Detections) -> Detections:
         """Special validation for very low confidence detections that might be genuine ambulances"""
-        validated_detections = []
-
-        for det in detections:
-            bbox = det['bbox']
-            confidence = det['confidence']
-
-            # Generate detection ID for feature analysis
-            detection_id = f"lowconf_{len(validated_detections)}_{self.frame_count}"
-
-            # Analyze ambulance features more thoroughly for low confidence
-            features = self._detect_ambulance_features(
-                frame, bbox, detection_id)
-            total_feature_score = features['total_boost']
-
-            # Check vehicle overlap (must have good overlap for low confidence)
-            has_good_overlap = False
-            if vehicle_detections:
-                for vehicle in vehicle_detections:
-                    overlap_ratio = self._calculate_overlap_ratio(
-                        bbox, vehicle['bbox'])
-                    if overlap_ratio > 0.3:  # Higher overlap requirement for low confidence
-                        has_good_overlap = True
-                        break
-
+        boxes = detections.boxes.tolist()
+        scores = detections.scores.tolist()
+
+        # Check vehicle overlap (must have good overlap for low confidence)
+        # Higher overlap requirement for low confidence
+        has_good_overlap = np.zeros(len(detections), dtype=bool)
+        if len(vehicle_detections):
+            has_good_overlap = (self._overlap_ratios(
+                detections.boxes, vehicle_detections.boxes) > 0.3).any(axis=1)
+
+        # Criterion 3: Reasonable size and position
+        frame_area = frame.shape[0] * frame.shape[1]
+        relative_area = detections.areas() / frame_area
+        reasonable_size = (0.002 <= relative_area) & (relative_area <= 0.1)
+
+        # Criterion 4: Temporal consistency (if we have history)
+        recent_activity = False
+        if len(self.ambulance_detection_history) >= 3:
+            recent_detections = list(self.ambulance_detection_history)[-3:]
+            recent_activity = sum(recent_detections) >= 2  # Recent detection activity
+
+        def score_with(feature_points: float, i: int) -> float:
             # Validation criteria for very low confidence detections
             validation_score = 0.0
 
             # Criterion 1: Strong ambulance features (most important)
-            if total_feature_score > 0.15:  # Strong features
-                validation_score += 0.4
-            elif total_feature_score > 0.08:  # Moderate features
-                validation_score += 0.2
+            validation_score += feature_points
 
             # Criterion 2: Good vehicle overlap
-            if has_good_overlap:
+            if has_good_overlap[i]:
                 validation_score += 0.3
 
             # Criterion 3: Reasonable size and position
-            x1, y1, x2, y2 = bbox
-            width = x2 - x1
-            height = y2 - y1
-            area = width * height
-            frame_area = frame.shape[0] * frame.shape[1]
-            relative_area = area / frame_area
-
-            if 0.002 <= relative_area <= 0.1:  # Reasonable size
+            if reasonable_size[i]:
                 validation_score += 0.2
 
-            # Criterion 4: Temporal consistency (if we have history)
-            if len(self.ambulance_detection_history) >= 3:
-                recent_detections = list(self.ambulance_detection_history)[-3:]
-                if sum(recent_detections) >= 2:  # Recent detection activity
-                    validation_score += 0.1
+            if recent_activity:
+                validation_score += 0.1
+            return validation_score
+
+        keep = []
+        rescued = {'confidence': [], 'original_confidence': [], 'validation_score': [],
+                   'feature_boost': [], 'features': []}
+
+        for i in range(len(detections)):
+            bbox = boxes[i]
+            confidence = scores[i]
+
+            # Feature score the outcome depends on: none if the other criteria
+            # accept on their own, otherwise the tier (> 0.08 or > 0.15) that
+            # would tip it, or nothing at all if even strong features cannot
+            if score_with(0.0, i) >= 0.6:
+                accept_threshold = None
+            elif score_with(0.2, i) >= 0.6:
+                accept_threshold = 0.08
+            elif score_with(0.4, i) >= 0.6:
+                accept_threshold = 0.15
+            else:
+                accept_threshold = float('inf')
+
+            # Analyze ambulance features more thoroughly for low confidence
+            features = self._detect_ambulance_features(
+                frame, bbox, self._feature_track_id(bbox), accept_threshold=accept_threshold)
+            total_feature_score = features['total_boost']
+
+            if total_feature_score > 0.15:  # Strong features
+                validation_score = score_with(0.4, i)
+            elif total_feature_score > 0.08:  # Moderate features
+                validation_score = score_with(0.2, i)
+            else:
+                validation_score = score_with(0.0, i)
 
             # Accept if validation score is high enough
             if validation_score >= 0.6:  # Need strong evidence for low confidence
@@ -1011,40 +845,51 @@ class ONNXTrafficDetector:
                 boosted_confidence = min(
                     confidence + total_feature_score + 0.1, 0.15)
 
-                det['confidence'] = boosted_confidence
-                det['original_confidence'] = confidence
-                det['validation_score'] = validation_score
-                det['feature_boost'] = total_feature_score
-                det['features'] = features
-                det['detection_id'] = detection_id
-                det['low_conf_rescue'] = True
-
-                validated_detections.append(det)
+                keep.append(i)
+                rescued['confidence'].append(boosted_confidence)
+                rescued['original_confidence'].append(confidence)
+                rescued['validation_score'].append(validation_score)
+                rescued['feature_boost'].append(total_feature_score)
+                rescued['features'].append(features)
 
                 if self.debug_ambulance:
                     logger.debug(f"LOW-CONF RESCUE: conf={confidence:.3f} → {boosted_confidence:.3f} "
                                  f"(validation_score={validation_score:.2f}, features={total_feature_score:.3f})")
 
-        return validated_detections
+        validated = detections.filter(keep)
+        validated.scores = np.asarray(rescued.pop('confidence'), dtype=np.float32)
+        for name, values in rescued.items():
+            validated.set_extra(name, values)
+        validated.set_flag(FLAG_RESCUED)
 
-    def _calculate_overlap_ratio(self, bbox1: List[float], bbox2: List[float]) -> float:
-        """Calculate overlap ratio between two bounding boxes"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
+        return validated
 
-        # Calculate intersection
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
+    @staticmethod
+    def _overlap_ratios(boxes: np.ndarray, other_boxes: np.ndarray) -> np.ndarray:
+        """
+        Fraction of each box covered by each of the other boxes
 
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0
+        Args:
+            boxes: [N, 4] boxes in format [x1, y1, x2, y2]
+            other_boxes: [M, 4] boxes in format [x1, y1, x2, y2]
 
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
+        Returns:
+            [N, M] array of intersection area / area of boxes[i]
+        """
+        boxes = boxes.astype(np.float64)
+        other_boxes = other_boxes.astype(np.float64)
 
-        return intersection / area1 if area1 > 0 else 0.0
+        # Calculate intersection
+        x1_i = np.maximum(boxes[:, None, 0], other_boxes[None, :, 0])
+        y1_i = np.maximum(boxes[:, None, 1], other_boxes[None, :, 1])
+        x2_i = np.minimum(boxes[:, None, 2], other_boxes[None, :, 2])
+        y2_i = np.minimum(boxes[:, None, 3], other_boxes[None, :, 3])
+        intersection = np.maximum(0.0, x2_i - x1_i) * np.maximum(0.0, y2_i - y1_i)
+
+        area = ((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))[:, None]
+
+        return np.divide(intersection, area, out=np.zeros_like(intersection),
+                         where=area > 0)
 
     def _setup_ambulance_roi(self, frame_shape: Tuple[int, int]):
         """Setup Region of Interest for ambulance detection (road area)"""
@@ -1083,8 +928,36 @@ class ONNXTrafficDetector:
         return (roi['x1'] <= center_x <= roi['x2'] and
                 roi['y1'] <= center_y <= roi['y2'])
 
-    def _detect_ambulance_features(self, frame: np.ndarray, bbox: List[float], detection_id: str) -> Dict[str, float]:
-        """Advanced ambulance feature detection: flashing lights, plus marks, text, etc."""
+    def _feature_track_id(self, bbox: List[float]) -> Optional[int]:
+        """Tracker object a detection belongs to (best IoU), for per-track feature state"""
+        if self._feature_tracks_frame != self.frame_count:
+            # Track boxes as of the previous frame, gathered once per frame
+            objects = self.tracker.objects if self.tracker is not None else {}
+            self._feature_track_ids = list(objects)
+            self._feature_track_boxes = np.array(
+                [objects[obj_id]['bbox'] for obj_id in self._feature_track_ids],
+                dtype=np.float64).reshape(-1, 4)
+            self._feature_tracks_frame = self.frame_count
+
+        if not self._feature_track_ids:
+            return None
+        ious = box_iou(bbox, self._feature_track_boxes)
+        best = int(np.argmax(ious))
+        if ious[best] < self.feature_match_iou:
+            return None
+        return self._feature_track_ids[best]
+
+    def _detect_ambulance_features(self, frame: np.ndarray, bbox: List[float],
+                                   track_id: Optional[int] = None,
+                                   accept_threshold: Optional[float] = None) -> Dict[str, float]:
+        """
+        Advanced ambulance feature detection: flashing lights, plus marks, text, etc.
+
+        With a track_id, brightness history accumulates per track and the
+        spatial features are reused until the feature cache asks for a
+        recomputation. With an accept_threshold, detectors are skipped (and
+        score 0) once total_boost can no longer exceed the threshold.
+        """
         features = {
             'flashing_lights': 0.0,
             'plus_cross_mark': 0.0,
@@ -1095,73 +968,89 @@ class ONNXTrafficDetector:
         }
 
         try:
-            x1, y1, x2, y2 = map(int, bbox)
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-
-            if x2 <= x1 or y2 <= y1:
+            region = self._feature_region(frame, bbox)
+            if region is None:
                 return features
 
-            # Extract region
-            region = frame[y1:y2, x1:x2]
-            if region.size == 0:
-                return features
+            entry = None
+            if track_id is not None:
+                entry = self.feature_cache.get(track_id, self.frame_count)
+
+            # HSV/gray conversions and colour bins shared by all detectors
+            stats = RegionColorStats(region)
+
+            cached = None
+            if entry is not None:
+                cached = self.feature_cache.cached_features(entry, bbox, self.frame_count)
+
+            detectors = {
+                # 1. FLASHING LIGHTS DETECTION
+                'flashing_lights': lambda: self._detect_flashing_lights(stats, entry),
+                # 2. PLUS/CROSS MARK DETECTION
+                'plus_cross_mark': lambda: self._detect_plus_cross_mark(stats),
+                # 3. AMBULANCE TEXT DETECTION (simple pattern matching)
+                'ambulance_text': lambda: self._detect_ambulance_text(stats),
+                # 4. EMERGENCY COLORS PATTERN
+                'emergency_colors': lambda: self._detect_emergency_color_patterns(stats),
+                # 5. LIGHT BAR PATTERNS (horizontal light arrangements)
+                'light_patterns': lambda: self._detect_light_bar_patterns(stats)
+            }
 
-            # 1. FLASHING LIGHTS DETECTION
-            features['flashing_lights'] = self._detect_flashing_lights(
-                region, detection_id)
-
-            # 2. PLUS/CROSS MARK DETECTION
-            features['plus_cross_mark'] = self._detect_plus_cross_mark(region)
-
-            # 3. AMBULANCE TEXT DETECTION (simple pattern matching)
-            features['ambulance_text'] = self._detect_ambulance_text(region)
-
-            # 4. EMERGENCY COLORS PATTERN
-            features['emergency_colors'] = self._detect_emergency_color_patterns(
-                region)
-
-            # 5. LIGHT BAR PATTERNS (horizontal light arrangements)
-            features['light_patterns'] = self._detect_light_bar_patterns(
-                region)
-
-            # Calculate total boost with weighted importance
-            total_boost = (
-                features['flashing_lights'] * 0.35 +      # Most important
-                features['plus_cross_mark'] * 0.25 +      # Very distinctive
-                # Helpful but less reliable
-                features['ambulance_text'] * 0.15 +
-                features['emergency_colors'] * 0.15 +     # Supporting evidence
-                # Additional confirmation
-                features['light_patterns'] * 0.10
-            )
+            # Cheapest detectors first; total_boost is the weighted, capped sum.
+            # Flashing lights always runs to keep the brightness history going.
+            features, computed = self.feature_cascade.run(
+                lambda name: detectors[name](), accept_threshold=accept_threshold,
+                known=cached, always=('flashing_lights',))
 
-            features['total_boost'] = min(total_boost, 0.4)  # Cap at 0.4 boost
+            if entry is not None:
+                self.feature_cache.store_features(
+                    entry, bbox, self.frame_count, features,
+                    names=computed, merge=cached is not None)
 
             return features
 
         except Exception as e:
             return features
 
-    def _detect_flashing_lights(self, region: np.ndarray, detection_id: str) -> float:
-        """Detect flashing emergency lights by analyzing brightness changes"""
+    def _feature_region(self, frame: np.ndarray, bbox: List[float]) -> Optional[np.ndarray]:
+        """Box region of the frame clipped to its bounds, or None when empty"""
+        x1, y1, x2, y2 = map(int, bbox)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
+
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        region = frame[y1:y2, x1:x2]
+        if region.size == 0:
+            return None
+        return region
+
+    def _detect_flashing_lights(self, stats: RegionColorStats,
+                                entry: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Detect flashing emergency lights by analyzing brightness changes
+
+        Needs the track's feature cache entry to accumulate brightness history;
+        without one there is no history and the score is 0.
+        """
         try:
-            # Convert to grayscale for brightness analysis
-            gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+            # Grayscale for brightness analysis
+            gray = stats.gray
 
             # Focus on top portion where lights are usually located
-            top_region = gray[:region.shape[0]//3, :]
+            top_region = gray[:stats.shape[0]//3, :]
 
             # Calculate average brightness
             current_brightness = np.mean(top_region)
 
-            # Store brightness history for this detection
-            if detection_id not in self.ambulance_visual_features:
-                self.ambulance_visual_features[detection_id] = {
-                    'brightness_history': deque(maxlen=8)}
+            if entry is None:
+                return 0.0
 
-            brightness_history = self.ambulance_visual_features[detection_id]['brightness_history']
-            brightness_history.append(current_brightness)
+            # Store brightness history for this track
+            self.feature_cache.add_brightness(
+                entry, float(current_brightness), self.frame_count)
+            brightness_history = entry['brightness_history']
 
             if len(brightness_history) < 4:
                 return 0.0
@@ -1194,21 +1083,12 @@ class ONNXTrafficDetector:
         except:
             return 0.0
 
-    def _detect_plus_cross_mark(self, region: np.ndarray) -> float:
+    def _detect_plus_cross_mark(self, stats: RegionColorStats) -> float:
         """Detect red cross or plus mark symbols"""
         try:
-            # Convert to HSV for better red detection
-            hsv = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
-
-            # Enhanced red detection for medical cross
-            red_lower1 = np.array([0, 70, 70])      # Bright red
-            red_upper1 = np.array([10, 255, 255])
-            red_lower2 = np.array([170, 70, 70])    # Dark red
-            red_upper2 = np.array([180, 255, 255])
-
-            red_mask1 = cv2.inRange(hsv, red_lower1, red_upper1)
-            red_mask2 = cv2.inRange(hsv, red_lower2, red_upper2)
-            red_mask = cv2.bitwise_or(red_mask1, red_mask2)
+            # Enhanced red detection for medical cross (bright and dark red
+            # HSV bins, see region_features.COLOR_BINS)
+            red_mask = stats.mask('cross_red', 'cross_red2')
 
             # Apply morphological operations to clean up
             kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (5, 5))
@@ -1267,11 +1147,10 @@ class ONNXTrafficDetector:
         except:
             return False
 
-    def _detect_ambulance_text(self, region: np.ndarray) -> float:
+    def _detect_ambulance_text(self, stats: RegionColorStats) -> float:
         """Detect ambulance-related text patterns"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+            gray = stats.gray
 
             # Enhance text contrast
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
@@ -1310,28 +1189,12 @@ class ONNXTrafficDetector:
         except:
             return 0.0
 
-    def _detect_emergency_color_patterns(self, region: np.ndarray) -> float:
+    def _detect_emergency_color_patterns(self, stats: RegionColorStats) -> float:
         """Detect specific emergency vehicle color patterns"""
         try:
-            hsv = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
-
-            # Define emergency colors with more precision
-            colors = {
-                'bright_red': ([0, 120, 120], [10, 255, 255]),
-                'bright_red2': ([170, 120, 120], [180, 255, 255]),
-                'bright_blue': ([100, 120, 120], [130, 255, 255]),
-                'white': ([0, 0, 180], [180, 30, 255]),
-                'bright_yellow': ([20, 120, 120], [30, 255, 255]),
-                'orange': ([10, 120, 120], [20, 255, 255])
-            }
-
-            color_scores = {}
-            total_pixels = region.shape[0] * region.shape[1]
-
-            for color_name, (lower, upper) in colors.items():
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                percentage = np.sum(mask > 0) / total_pixels
-                color_scores[color_name] = percentage
+            # Fraction of pixels in each emergency colour bin, all from one
+            # pass (bins defined in region_features.COLOR_BINS)
+            color_scores = stats.fractions()
 
             pattern_score = 0.0
 
@@ -1354,15 +1217,13 @@ class ONNXTrafficDetector:
         except:
             return 0.0
 
-    def _detect_light_bar_patterns(self, region: np.ndarray) -> float:
+    def _detect_light_bar_patterns(self, stats: RegionColorStats) -> float:
         """Detect horizontal light bar patterns typical of emergency vehicles"""
         try:
             # Focus on top portion where light bars are typically located
-            top_region = region[:region.shape[0]//3, :]
-            hsv_top = cv2.cvtColor(top_region, cv2.COLOR_BGR2HSV)
+            v_channel = stats.value[:stats.shape[0]//3, :]
 
             # Detect bright areas (potential lights)
-            _, _, v_channel = cv2.split(hsv_top)
             bright_mask = cv2.threshold(
                 v_channel, 200, 255, cv2.THRESH_BINARY)[1]
 
@@ -1418,154 +1279,130 @@ class ONNXTrafficDetector:
         except:
             return frame  # Return original if enhancement fails
 
-    def _detect_with_multiple_confidence_levels(self, frame: np.ndarray) -> List[Dict]:
+    def _detect_with_multiple_confidence_levels(self, frame: np.ndarray) -> Detections:
         """Multi-level detection like dedicated detector for better small ambulance detection"""
-        best_detections = []
-
         if not self.ambulance_model:
-            return best_detections
+            return Detections.empty()
 
         # Enhance frame for small ambulance detection
         enhanced_frame = self._enhance_frame_for_small_ambulances(frame)
 
+        # Run the ambulance model once, keeping candidates down to the lowest
+        # level, instead of one inference per level
+        try:
+            # Enhancement falls back to the original frame on failure, in which
+            # case the vehicle model's letterboxed tensor can be reused as-is
+            preprocessed = self._frame_preprocessed if enhanced_frame is frame else None
+            candidates = self.ambulance_model.detect_candidates(
+                enhanced_frame, min(self.ambulance_confidence_levels), preprocessed)
+        except Exception as e:
+            logger.debug(f"Ambulance candidate detection failed: {e}")
+            return Detections.empty()
+
+        best_detections = []
+
         # Try multiple confidence levels (from dedicated detector approach)
         for conf_level in self.ambulance_confidence_levels:
             try:
-                # Temporarily adjust model confidence
-                original_conf = self.ambulance_model.conf_thres
-                self.ambulance_model.conf_thres = conf_level
-
                 # Get detections at this confidence level
-                raw_detections = self.ambulance_model.detect(enhanced_frame)
-
-                # Restore original confidence
-                self.ambulance_model.conf_thres = original_conf
-
-                # Process detections
-                for detection in raw_detections:
-                    bbox = detection['bbox']
-                    confidence = detection['confidence']
-
-                    # Enhanced validation for small ambulances
-                    if self._is_valid_small_ambulance(bbox, confidence, frame.shape):
-                        detection['enhanced'] = True
-                        detection['conf_level'] = conf_level
-                        best_detections.append(detection)
-
-                        # Early exit if we found high-confidence detection
-                        if confidence > 0.15:
-                            # Return only the best one
-                            return best_detections[:1]
-
+                raw_detections = self.ambulance_model.select_candidates(
+                    candidates, conf_level)
             except Exception as e:
                 continue
 
-        return best_detections
+            # Enhanced validation for small ambulances
+            valid = raw_detections.filter(
+                self._valid_small_ambulance_mask(raw_detections))
+            valid.set_extra('conf_level', conf_level)
+            best_detections.append(valid)
+
+            # Early exit if we found high-confidence detection
+            if np.any(valid.scores.astype(np.float64) > 0.15):
+                # Return only the best one
+                return Detections.concat(best_detections).filter(slice(0, 1))
+
+        return Detections.concat(best_detections)
 
-    def _is_valid_small_ambulance(self, bbox: List[float], confidence: float, frame_shape: Tuple) -> bool:
+    def _valid_small_ambulance_mask(self, detections: Detections) -> np.ndarray:
         """Enhanced validation for small ambulances (from dedicated detector)"""
-        x1, y1, x2, y2 = bbox
-        width = x2 - x1
-        height = y2 - y1
+        confidence = detections.scores.astype(np.float64)
+        width = detections.widths()
+        height = detections.heights()
         area = width * height
 
         # Enhanced size check - more lenient for high confidence small detections
-        if confidence > 0.2:  # High confidence - allow smaller areas
-            min_area_threshold = 200
-        elif confidence > 0.1:  # Medium confidence
-            min_area_threshold = 300
-        else:  # Low confidence - use standard threshold
-            min_area_threshold = 400
-
-        if area < min_area_threshold:
-            return False
+        # (high confidence allows smaller areas, low confidence uses standard threshold)
+        min_area_threshold = np.where(
+            confidence > 0.2, 200, np.where(confidence > 0.1, 300, 400))
 
         # Maximum area check
         max_area_threshold = 200000
-        if area > max_area_threshold:
-            return False
+        valid = (area >= min_area_threshold) & (area <= max_area_threshold)
 
-        # More lenient aspect ratio for small ambulances
-        if height > 0:
-            aspect_ratio = width / height
-            if area < 1000:  # Small ambulance - more lenient aspect ratio
-                if not (0.2 <= aspect_ratio <= 4.0):
-                    return False
-            else:  # Normal size - standard aspect ratio
-                if not (0.3 <= aspect_ratio <= 3.5):
-                    return False
+        # More lenient aspect ratio for small ambulances, standard otherwise
+        aspect_ratio = np.divide(width, height, out=np.zeros_like(width),
+                                 where=height > 0)
+        small = area < 1000
+        aspect_ok = np.where(small,
+                             (0.2 <= aspect_ratio) & (aspect_ratio <= 4.0),
+                             (0.3 <= aspect_ratio) & (aspect_ratio <= 3.5))
+        valid &= (height <= 0) | aspect_ok
 
         # Minimum dimension check
-        if width < 15 or height < 10:
-            return False
-
-        return True
-
-    def _check_vehicle_overlap(self, ambulance_bbox: List[float], vehicle_detections: List[Dict]) -> bool:
-        """Check if ambulance detection overlaps with any vehicle detection to reduce false positives"""
-        if not self.require_vehicle_overlap or not vehicle_detections:
-            return True  # Skip check if disabled or no vehicles
-
-        ax1, ay1, ax2, ay2 = ambulance_bbox
-        ambulance_area = (ax2 - ax1) * (ay2 - ay1)
+        valid &= (width >= 15) & (height >= 10)
 
-        for vehicle in vehicle_detections:
-            vx1, vy1, vx2, vy2 = vehicle['bbox']
+        return valid
 
-            # Calculate intersection
-            ix1 = max(ax1, vx1)
-            iy1 = max(ay1, vy1)
-            ix2 = min(ax2, vx2)
-            iy2 = min(ay2, vy2)
+    def _vehicle_overlap_mask(self, ambulance_detections: Detections,
+                              vehicle_detections: Detections) -> np.ndarray:
+        """Check which ambulance detections overlap a vehicle detection to reduce false positives"""
+        if not self.require_vehicle_overlap or len(vehicle_detections) == 0:
+            # Skip check if disabled or no vehicles
+            return np.ones(len(ambulance_detections), dtype=bool)
 
-            if ix1 < ix2 and iy1 < iy2:  # There's an intersection
-                intersection_area = (ix2 - ix1) * (iy2 - iy1)
-                overlap_ratio = intersection_area / ambulance_area
+        # If ambulance overlaps significantly with a vehicle, it's likely valid
+        overlap = self._overlap_ratios(
+            ambulance_detections.boxes, vehicle_detections.boxes)
+        return (overlap > self.min_overlap_ratio).any(axis=1)
 
-                # If ambulance overlaps significantly with a vehicle, it's likely valid
-                if overlap_ratio > self.min_overlap_ratio:  # Use configurable threshold
-                    return True
-
-        return False  # No significant overlap found
-
-    def _detect_ambulance_from_vehicles(self, vehicle_detections: List[Dict], frame: np.ndarray) -> List[Dict]:
+    def _detect_ambulance_from_vehicles(self, vehicle_detections: Detections, frame: np.ndarray) -> Detections:
         """Fallback: Try to identify ambulances from regular vehicle detections based on visual cues"""
-        if not self.use_vehicle_as_ambulance_fallback:
-            return []
+        if not self.use_vehicle_as_ambulance_fallback or len(vehicle_detections) == 0:
+            return Detections.empty()
 
-        ambulance_candidates = []
-
-        for i, vehicle in enumerate(vehicle_detections):
-            bbox = vehicle['bbox']
-
-            # Generate detection ID for features
-            detection_id = f"fallback_{i}_{self.frame_count}"
+        keep = []
+        feature_scores = []
+        feature_sets = []
 
-            # Check for ambulance visual features
+        for i, bbox in enumerate(vehicle_detections.boxes.tolist()):
+            # Check for ambulance visual features (stops early when the
+            # feature score can no longer exceed 0.15)
             features = self._detect_ambulance_features(
-                frame, bbox, detection_id)
+                frame, bbox, self._feature_track_id(bbox), accept_threshold=0.15)
             total_feature_score = features['total_boost']
 
             # If vehicle has strong ambulance features, consider it an ambulance
             if total_feature_score > 0.15:  # Significant feature presence
-                ambulance_detection = {
-                    'bbox': bbox,
-                    'confidence': 0.02 + total_feature_score,  # Base confidence + features
-                    'fallback': True,
-                    'original_vehicle': vehicle,
-                    'feature_score': total_feature_score,
-                    'features': features,
-                    'detection_id': detection_id
-                }
-                ambulance_candidates.append(ambulance_detection)
+                keep.append(i)
+                feature_scores.append(total_feature_score)
+                feature_sets.append(features)
 
                 if self.debug_ambulance:
                     logger.debug(
                         f"FALLBACK Ambulance candidate: vehicle with feature_score={total_feature_score:.3f}")
 
+        ambulance_candidates = vehicle_detections.filter(keep)
+        # Base confidence + features
+        ambulance_candidates.scores = (
+            0.02 + np.asarray(feature_scores, dtype=np.float64)).astype(np.float32)
+        ambulance_candidates.class_ids[:] = 0
+        ambulance_candidates.flags[:] = FLAG_AMBULANCE | FLAG_FALLBACK
+        ambulance_candidates.set_extra('feature_boost', feature_scores)
+        ambulance_candidates.set_extra('features', feature_sets)
+
         return ambulance_candidates
 
-    def _apply_enhanced_temporal_analysis(self, detections: List[Dict], frame: np.ndarray) -> List[Dict]:
+    def _apply_enhanced_temporal_analysis(self, detections: Detections, frame: np.ndarray) -> Detections:
         """Enhanced temporal analysis with improved stability checks and detection validation"""
         frame_has_detection = len(detections) > 0
 
@@ -1573,22 +1410,24 @@ class ONNXTrafficDetector:
         self.ambulance_detection_history.append(frame_has_detection)
 
         # Process detections with advanced features and temporal validation
-        enhanced_detections = []
+        keep = []
+        enhanced = {'confidence': [], 'original_confidence': [], 'feature_boost': [],
+                    'temporal_score': [], 'features': []}
+
+        boxes = detections.boxes.tolist()
+        scores = detections.scores.tolist()
 
-        for i, det in enumerate(detections):
-            bbox = det['bbox']
-            confidence = det['confidence']
+        for i in range(len(detections)):
+            bbox = boxes[i]
+            confidence = scores[i]
 
             # Check ROI
             if not self._is_in_ambulance_roi(bbox):
                 continue
 
-            # Generate detection ID for feature tracking
-            detection_id = f"det_{i}_{self.frame_count}"
-
             # Advanced ambulance feature detection
             features = self._detect_ambulance_features(
-                frame, bbox, detection_id)
+                frame, bbox, self._feature_track_id(bbox))
             feature_boost = features['total_boost']
 
             # Enhanced confidence boosting for low confidence detections
@@ -1628,14 +1467,18 @@ class ONNXTrafficDetector:
             final_confidence = min(boosted_confidence * temporal_score, 1.0)
 
             # Update detection with enhanced information
-            det['confidence'] = final_confidence
-            det['original_confidence'] = confidence
-            det['feature_boost'] = feature_boost
-            det['temporal_score'] = temporal_score
-            det['features'] = features
-            det['detection_id'] = detection_id
-
-            enhanced_detections.append(det)
+            keep.append(i)
+            enhanced['confidence'].append(final_confidence)
+            enhanced['original_confidence'].append(confidence)
+            enhanced['feature_boost'].append(feature_boost)
+            enhanced['temporal_score'].append(temporal_score)
+            enhanced['features'].append(features)
+
+        enhanced_detections = detections.filter(keep)
+        enhanced_detections.scores = np.asarray(
+            enhanced.pop('confidence'), dtype=np.float32)
+        for name, values in enhanced.items():
+            enhanced_detections.set_extra(name, values)
 
         # Enhanced stability check with multiple criteria
         self.ambulance_stable = self._is_enhanced_stable_detection(
@@ -1712,7 +1555,7 @@ class ONNXTrafficDetector:
 
         return x_var + y_var
 
-    def _is_enhanced_stable_detection(self, current_detections: List[Dict]) -> bool:
+    def _is_enhanced_stable_detection(self, current_detections: Detections) -> bool:
         """Enhanced stability check with multiple validation criteria"""
         if len(self.ambulance_detection_history) < self.min_tracklet_frames:
             return False
@@ -1750,34 +1593,30 @@ class ONNXTrafficDetector:
                 return False
 
         # Criterion 4: Current detection quality
-        if current_detections:
-            max_current_confidence = max(
-                det['confidence'] for det in current_detections)
+        if len(current_detections):
+            max_current_confidence = float(current_detections.scores.max())
             if max_current_confidence < 0.1:  # Current detection too weak
                 return False
 
         return True
 
-    def _filter_by_stability_and_confidence(self, detections: List[Dict]) -> List[Dict]:
+    def _filter_by_stability_and_confidence(self, detections: Detections) -> Detections:
         """Apply final filtering based on stability and confidence thresholds"""
-        if not detections:
-            return []
+        if len(detections) == 0:
+            return detections
+
+        adaptive_threshold = self._get_adaptive_confidence_thresholds(detections)
+        confidence = detections.scores.astype(np.float64)
 
         # If stable, use adaptive threshold for stable detections
         if self.ambulance_stable:
-            filtered = []
-            for det in detections:
-                adaptive_threshold = self._get_adaptive_confidence_threshold(
-                    det, det['confidence'])
-                # For stable detections, be more lenient
-                stable_threshold = adaptive_threshold * 0.8
-
-                if det['confidence'] >= stable_threshold:
-                    det['stable_threshold_used'] = stable_threshold
-                    filtered.append(det)
-
-            if self.debug_ambulance and filtered:
-                best_det = max(filtered, key=lambda x: x['confidence'])
+            # For stable detections, be more lenient
+            stable_threshold = adaptive_threshold * 0.8
+            filtered = detections.filter(confidence >= stable_threshold)
+
+            if self.debug_ambulance and len(filtered):
+                best_det = filtered.filter(
+                    [int(np.argmax(filtered.scores))]).to_dicts()[0]
                 logger.debug(f"STABLE MODEL Ambulance {len(filtered)}: conf={best_det['confidence']:.3f} "
                              f"(orig={best_det['original_confidence']:.3f}, boost=+{best_det['feature_boost']:.3f}) "
                              f"[level={best_det.get('temporal_score', 1.0):.1f}] [stable_frames={self.stable_frames_count}]")
@@ -1793,18 +1632,12 @@ class ONNXTrafficDetector:
 
         # If not stable, use adaptive threshold but be more conservative
         else:
-            high_conf_detections = []
-            for det in detections:
-                adaptive_threshold = self._get_adaptive_confidence_threshold(
-                    det, det['confidence'])
-                # For unstable detections, be more strict but still adaptive
-                unstable_threshold = min(adaptive_threshold * 1.5, 0.25)
-
-                if det['confidence'] >= unstable_threshold:
-                    det['unstable_threshold_used'] = unstable_threshold
-                    high_conf_detections.append(det)
-
-            if self.debug_ambulance and high_conf_detections:
+            # For unstable detections, be more strict but still adaptive
+            unstable_threshold = np.minimum(adaptive_threshold * 1.5, 0.25)
+            high_conf_detections = detections.filter(
+                confidence >= unstable_threshold)
+
+            if self.debug_ambulance and len(high_conf_detections):
                 logger.debug(
                     f"HIGH-CONF Ambulance (unstable): {len(high_conf_detections)} detections")
 
@@ -1812,53 +1645,388 @@ class ONNXTrafficDetector:
 
     def _is_stable_detection(self) -> bool:
         """Legacy stability check - kept for compatibility"""
-        return self._is_enhanced_stable_detection([])
+        return self._is_enhanced_stable_detection(Detections.empty())
 
     def process_frame(self, frame: np.ndarray) -> np.ndarray:
-        """Process a single frame"""
+        """Process a single frame and return the annotated frame"""
+        result = self.detect_frame(frame)
+        if result is None:
+            return None
+        return self.render(frame, result)
+
+    def detect_frame(self, frame: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Detect, track and count on a single frame without drawing anything
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            Dictionary with 'frame_index', 'detection_frame', 'tracks'
+            ({id: track}), 'vehicle_count', 'filtered_vehicle_count', 'zones',
+            'lines' and 'ambulance' state, or None for a missing frame. Pass it to
+            render() to get the annotated frame.
+        """
         if frame is None:
             return None
+        start = time.perf_counter()
+        self.copy_counter.next_frame()
+        self.feature_cache.expire(self.frame_count)
 
-        # Initialize count line if not set
-        if self.count_line_y is None:
-            self.count_line_y = int(frame.shape[0] * 0.66)  # 2/3 from top
+        # Place the counting lines for this frame size
+        if self.count_lines_shape != frame.shape[:2]:
+            self.tracker.counting.set_lines(
+                parse_count_lines(self.count_lines_config, frame.shape))
+            self.count_lines_shape = frame.shape[:2]
 
         # Setup ambulance ROI if not done (DISABLED for lane-based filtering)
         # self._setup_ambulance_roi(frame.shape)
 
         # Store frame for flashing detection
-        self.previous_frames.append(frame.copy())
+        self.previous_frames.append(frame)
+
+        # Full inference every detection_interval frames; on the frames in
+        # between the tracker extrapolates the boxes
+        detection_frame = self._should_run_detection()
+        if detection_frame:
+            all_detections = self._run_detection(frame)
+            tracked_objects = self.tracker.update(all_detections)
+        else:
+            tracked_objects = self.tracker.predict()
+
+        # Zone-based counting (replaces line crossing when lane filtering is enabled)
+        # Note: Lane filtering already applied at detection level
+        if self.lane_enabled:
+            # Per-zone counting for all tracks at once
+            self._update_zone_counts()
+        else:
+            # Line crossing for all tracks at once (non-lane-based detection)
+            self._update_line_counts()
+
+        self._update_detection_interval(
+            time.perf_counter() - start, detection_frame)
+
+        ambulance_confidences = [obj['confidence'] for obj in tracked_objects.values()
+                                 if obj['class'] == 'ambulance']
+        result = {
+            'frame_index': self.frame_count,
+            'detection_frame': detection_frame,
+            'tracks': tracked_objects,
+            'vehicle_count': self.vehicle_count,
+            'filtered_vehicle_count': self.filtered_vehicle_count,
+            'zones': self.get_zone_counts(),
+            'lines': self.get_line_counts(),
+            'ambulance': {
+                'detected': self.ambulance_detected,
+                'stable': self.ambulance_stable,
+                'confidence': float(max(ambulance_confidences, default=0.0))
+            }
+        }
+
+        # Update frame counter and FPS
+        self.frame_count += 1
+        if self.frame_count % 10 == 0:
+            self._update_fps()
+
+        return result
+
+    def render(self, frame: np.ndarray, result: Dict[str, Any],
+               in_place: bool = False) -> np.ndarray:
+        """
+        Draw the UI and tracked objects of a detect_frame() result
+
+        Args:
+            frame: The frame passed to detect_frame()
+            result: Its result
+            in_place: Draw on frame itself, for callers that no longer need
+                the raw frame (no copy at all)
+
+        Returns:
+            Annotated frame: frame itself, or a copy in one of render_buffers
+            that stays valid for the next render_buffers.size - 1 renders
+        """
+        display_frame = frame if in_place else self.render_buffers.copy(frame)
+        self._draw_enhanced_ui(display_frame, self.fps, result['frame_index'])
+        self._draw_enhanced_detections(display_frame, result['tracks'])
+        return display_frame
 
-        # Make a copy for display
-        display_frame = frame.copy()
+    def _update_zone_counts(self):
+        """
+        Count tracks that moved far enough through a zone in its direction
+
+        A vehicle counts once per zone; vehicle_count counts each vehicle once.
+        """
+        store = self.tracker.store
+        slots = store.active_slots()
+        if len(slots) == 0:
+            return
+
+        # Tracks that were not seen this frame keep their zone state
+        active = store.disappeared[slots] == 0
+        labels = self.lane_mask.labels_at(store.centers(slots))
+        counted_ids, zone_indices = self.tracker.counting.count_zones(labels, slots, active)
+
+        for obj_id, zone_index in zip(counted_ids.tolist(), zone_indices.tolist()):
+            zone_name = self.tracker.counting.zone_names[zone_index]
+            if obj_id in self.tracker.counted_ids:
+                logger.info(f"Vehicle {obj_id} also counted in zone '{zone_name}'")
+                continue
+            self.tracker.counted_ids.add(obj_id)
+            self.vehicle_count += 1
+            logger.info(
+                f"Vehicle {obj_id} counted in zone '{zone_name}'! Total: {self.vehicle_count}")
+
+    def _update_line_counts(self):
+        """
+        Count tracks whose last movement crossed a counting line
+
+        A vehicle counts once per line; vehicle_count counts each vehicle once.
+        """
+        store = self.tracker.store
+        slots = store.active_slots()
+        crossed_before = self.tracker.crossed_ids.mask(slots)
+
+        eligible = None
+        if self.direction_filter_enabled:
+            eligible = self.tracker.counting.moving_towards(slots)
+            self.filtered_vehicle_count += int(np.count_nonzero(~eligible & ~crossed_before))
+
+        counted_ids, line_indices = self.tracker.counting.count_line_crossings(slots, eligible)
+        counted_before = set(store.track_ids[slots[crossed_before]].tolist())
+        for obj_id, line_index in zip(counted_ids.tolist(), line_indices.tolist()):
+            line_name = self.tracker.counting.line_names[line_index]
+            if obj_id in counted_before:
+                logger.info(f"Vehicle {obj_id} also crossed line '{line_name}'")
+                continue
+            counted_before.add(obj_id)
+            self.vehicle_count += 1
+            logger.info(
+                f"Vehicle {obj_id} crossed line '{line_name}'! Total: {self.vehicle_count}")
+
+    def get_feature_stats(self) -> Dict[str, Any]:
+        """Feature cascade stage hit rates/timings and feature cache statistics"""
+        return {
+            'cascade': self.feature_cascade.get_stats(),
+            'cache': self.feature_cache.get_stats()
+        }
+
+    def get_tracker_stats(self) -> Dict[str, Any]:
+        """Track store slot usage/memory and, for ByteTrack, track state counts"""
+        stats = {'store': self.tracker.get_store_stats()}
+        if isinstance(self.tracker, ByteTrackVehicleTracker):
+            stats['states'] = self.tracker.get_stats()
+        return stats
+
+    def get_copy_stats(self) -> Dict[str, Any]:
+        """Bytes of frame data copied per frame (history and render copies)"""
+        stats = self.copy_counter.get_stats()
+        stats.update({
+            'history_frames': len(self.previous_frames),
+            'history_scale': self.previous_frames.scale,
+            'render_buffer_allocations': self.render_buffers.allocations
+        })
+        return stats
+
+    def get_zone_counts(self) -> List[Dict[str, Any]]:
+        """Per-zone vehicle counts (empty without a lane config)"""
+        if not self.lane_enabled:
+            return []
+        return self.tracker.counting.get_zone_counts()
+
+    def get_line_counts(self) -> List[Dict[str, Any]]:
+        """Per-line vehicle counts (empty in zone-based mode)"""
+        if self.lane_enabled:
+            return []
+        return self.tracker.counting.get_line_counts()
+
+    def _ambulance_hold_active(self) -> bool:
+        """True while recent ambulance candidates require detecting every frame"""
+        if self.last_ambulance_candidate_frame is None:
+            return False
+        return self.frame_count - self.last_ambulance_candidate_frame <= self.ambulance_cooldown
+
+    def _emergency_color_cue(self, frame: np.ndarray, vehicle_detections: Detections) -> bool:
+        """True if any vehicle shows emergency-colour cues (scores are cached per track)"""
+        for bbox in vehicle_detections.boxes.tolist():
+            track_id = self._feature_track_id(bbox)
+            entry = cached = None
+            if track_id is not None:
+                entry = self.feature_cache.get(track_id, self.frame_count)
+                cached = self.feature_cache.cached_features(entry, bbox, self.frame_count)
+
+            if cached is not None and 'emergency_colors' in cached:
+                score = cached['emergency_colors']
+            else:
+                region = self._feature_region(frame, bbox)
+                if region is None:
+                    continue
+                score = self._detect_emergency_color_patterns(RegionColorStats(region))
+                if entry is not None:
+                    self.feature_cache.store_features(
+                        entry, bbox, self.frame_count, {'emergency_colors': score},
+                        names=('emergency_colors',), merge=cached is not None)
+
+            if score > 0:
+                return True
+        return False
+
+    def _should_run_ambulance_model(self, frame: np.ndarray, vehicle_detections: Detections,
+                                    fallback_detections: Detections) -> bool:
+        """Ask the ambulance scheduler whether the model runs on this detection frame"""
+        scheduler = self.ambulance_scheduler
+        if not scheduler.enabled:
+            return scheduler.should_run(self.frame_count, len(vehicle_detections))
+
+        recent_hit = self._ambulance_hold_active() or any(
+            list(self.ambulance_detection_history)[-self.recent_hit_frames:])
+
+        # Colour cues are only checked when they could change the decision
+        color_cue = False
+        if (not recent_hit and not scheduler.is_escalated(self.frame_count)
+                and len(vehicle_detections)):
+            color_cue = len(fallback_detections) > 0 or self._emergency_color_cue(
+                frame, vehicle_detections)
+
+        return scheduler.should_run(self.frame_count, len(vehicle_detections),
+                                    recent_hit=recent_hit, color_cue=color_cue)
+
+    def get_ambulance_schedule_stats(self) -> Dict[str, Any]:
+        """Ambulance model schedule state and hit/miss statistics"""
+        return self.ambulance_scheduler.get_stats(self.frame_count)
+
+    def _should_run_detection(self) -> bool:
+        """Decide whether this frame gets full inference or tracker prediction"""
+        interval = self.detection_interval
+        if interval > 1 and self._ambulance_hold_active():
+            interval = 1
+            self.interval_stats['forced_by_ambulance'] += 1
+
+        if self.frames_since_detection + 1 >= interval:
+            self.frames_since_detection = 0
+            self.interval_stats['detection_frames'] += 1
+            return True
+
+        self.frames_since_detection += 1
+        self.interval_stats['predicted_frames'] += 1
+        return False
+
+    def _update_detection_interval(self, frame_time: float, detection_frame: bool):
+        """
+        Record processing time and adapt the detection interval
+
+        With t_det and t_pred the average times of detection and prediction
+        frames, an interval of N frames keeps up with the source when
+        (t_det + (N - 1) * t_pred) / N <= 1 / target_fps.
+        """
+        alpha = 0.2
+        if detection_frame:
+            self.detection_frame_time = frame_time if self.detection_frame_time is None else (
+                self.detection_frame_time * (1 - alpha) + frame_time * alpha)
+        else:
+            self.predicted_frame_time = frame_time if self.predicted_frame_time is None else (
+                self.predicted_frame_time * (1 - alpha) + frame_time * alpha)
+
+        if not self.adaptive_interval_enabled or self.detection_frame_time is None:
+            return
+
+        budget = 1.0 / self.target_fps
+        t_det = self.detection_frame_time
+        t_pred = self.predicted_frame_time if self.predicted_frame_time is not None else 0.0
+        if t_det <= budget:
+            interval = self.base_detection_interval
+        elif t_pred >= budget:
+            interval = self.max_detection_interval
+        else:
+            interval = int(np.ceil((t_det - t_pred) / (budget - t_pred)))
+
+        interval = int(np.clip(interval, self.base_detection_interval,
+                               self.max_detection_interval))
+        if interval != self.detection_interval:
+            logger.info(
+                f"Detection interval {self.detection_interval} -> {interval} "
+                f"(detection {t_det * 1000:.1f} ms, prediction {t_pred * 1000:.1f} ms, "
+                f"target {self.target_fps:.0f} FPS)")
+            self.detection_interval = interval
+
+    def get_detection_interval_stats(self) -> Dict[str, Any]:
+        """Detection interval state and frame counters"""
+        stats = dict(self.interval_stats)
+        stats.update({
+            'interval': self.detection_interval,
+            'base_interval': self.base_detection_interval,
+            'max_interval': self.max_detection_interval,
+            'adaptive': self.adaptive_interval_enabled,
+            'ambulance_hold': self._ambulance_hold_active(),
+            'detection_frame_ms': (self.detection_frame_time or 0.0) * 1000,
+            'predicted_frame_ms': (self.predicted_frame_time or 0.0) * 1000
+        })
+        return stats
+
+    def _run_detection(self, frame: np.ndarray) -> Detections:
+        """
+        Run both models and the ambulance pipeline on one frame
+
+        Returns:
+            Vehicle and ambulance detections (ambulance rows flagged) in
+            frame coordinates, ready for the tracker
+        """
+        # Lane raster follows the frame size (rebuilt only when it changes)
+        if self.lane_mask is not None:
+            self.lane_mask.ensure(frame.shape)
+
+        # In zone-based mode the models can run on the lane's bounding
+        # rectangle only; boxes are shifted back to frame coordinates
+        roi = self._get_inference_roi(frame.shape)
+        if roi is not None:
+            roi_x1, roi_y1, roi_x2, roi_y2 = roi
+            inference_frame = frame[roi_y1:roi_y2, roi_x1:roi_x2]
+        else:
+            roi_x1 = roi_y1 = 0
+            inference_frame = frame
+
+        # Letterbox the frame once; the ambulance model reuses it whenever it
+        # sees the same image at the same input size
+        self._frame_preprocessed = self.vehicle_model.preprocessor(
+            inference_frame, self.vehicle_model.input_buffers.get())
 
         # Run vehicle detection
-        raw_detections = self.vehicle_model.detect(frame)
+        raw_detections = self.vehicle_model.detect(
+            inference_frame, preprocessed=self._frame_preprocessed).offset(roi_x1, roi_y1)
 
         # Filter to only vehicle detections and map to generic "vehicle" class
-        vehicle_detections = self._filter_vehicle_detections(raw_detections)
+        vehicle_detections = self._filter_vehicle_detections(
+            raw_detections, self.tracker_confidence_threshold)
+        # Only ByteTrack's low-confidence stage sees the vehicles below
+        # vehicle_confidence_threshold
+        tracker_vehicle_detections = vehicle_detections
+        if self.tracker_confidence_threshold < self.vehicle_confidence_threshold:
+            vehicle_detections = vehicle_detections.filter(
+                vehicle_detections.scores >= self.vehicle_confidence_threshold)
 
         # Enhanced ambulance detection with false positive reduction
-        ambulance_detections = []
-        detection_frequency = 1  # Process every frame like dedicated detector
+        ambulance_detections = Detections.empty()
 
-        if self.ambulance_model and (self.frame_count % detection_frequency == 0):
+        if self.ambulance_model:
             try:
-                # Primary: Use multi-level detection with frame enhancement
-                raw_ambulance_detections = self._detect_with_multiple_confidence_levels(
-                    frame)
-
                 # Secondary: Fallback detection from vehicles with ambulance features
                 fallback_ambulance_detections = self._detect_ambulance_from_vehicles(
                     vehicle_detections, frame)
 
-                # Combine both detection methods
-                all_ambulance_detections = raw_ambulance_detections + fallback_ambulance_detections
+                # Primary: Use multi-level detection with frame enhancement,
+                # on the frames the scheduler picks
+                if self._should_run_ambulance_model(
+                        frame, vehicle_detections, fallback_ambulance_detections):
+                    raw_ambulance_detections = self._detect_with_multiple_confidence_levels(
+                        inference_frame).offset(roi_x1, roi_y1)
+                    self.ambulance_scheduler.record_result(len(raw_ambulance_detections))
+                else:
+                    raw_ambulance_detections = Detections.empty()
 
-                # Apply enhanced filtering pipeline
-                valid_ambulance_detections = []
+                # Combine both detection methods
+                all_ambulance_detections = Detections.concat(
+                    [raw_ambulance_detections, fallback_ambulance_detections])
 
-                if self.debug_ambulance and (raw_ambulance_detections or fallback_ambulance_detections):
+                if self.debug_ambulance and len(all_ambulance_detections):
                     logger.debug(
                         f"Raw ambulance detections: {len(raw_ambulance_detections)}")
                     logger.debug(
@@ -1871,62 +2039,59 @@ class ONNXTrafficDetector:
                     all_ambulance_detections, frame.shape)
 
                 # Step 1.5: Special handling for very low confidence detections that might be genuine
-                if not filtered_detections and all_ambulance_detections:
+                if len(filtered_detections) == 0 and len(all_ambulance_detections):
                     # Check if we have very low confidence detections that might be real ambulances
-                    very_low_conf_detections = [det for det in all_ambulance_detections
-                                                if 0.02 <= det['confidence'] <= 0.06]
+                    all_scores = all_ambulance_detections.scores.astype(np.float64)
+                    very_low_conf_detections = all_ambulance_detections.filter(
+                        (0.02 <= all_scores) & (all_scores <= 0.06))
 
-                    if very_low_conf_detections:
+                    if len(very_low_conf_detections):
                         # Apply special validation for very low confidence
                         special_validated = self._validate_very_low_confidence_detections(
                             very_low_conf_detections, frame, vehicle_detections)
-                        filtered_detections.extend(special_validated)
+                        filtered_detections = Detections.concat(
+                            [filtered_detections, special_validated])
 
-                        if self.debug_ambulance and special_validated:
+                        if self.debug_ambulance and len(special_validated):
                             logger.debug(
                                 f"Special low-conf validation: {len(special_validated)} detections rescued")
 
-                if self.debug_ambulance and filtered_detections:
+                if self.debug_ambulance and len(filtered_detections):
                     logger.debug(
                         f"After enhanced filtering: {len(filtered_detections)} detections")
 
                 # Step 2: Apply vehicle overlap check for non-fallback detections
-                for i, detection in enumerate(filtered_detections):
-                    bbox = detection['bbox']
-                    conf = detection['confidence']
-                    is_fallback = detection.get('fallback', False)
+                # (always passes for fallback since it comes from vehicles)
+                is_fallback = filtered_detections.has_flag(FLAG_FALLBACK)
+                accepted = is_fallback | self._vehicle_overlap_mask(
+                    filtered_detections, vehicle_detections)
 
-                    if self.debug_ambulance:
-                        detection_type = "FALLBACK" if is_fallback else "MODEL"
+                if self.debug_ambulance:
+                    for i, detection in enumerate(filtered_detections.to_dicts()):
+                        conf = detection['confidence']
+                        detection_type = "FALLBACK" if is_fallback[i] else "MODEL"
                         orig_conf = detection.get('original_confidence', conf)
                         calib_factor = detection.get('calibration_factor', 1.0)
                         logger.debug(f"{detection_type} Ambulance {i+1}: conf={conf:.3f} "
                                      f"(orig={orig_conf:.3f}, calib={calib_factor:.2f})")
+                        if accepted[i]:
+                            logger.debug(
+                                f"→ ACCEPTED: {detection_type} conf={conf:.3f}")
+                        else:
+                            logger.debug("→ FILTERED: No vehicle overlap")
 
-                    # Vehicle overlap check (always passes for fallback since it comes from vehicles)
-                    if not is_fallback:
-                        has_overlap = self._check_vehicle_overlap(
-                            bbox, vehicle_detections)
-                        if not has_overlap:
-                            if self.debug_ambulance:
-                                logger.debug("→ FILTERED: No vehicle overlap")
-                            continue
-
-                    if self.debug_ambulance:
-                        detection_type = "FALLBACK" if is_fallback else "MODEL"
-                        logger.debug(
-                            f"→ ACCEPTED: {detection_type} conf={conf:.3f}")
-                    valid_ambulance_detections.append(detection)
+                valid_ambulance_detections = filtered_detections.filter(accepted)
+
+                # Ambulance candidates switch back to detecting every frame
+                if len(valid_ambulance_detections) > 0:
+                    self.last_ambulance_candidate_frame = self.frame_count
 
                 # Apply enhanced temporal analysis
                 ambulance_detections = self._apply_enhanced_temporal_analysis(
                     valid_ambulance_detections, frame)
 
-                # Ensure ambulance detections have correct class name for visualization
-                for det in ambulance_detections:
-                    # Ensure correct class for visualization
-                    det['class_name'] = 'ambulance'
-                    det['class'] = 'ambulance'       # Alternative field name
+                # Ensure ambulance detections are shown as ambulances
+                ambulance_detections.set_flag(FLAG_AMBULANCE)
 
                 # Update ambulance detection status - process all detections, not just stable ones
                 if len(ambulance_detections) > 0:
@@ -1937,7 +2102,7 @@ class ONNXTrafficDetector:
                         f"Ambulance detected! {len(ambulance_detections)} detections.")
 
                     # Enhanced logging with stability and feature details
-                    for i, det in enumerate(ambulance_detections):
+                    for i, det in enumerate(ambulance_detections.to_dicts()):
                         features = det.get('features', {})
                         feature_boost = det.get('feature_boost', 0)
                         orig_conf = det.get(
@@ -1985,65 +2150,22 @@ class ONNXTrafficDetector:
                 logger.error(
                     f"Error in enhanced ambulance detection: {str(e)}", exc_info=True)
 
-        # Update tracker with detections (ensure ambulance detections are properly formatted)
-        all_detections = vehicle_detections + ambulance_detections
+        # Update tracker with detections; ambulance rows are flagged
+        all_detections = Detections.concat(
+            [tracker_vehicle_detections, ambulance_detections])
 
         # Debug: Log detection info before tracking
         if self.debug_ambulance:
             logger.debug(
                 f"Total detections for tracker: vehicles={len(vehicle_detections)}, ambulances={len(ambulance_detections)}")
-            if ambulance_detections:
+            if len(ambulance_detections):
                 logger.debug(
                     f"Adding {len(ambulance_detections)} ambulance detections to tracker")
-                for i, det in enumerate(ambulance_detections):
+                for i, det in enumerate(ambulance_detections.to_dicts()):
                     logger.debug(
                         f"Ambulance {i+1}: class='{det.get('class_name', 'unknown')}', conf={det['confidence']:.3f}")
 
-        tracked_objects = self.tracker.update(all_detections)
-
-        # Zone-based counting (replaces line crossing when lane filtering is enabled)
-        # Note: Lane filtering already applied at detection level
-        if self.lane_enabled:
-            # Use zone-based counting for lane-filtered detection
-            for obj_id, obj in tracked_objects.items():
-                # Skip if already counted
-                if obj_id in self.tracker.counted_ids:
-                    continue
-
-                # Check zone-based counting (vehicle moved significantly through zone)
-                if self.tracker.check_zone_counting(obj_id):
-                    self.vehicle_count += 1
-                    logger.info(
-                        f"Vehicle {obj_id} counted in zone! Total: {self.vehicle_count}")
-        else:
-            # Legacy line-crossing method for non-lane-based detection
-            for obj_id, obj in tracked_objects.items():
-                # Skip if already counted
-                if obj_id in self.tracker.crossed_ids:
-                    continue
-
-                # Apply direction filtering if enabled
-                if self.direction_filter_enabled:
-                    if not self.tracker.is_moving_towards_camera(obj_id):
-                        self.filtered_vehicle_count += 1
-                        continue
-
-                # Check line crossing
-                if self.tracker.check_line_crossing(obj_id, self.count_line_y):
-                    self.vehicle_count += 1
-                    logger.info(
-                        f"Vehicle {obj_id} crossed the line! Total: {self.vehicle_count}")
-
-        # Draw enhanced UI and detections
-        self._draw_enhanced_ui(display_frame, self.fps, self.frame_count)
-        self._draw_enhanced_detections(display_frame, tracked_objects)
-
-        # Update frame counter and FPS
-        self.frame_count += 1
-        if self.frame_count % 10 == 0:
-            self._update_fps()
-
-        return display_frame
+        return all_detections
 
     def _draw_enhanced_ui(self, frame, fps, frame_count):
         """Draw enhanced UI elements on the frame"""
@@ -2060,25 +2182,35 @@ class ONNXTrafficDetector:
         # Get frame dimensions
         h, w = frame.shape[:2]
 
-        # Create overlay for semi-transparent backgrounds
-        overlay = frame.copy()
-
-        # Draw only lane polygon if enabled
-        if self.lane_enabled and self.lane_polygon is not None:
-            # Draw filled polygon with transparency
-            overlay_lane = frame.copy()
-            cv2.fillPoly(overlay_lane, [self.lane_polygon], (0, 255, 0))
-            cv2.addWeighted(overlay_lane, 0.2, frame, 0.8, 0, frame)
+        # Draw only lane polygon(s) if enabled
+        if self.lane_enabled and self.zone_polygons:
+            # Draw filled polygon with transparency (cached layer)
+            self._blend_lane_overlay(frame)
 
             # Draw polygon outline
-            cv2.polylines(frame, [self.lane_polygon], True, COLOR_GREEN, 2)
+            cv2.polylines(frame, self.zone_polygons, True, COLOR_GREEN, 2)
 
-        # Draw detection line ONLY if NOT using lane-based zone counting
+            # Name and count of each zone when there are several
+            if len(self.zone_polygons) > 1:
+                for polygon, zone in zip(self.zone_polygons, self.get_zone_counts()):
+                    x, y, _, _ = cv2.boundingRect(polygon)
+                    cv2.putText(frame, f"{zone['name']}: {zone['count']}", (x + 5, y + 20),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLOR_GREEN, 2)
+
+        # Draw counting lines ONLY if NOT using lane-based zone counting
         if not self.lane_enabled:
-            line_y = self.count_line_y
-            # Draw full-width counting line for legacy line-crossing method
-            cv2.line(frame, (0, line_y),
-                     (frame.shape[1], line_y), (0, 255, 255), 3)
+            self._draw_count_lines(frame)
+
+    def _draw_count_lines(self, frame):
+        """Draw the counting lines, with names and counts when there are several"""
+        counting = self.tracker.counting
+        for start, end in zip(counting.starts.astype(int).tolist(), counting.ends.astype(int).tolist()):
+            cv2.line(frame, tuple(start), tuple(end), (0, 255, 255), 3)
+
+        if len(counting.line_names) > 1:
+            for start, line in zip(counting.starts.astype(int).tolist(), counting.get_line_counts()):
+                cv2.putText(frame, f"{line['name']}: {line['count']}", (start[0] + 5, start[1] - 8),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
     def _draw_enhanced_detections(self, frame, tracked_objects):
         """Draw enhanced bounding boxes and trajectories"""
@@ -2089,10 +2221,7 @@ class ONNXTrafficDetector:
         # Draw detection line ONLY if NOT using lane-based zone counting
         # Zone-based counting doesn't need a line - the zone itself is the counting area
         if not self.lane_enabled:
-            line_y = self.count_line_y
-            # Draw full-width counting line for legacy line-crossing method
-            cv2.line(frame, (0, line_y),
-                     (frame.shape[1], line_y), (0, 255, 255), 3)
+            self._draw_count_lines(frame)
 
         # Draw tracked objects with enhanced styling
         for obj_id, obj in tracked_objects.items():
@@ -2170,6 +2299,8 @@ def main():
                         help="Path to lane configuration file or directory")
     parser.add_argument("--no-filter", action="store_true",
                         help="Disable lane filtering (use normal line-based mode)")
+    parser.add_argument("--headless", action="store_true",
+                        help="No display window; frames are only drawn when --output is set")
     args = parser.parse_args()
 
     # Check if source is a video file and handle configuration
@@ -2237,7 +2368,12 @@ def main():
         out = cv2.VideoWriter(args.output, fourcc, fps,
                               (frame_width, frame_height))
 
-    logger.info("Starting detection. Press 'q' to quit...")
+    # No window in dashboard mode or when asked to run headless
+    headless = args.headless or bool(os.environ.get('DASHBOARD_MODE'))
+    if headless:
+        logger.info("Starting headless detection...")
+    else:
+        logger.info("Starting detection. Press 'q' to quit...")
 
     # Main loop
     while True:
@@ -2246,26 +2382,28 @@ def main():
             logger.info("End of video")
             break
 
-        # Process frame
-        processed_frame = detector.process_frame(frame)
-
-        # Display the frame (only in standalone mode, not when running via dashboard)
-        # Check if running in dashboard/headless mode
-        import os
-        if not os.environ.get('DASHBOARD_MODE'):
-            cv2.imshow("Enhanced Traffic Detection System", processed_frame)
+        # Detect, track and count; draw only if the frame is shown or written
+        result = detector.detect_frame(frame)
+        if headless and out is None:
+            continue
+        processed_frame = detector.render(frame, result, in_place=True)
 
         # Write frame to output video
         if out is not None:
             out.write(processed_frame)
 
+        if headless:
+            continue
+
+        # Display the frame (only in standalone mode, not when running via dashboard)
+        cv2.imshow("Enhanced Traffic Detection System", processed_frame)
+
         # Handle keyboard input
         key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
             break
         elif key == ord('r'):
-            detector.vehicle_count = 0
-            detector.tracker.crossed_ids.clear()
+            detector.reset_counters()
             logger.info("Vehicle count reset!")
         elif key == ord('s'):
             screenshot_name = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
@@ -2277,12 +2415,11 @@ def main():
     if out is not None:
         out.release()
 
-    # Only destroy windows if not in dashboard mode
-    import os
-    if not os.environ.get('DASHBOARD_MODE'):
+    # Only destroy windows if not in dashboard/headless mode
+    if not headless:
         cv2.destroyAllWindows()
 
-    logger.info("Processing completed successfully")
+    logger.info(f"Processing completed successfully. Vehicles counted: {detector.vehicle_count}")
 
 
 if __name__ == "__main__":
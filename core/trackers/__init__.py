@@ -2,4 +2,21 @@
 Vehicle tracking module.
 """
 
-__all__ = []
+from .matching import MatchingEngine, MATCHING_SOLVERS
+from .kalman import KalmanBoxFilter
+from .track_store import TrackStore
+from .counting import CountingEngine
+from .centroid import ONNXVehicleTracker
+from .bytetrack import ByteTrackVehicleTracker, TRACKER_TYPES, create_tracker
+
+__all__ = [
+    "MatchingEngine",
+    "MATCHING_SOLVERS",
+    "KalmanBoxFilter",
+    "TrackStore",
+    "CountingEngine",
+    "ONNXVehicleTracker",
+    "ByteTrackVehicleTracker",
+    "TRACKER_TYPES",
+    "create_tracker",
+]
@@ -0,0 +1,324 @@
+"""
+ByteTrack-style vehicle tracker
+
+Extends the centroid tracker with a constant-velocity Kalman motion model
+and two-stage IoU association, so low-confidence detections keep
+partially occluded vehicles on their tracks. create_tracker() builds the
+tracker selected by the detection.tracker settings.
+"""
+import numpy as np
+from typing import Any, Dict, List
+
+from ..detectors.detections import Detections, FLAG_AMBULANCE
+from .centroid import ONNXVehicleTracker
+from .matching import assign, iou_cost
+from .kalman import KalmanBoxFilter, xyxy_to_xyah, xyah_to_xyxy
+
+# Track states of ByteTrackVehicleTracker
+TRACK_TENTATIVE = 'tentative'  # Not yet confirmed, no ID, not reported
+TRACK_TRACKED = 'tracked'      # Matched on the last detection frame
+TRACK_LOST = 'lost'            # Unmatched, kept for re-association
+TRACK_REMOVED = 'removed'      # Lost for more than max_disappeared frames
+
+# Codes of the confirmed states in the track store
+_STATE_TRACKED = 1
+_STATE_LOST = 2
+
+
+class ByteTrackVehicleTracker(ONNXVehicleTracker):
+    """
+    ByteTrack-style tracker with a constant-velocity Kalman motion model
+
+    Each detection frame runs two association stages on IoU with the
+    Kalman-predicted boxes: high-confidence detections against all tracked
+    and lost tracks, then low-confidence detections against the tracks
+    still unmatched that were tracked on the previous detection frame (so
+    partially occluded vehicles keep their IDs). Remaining high-confidence
+    detections start tentative tracks, which get an ID once matched on
+    min_hits detection frames. Ambulance detections always count as high
+    confidence.
+
+    The interface matches ONNXVehicleTracker: objects holds tracked and
+    lost tracks, disappeared counts frames since the last match, and
+    predict() advances every track by its filtered velocity.
+    """
+
+    def __init__(self, max_disappeared: int = 30, high_threshold: float = 0.5,
+                 low_threshold: float = 0.1, new_track_threshold: float = 0.5,
+                 match_iou: float = 0.2, low_match_iou: float = 0.5,
+                 tentative_match_iou: float = 0.3, min_hits: int = 2,
+                 matching: str = 'greedy', capacity: int = 64):
+        """
+        Initialize tracker
+
+        Args:
+            max_disappeared: Frames a lost track is kept for re-association
+            high_threshold: Detections at or above this confidence take part
+                in the first association stage
+            low_threshold: Detections below this confidence are ignored
+            new_track_threshold: Minimum confidence to start a track
+            match_iou: Minimum IoU of first-stage matches
+            low_match_iou: Minimum IoU of second-stage (low-confidence) matches
+            tentative_match_iou: Minimum IoU to continue a tentative track
+            min_hits: Detection frames a tentative track needs to be confirmed
+            matching: Assignment solver, 'greedy' or 'hungarian'
+            capacity: Initial track slots of the track store
+        """
+        super().__init__(max_disappeared=max_disappeared, matching=matching,
+                         capacity=capacity)
+        self.kalman = KalmanBoxFilter()
+        self.solver = self.matcher.solver
+
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.new_track_threshold = new_track_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.tentative_match_iou = tentative_match_iou
+        self.min_hits = max(1, int(min_hits))
+
+        # Kalman and lifecycle state of confirmed tracks, per store slot
+        self.store.add_field('kf_mean', (8,))  # (cx, cy, a, h, vcx, vcy, va, vh)
+        self.store.add_field('kf_covariance', (8, 8))
+        self.store.add_field('state', dtype=np.int8)
+
+        # Unconfirmed tracks: {'mean', 'covariance', 'class', 'confidence', 'hits'}
+        self.tentative = []
+        self.first_update = True
+
+        self.state_stats = {
+            'confirmed': 0,
+            'tentative_dropped': 0,
+            'removed': 0,
+            'low_confidence_matches': 0,
+            'recovered': 0
+        }
+
+    def update(self, detections: Detections):
+        """Update tracker with new detections"""
+        self.frame_index += 1
+        elapsed = self.frames_since_update
+        self.frames_since_update = 1
+        store = self.store
+        slots = store.active_slots()
+        store.ages[slots] += 1
+        self._predict_tracks(slots)
+
+        boxes = detections.boxes.astype(np.float64).reshape(-1, 4)
+        scores = detections.scores.astype(np.float64)
+        class_names = detections.class_names()
+        is_ambulance = detections.has_flag(FLAG_AMBULANCE)
+        high = np.flatnonzero((scores >= self.high_threshold) | is_ambulance)
+        low = np.flatnonzero((scores >= self.low_threshold) & (scores < self.high_threshold)
+                             & ~is_ambulance)
+        matched = np.zeros(len(slots), dtype=bool)
+
+        # Stage 1: high-confidence detections against tracked and lost tracks
+        matches, unmatched_tracks, unmatched_high = assign(
+            iou_cost(self._track_boxes(slots), boxes[high], self.match_iou), self.solver)
+        self._apply_matches(slots[matches[:, 0]], high[matches[:, 1]], boxes, scores, is_ambulance)
+        matched[matches[:, 0]] = True
+
+        # Stage 2: low-confidence detections against tracks that were tracked
+        remaining = unmatched_tracks[store.state[slots[unmatched_tracks]] == _STATE_TRACKED]
+        if len(remaining) and len(low):
+            matches, _, _ = assign(
+                iou_cost(self._track_boxes(slots[remaining]), boxes[low], self.low_match_iou),
+                self.solver)
+            self._apply_matches(slots[remaining[matches[:, 0]]], low[matches[:, 1]],
+                                boxes, scores, is_ambulance)
+            matched[remaining[matches[:, 0]]] = True
+            self.state_stats['low_confidence_matches'] += len(matches)
+
+        # Stage 3: remaining high-confidence detections continue tentative tracks
+        unmatched_high = self._update_tentative(high[unmatched_high], boxes, scores, class_names)
+
+        # Start tracks from what is left
+        starts = unmatched_high[(scores[unmatched_high] >= self.new_track_threshold)
+                                | is_ambulance[unmatched_high]]
+        if len(starts):
+            means, covariances = self.kalman.initiate(xyxy_to_xyah(boxes[starts]))
+            for k, j in enumerate(starts.tolist()):
+                track = {'mean': means[k], 'covariance': covariances[k],
+                         'class': class_names[j], 'confidence': scores[j], 'hits': 1}
+                if self.first_update or self.min_hits <= 1:
+                    self._confirm(track)
+                else:
+                    self.tentative.append(track)
+        self.first_update = False
+
+        # Unmatched confirmed tracks are lost, and removed after max_disappeared
+        lost = slots[~matched]
+        store.state[lost] = _STATE_LOST
+        self.state_stats['removed'] += int(np.count_nonzero(
+            store.disappeared[lost] + elapsed > self.max_disappeared))
+        self._mark_disappeared(lost, elapsed)
+
+        self.objects = store.as_dicts()
+        return self.objects
+
+    def predict(self):
+        """
+        Advance tracks by one frame without detections
+
+        Tracked vehicles move to their Kalman-predicted boxes and their
+        trajectories grow; lost tracks keep their last reported box while
+        their filter state keeps moving for re-association.
+        """
+        self.frame_index += 1
+        self.frames_since_update += 1
+        store = self.store
+        slots = store.active_slots()
+        store.ages[slots] += 1
+        self._predict_tracks(slots)
+
+        tracked = slots[store.state[slots] == _STATE_TRACKED]
+        store.boxes[tracked] = xyah_to_xyxy(store.kf_mean[tracked])
+        store.push_trajectory(tracked, store.centers(tracked))
+
+        self.objects = store.as_dicts()
+        return self.objects
+
+    def get_track_state(self, object_id: int) -> str:
+        """Lifecycle state of a track (TRACK_REMOVED once it is gone)"""
+        slot = self.store.slot(object_id)
+        if slot is None:
+            return TRACK_REMOVED
+        return TRACK_TRACKED if self.store.state[slot] == _STATE_TRACKED else TRACK_LOST
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Track counts per state and lifecycle counters"""
+        stats = dict(self.state_stats)
+        states = self.store.state[self.store.active_slots()]
+        stats.update({
+            'tracked': int(np.count_nonzero(states == _STATE_TRACKED)),
+            'lost': int(np.count_nonzero(states == _STATE_LOST)),
+            'tentative': len(self.tentative)
+        })
+        return stats
+
+    def _predict_tracks(self, slots: np.ndarray):
+        """One Kalman prediction step for every confirmed and tentative track"""
+        store = self.store
+        if len(slots):
+            means = store.kf_mean[slots]
+            # Lost tracks do not keep growing or shrinking
+            means[store.state[slots] != _STATE_TRACKED, 7] = 0
+            store.kf_mean[slots], store.kf_covariance[slots] = self.kalman.predict(
+                means, store.kf_covariance[slots])
+
+        if self.tentative:
+            means, covariances = self.kalman.predict(
+                np.stack([t['mean'] for t in self.tentative]),
+                np.stack([t['covariance'] for t in self.tentative]))
+            for k, track in enumerate(self.tentative):
+                track['mean'] = means[k]
+                track['covariance'] = covariances[k]
+
+    def _track_boxes(self, slots: np.ndarray) -> np.ndarray:
+        """Predicted [N, 4] boxes of confirmed tracks"""
+        return xyah_to_xyxy(self.store.kf_mean[slots])
+
+    def _apply_matches(self, slots: np.ndarray, det_indices: np.ndarray,
+                       boxes: np.ndarray, scores: np.ndarray, is_ambulance: np.ndarray):
+        """Kalman-correct matched tracks and refresh their reported state"""
+        if len(slots) == 0:
+            return
+        store = self.store
+        store.kf_mean[slots], store.kf_covariance[slots] = self.kalman.update(
+            store.kf_mean[slots], store.kf_covariance[slots],
+            xyxy_to_xyah(boxes[det_indices]))
+
+        self.state_stats['recovered'] += int(np.count_nonzero(store.state[slots] == _STATE_LOST))
+        store.state[slots] = _STATE_TRACKED
+        store.boxes[slots] = xyah_to_xyxy(store.kf_mean[slots])
+        store.confidences[slots] = scores[det_indices]
+        store.class_codes[slots] = is_ambulance[det_indices]
+        store.disappeared[slots] = 0
+        store.push_trajectory(slots, store.centers(slots))
+
+    def _update_tentative(self, det_indices: np.ndarray, boxes: np.ndarray,
+                          scores: np.ndarray, class_names: List[str]) -> np.ndarray:
+        """
+        Match tentative tracks to detections, confirming or dropping them
+
+        Returns:
+            Detection indices left unmatched
+        """
+        if not self.tentative:
+            return det_indices
+
+        tentative_boxes = xyah_to_xyxy(np.stack([t['mean'] for t in self.tentative]))
+        matches, _, unmatched = assign(
+            iou_cost(tentative_boxes, boxes[det_indices], self.tentative_match_iou),
+            self.solver)
+
+        survivors = []
+        if len(matches):
+            matched = [self.tentative[i] for i in matches[:, 0]]
+            js = det_indices[matches[:, 1]]
+            means, covariances = self.kalman.update(
+                np.stack([t['mean'] for t in matched]),
+                np.stack([t['covariance'] for t in matched]),
+                xyxy_to_xyah(boxes[js]))
+            for k, (track, j) in enumerate(zip(matched, js.tolist())):
+                track.update({'mean': means[k], 'covariance': covariances[k],
+                              'class': class_names[j], 'confidence': float(scores[j])})
+                track['hits'] += 1
+                if track['hits'] >= self.min_hits:
+                    self._confirm(track)
+                else:
+                    survivors.append(track)
+
+        # Tentative tracks must be matched on consecutive detection frames
+        self.state_stats['tentative_dropped'] += len(self.tentative) - len(matches)
+        self.tentative = survivors
+        return det_indices[unmatched]
+
+    def _confirm(self, track: Dict[str, Any]) -> int:
+        """Give a tentative track an ID and report it from now on"""
+        bbox = xyah_to_xyxy(track['mean'][None])[0]
+        object_id = self._register(bbox, track['class'], float(track['confidence']))
+        slot = self.store.slot(object_id)
+        self.store.kf_mean[slot] = track['mean']
+        self.store.kf_covariance[slot] = track['covariance']
+        self.store.state[slot] = _STATE_TRACKED
+        self.state_stats['confirmed'] += 1
+        return object_id
+
+
+TRACKER_TYPES = ('centroid', 'bytetrack')
+
+
+def create_tracker(tracker_config: Dict[str, Any]) -> ONNXVehicleTracker:
+    """
+    Build the vehicle tracker selected by the detection.tracker settings
+
+    Args:
+        tracker_config: The detection.tracker section ('type' is 'centroid'
+            for ONNXVehicleTracker or 'bytetrack' for ByteTrackVehicleTracker)
+    """
+    tracker_type = tracker_config.get('type', 'centroid')
+    if tracker_type not in TRACKER_TYPES:
+        raise ValueError(
+            f"Unknown tracker type '{tracker_type}', expected one of {TRACKER_TYPES}")
+
+    if tracker_type == 'bytetrack':
+        bytetrack_config = tracker_config.get('bytetrack', {}) or {}
+        return ByteTrackVehicleTracker(
+            max_disappeared=tracker_config.get('max_disappeared', 30),
+            high_threshold=bytetrack_config.get('high_threshold', 0.5),
+            low_threshold=bytetrack_config.get('low_threshold', 0.1),
+            new_track_threshold=bytetrack_config.get('new_track_threshold', 0.5),
+            match_iou=bytetrack_config.get('match_iou', 0.2),
+            low_match_iou=bytetrack_config.get('low_match_iou', 0.5),
+            tentative_match_iou=bytetrack_config.get('tentative_match_iou', 0.3),
+            min_hits=bytetrack_config.get('min_hits', 2),
+            matching=tracker_config.get('matching', 'greedy'))
+
+    return ONNXVehicleTracker(
+        max_disappeared=tracker_config.get('max_disappeared', 30),
+        max_distance=tracker_config.get('max_distance', 100),
+        matching=tracker_config.get('matching', 'greedy'),
+        iou_weight=tracker_config.get('iou_weight', 0.0),
+        grid_min_tracks=tracker_config.get('grid_min_tracks', 200))
@@ -0,0 +1,290 @@
+"""
+Centroid vehicle tracker
+
+Matches detections to tracks by center distance (optionally blended with
+IoU) through MatchingEngine, smooths matched boxes and moves unmatched
+tracks by their estimated velocity between detection frames. All
+per-track state lives in a TrackStore.
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from ..detectors.detections import Detections, FLAG_AMBULANCE
+from ..detectors.lane_mask import LaneMaskRaster
+from .matching import MatchingEngine
+from .counting import CountingEngine
+from .track_store import (TrackStore, TrackFieldView, TrackFlagSet,
+                          FLAG_COUNTED, FLAG_CROSSED, FLAG_VELOCITY)
+
+
+class ONNXVehicleTracker:
+    """Improved vehicle tracking system using ONNX models"""
+
+    def __init__(self, max_disappeared: int = 30, max_distance: float = 100,
+                 matching: str = 'greedy', iou_weight: float = 0.0,
+                 capacity: int = 64, grid_min_tracks: Optional[int] = 200):
+        """
+        Initialize tracker
+
+        Args:
+            max_disappeared: Frames a track survives without a match
+            max_distance: Center distance (pixels) beyond which tracks and
+                detections are never matched
+            matching: Assignment solver, 'greedy' or 'hungarian'
+            iou_weight: Weight of 1 - IoU in the matching cost (0 = center
+                distance only)
+            capacity: Initial track slots of the track store (doubles when full)
+            grid_min_tracks: Match through the spatial grid from this many
+                tracks (None = always dense)
+        """
+        self.next_id = 0
+        self.max_disappeared = max_disappeared
+        self.max_distance = max_distance
+        self.matcher = MatchingEngine(max_distance, matching, iou_weight, grid_min_tracks)
+
+        # Enhanced smoothing parameters
+        self.smoothing_factor = 0.65
+
+        # All per-track state (boxes, velocities, trajectories, counting
+        # flags) lives in slot arrays that are reset when a track is removed
+        self.max_trajectory_length = 20
+        self.store = TrackStore(capacity, self.max_trajectory_length)
+
+        # {id: {'bbox': [x1,y1,x2,y2], 'class': 'vehicle', 'confidence': 0.8}},
+        # a snapshot of the store taken after every update()/predict()
+        self.objects = {}
+        self.disappeared = TrackFieldView(self.store, 'disappeared')  # {id: frames_disappeared}
+
+        # Motion model for frames without detection: per-frame velocity of
+        # each track's center, estimated between detections
+        self.velocity_smoothing = 0.5
+        self.frame_index = 0
+        # Frames since the last update() (1 when detecting every frame)
+        self.frames_since_update = 1
+
+        # Line crossing detection (legacy - kept for backward compatibility)
+        self.crossed_ids = TrackFlagSet(self.store, FLAG_CROSSED)
+        self.line_y = None
+
+        # Zone-based counting (new approach)
+        self.counted_ids = TrackFlagSet(self.store, FLAG_COUNTED)  # IDs that have been counted
+        self.min_movement_to_count = 50  # Minimum pixels moved through zone to count
+
+        # Line-crossing and zone-entry counting for all tracks at once
+        self.counting = CountingEngine(self.store, min_movement=self.min_movement_to_count)
+
+        # Color palette for tracks
+        self.color_palette = [
+            (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+            (255, 0, 255), (0, 255, 255), (128, 0, 128), (255, 165, 0),
+            (0, 128, 255), (255, 20, 147), (34, 139, 34), (255, 140, 0)
+        ]
+
+        # Called with the id of every deregistered track (e.g. to drop cached state)
+        self.deregister_callbacks = []
+
+    def update(self, detections: Detections):
+        """Update tracker with new detections"""
+        self.frame_index += 1
+        # Frames predicted since the last detection count towards disappearance
+        elapsed = self.frames_since_update
+        self.frames_since_update = 1
+        store = self.store
+        slots = store.active_slots()
+        store.ages[slots] += 1
+
+        if len(detections) == 0:
+            # No detections, mark all as disappeared
+            self._mark_disappeared(slots, elapsed)
+            self.objects = store.as_dicts()
+            return self.objects
+
+        boxes = detections.boxes.astype(np.float64)
+        scores = detections.scores.tolist()
+        class_names = detections.class_names()
+
+        if len(slots) == 0:
+            # First frame, register all detections
+            unmatched_detections = range(len(detections))
+        else:
+            # Match detections to existing objects in one cost-matrix pass
+            matches, unmatched_tracks, unmatched_detections = self.matcher(
+                store.boxes[slots], boxes)
+            matched = slots[matches[:, 0]]
+            det_indices = matches[:, 1]
+
+            # Smooth the bounding boxes (truncated to whole pixels)
+            store.boxes[matched] = np.trunc(
+                store.boxes[matched] * (1 - self.smoothing_factor)
+                + boxes[det_indices] * self.smoothing_factor)
+            store.confidences[matched] = detections.scores[det_indices]
+            store.class_codes[matched] = detections.has_flag(FLAG_AMBULANCE)[det_indices]
+
+            # Reset disappeared counter, update trajectory and velocity
+            store.disappeared[matched] = 0
+            centers = store.centers(matched)
+            store.push_trajectory(matched, centers)
+            self._update_velocity(matched, centers)
+
+            self._mark_disappeared(slots[unmatched_tracks], elapsed)
+
+        # Handle unmatched detections (new objects)
+        for j in unmatched_detections:
+            self._register(boxes[j], class_names[j], scores[j])
+
+        self.objects = store.as_dicts()
+        return self.objects
+
+    def predict(self):
+        """
+        Advance tracks by one frame without detections
+
+        Tracks that were matched by the last update() move by their estimated
+        velocity, and their trajectories grow as on detection frames, so zone
+        and line counting keep working between detections. Tracks that are
+        already missing stay where they were last seen.
+        """
+        self.frame_index += 1
+        self.frames_since_update += 1
+        store = self.store
+        slots = store.active_slots()
+        store.ages[slots] += 1
+
+        seen = slots[store.disappeared[slots] == 0]
+        store.boxes[seen] += np.tile(store.velocities[seen], 2)
+        store.push_trajectory(seen, store.centers(seen))
+
+        self.objects = store.as_dicts()
+        return self.objects
+
+    def _mark_disappeared(self, slots: np.ndarray, elapsed: int):
+        """Count missed frames and deregister tracks missing too long"""
+        store = self.store
+        store.disappeared[slots] += elapsed
+        expired = slots[store.disappeared[slots] > self.max_disappeared]
+        for object_id in store.track_ids[expired].tolist():
+            self._deregister(object_id)
+
+    def _update_velocity(self, slots: np.ndarray, centers: np.ndarray):
+        """Update velocity estimates from the latest observed box centers"""
+        store = self.store
+        frames = np.maximum(1, self.frame_index - store.last_frame[slots])
+        velocity = (centers - store.last_center[slots]) / frames[:, None]
+        has_velocity = (store.flags[slots] & FLAG_VELOCITY) != 0
+        alpha = self.velocity_smoothing
+        store.velocities[slots] = np.where(
+            has_velocity[:, None],
+            store.velocities[slots] * (1 - alpha) + velocity * alpha,
+            velocity)
+        store.flags[slots] |= FLAG_VELOCITY
+        store.last_frame[slots] = self.frame_index
+        store.last_center[slots] = centers
+
+    def _register(self, bbox: List[float], class_name: str, confidence: float):
+        """Register a new object"""
+        object_id = self.next_id
+        self.next_id += 1
+        self.store.add(object_id, bbox, class_name, confidence, self.frame_index)
+        return object_id
+
+    def _deregister(self, object_id: int):
+        """Deregister an object"""
+        self.store.remove(object_id)
+        for callback in self.deregister_callbacks:
+            callback(object_id)
+
+    def _get_center(self, bbox: List[float]) -> Tuple[float, float]:
+        """Get center point of bounding box"""
+        x1, y1, x2, y2 = bbox
+        return ((x1 + x2) / 2, (y1 + y2) / 2)
+
+    def track_color(self, object_id: int) -> Tuple[int, int, int]:
+        """Drawing color of a track"""
+        return self.color_palette[object_id % len(self.color_palette)]
+
+    def get_store_stats(self) -> Dict[str, int]:
+        """Track store slot usage and memory"""
+        return self.store.get_stats()
+
+    def is_moving_towards_camera(self, object_id: int, min_frames: int = 5) -> bool:
+        """
+        Check if vehicle is moving towards camera (towards bottom of frame).
+        Returns True if the vehicle's Y position is increasing over time.
+        """
+        slot = self.store.slot(object_id)
+        if slot is None:
+            return False
+        # Average downward movement over the last N points above 0.5 px/frame
+        return bool(self.counting.moving_towards(np.array([slot]), min_frames)[0])
+
+    def is_in_lane(self, object_id: int, lane_polygon) -> bool:
+        """
+        Check if vehicle is within the defined lane polygon.
+
+        lane_polygon may also be a LaneMaskRaster, which answers from its
+        precomputed raster.
+        """
+        slot = self.store.slot(object_id)
+        if slot is None:
+            return False
+
+        center = tuple(self.store.centers(np.array([slot]))[0].tolist())
+
+        if isinstance(lane_polygon, LaneMaskRaster):
+            return bool(lane_polygon.contains(np.array([center]))[0])
+
+        # Use OpenCV's pointPolygonTest
+        result = cv2.pointPolygonTest(lane_polygon, center, False)
+
+        # result >= 0 means inside or on the polygon
+        return result >= 0
+
+    def check_zone_counting(self, object_id: int) -> bool:
+        """
+        Zone-based counting: Count vehicles that have moved significantly through the zone.
+        This replaces the line-crossing method for lane-based detection.
+
+        Returns True if vehicle should be counted (first time meeting criteria)
+        """
+        slot = self.store.slot(object_id)
+        if slot is None:
+            return False
+        # min_movement_to_count may have been changed since construction
+        self.counting.min_movement = self.min_movement_to_count
+        return len(self.counting.count_zone_entries(np.array([slot]))) > 0
+
+    def check_line_crossing(self, object_id: int, line_y: int) -> bool:
+        """
+        Check if an object has crossed a horizontal line at line_y (legacy
+        method; CountingEngine.count_line_crossings() counts all tracks
+        against arbitrary lines)
+        """
+        if object_id in self.crossed_ids:
+            return False
+
+        store = self.store
+        slot = store.slot(object_id)
+        if slot is None or store.trajectory_count[slot] < 2:
+            return False
+
+        # Get the last two points in the trajectory
+        y_prev, y_curr = store.recent_points(np.array([slot]), 2)[0, :, 1].tolist()
+
+        # Check if the line was crossed
+        if y_prev > line_y >= y_curr or y_prev <= line_y < y_curr:
+            self.crossed_ids.add(object_id)
+            return True
+
+        return False
+
+    def draw_trajectories(self, frame: np.ndarray):
+        """Draw trajectories for all tracked objects"""
+        store = self.store
+        for slot in store.active_slots().tolist():
+            points = store.trajectory(slot)
+            if len(points) > 1:
+                color = self.track_color(int(store.track_ids[slot]))
+                points = points.astype(np.int32).reshape((-1, 1, 2))
+                cv2.polylines(frame, [points], isClosed=False,
+                              color=color, thickness=2, lineType=cv2.LINE_AA)
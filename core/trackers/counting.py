@@ -0,0 +1,431 @@
+"""
+Vectorized vehicle counting over the track store
+
+CountingEngine evaluates every track in one NumPy pass per frame:
+
+- Line crossing: the segment between a track's last two trajectory points
+  is tested against each counting line. Lines are arbitrary segments, each
+  with an optional direction, so diagonal or vertical lines count as well
+  as the original horizontal line.
+- Zones: a track inside a zone (label from a LaneMaskRaster) is counted
+  once it has been seen there for min_frames frames and has moved the
+  zone's min_movement pixels along its direction since entering it.
+  Zones come from parse_zones() in core.detectors.zone_counter. The single
+  zone of a plain lane_points config keeps the original rule: no
+  membership test, movement measured from the track's first trajectory
+  point once it has min_frames points.
+- Zone-entry displacement (check_zone_counting()): a track is counted once
+  it has moved min_movement pixels downward from the first trajectory
+  point it had.
+
+Counting lines come from the `counting` section of detection_config.yaml
+with endpoints as fractions of the frame size:
+
+    counting:
+      lines:
+        - name: "main"
+          start: [0.0, 0.66]
+          end: [1.0, 0.66]
+          direction: "any"  # "down", "up", "left", "right", "any" or [dx, dy]
+
+All per-track counting state (per-line and per-zone bit masks, entry
+points, frames in zone) lives in track store fields, so it is dropped with
+the track.
+"""
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..detectors.zone_counter import direction_vector
+from .track_store import TrackStore, FLAG_COUNTED, FLAG_CROSSED
+
+# One bit per line/zone in the store's 'crossed_lines'/'zone_counted' fields
+MAX_COUNT_LINES = 64
+MAX_COUNT_ZONES = 64
+
+# Per-track counting state: (name, shape, dtype, free-slot value)
+_STORE_FIELDS = (
+    ('crossed_lines', (), np.uint64, 0),         # Lines crossed, one bit each
+    ('track_entry', (2,), np.float64, np.nan),   # First trajectory point evaluated
+    ('zone_entry', (2,), np.float64, np.nan),    # Where the current zone was entered
+    ('zone_label', (), np.int32, 0),             # Raster label of that zone (0 = none)
+    ('zone_frames', (), np.int32, 0),            # Frames seen in it
+    ('zone_counted', (), np.uint64, 0),          # Zones counted in, one bit each
+)
+
+# Horizontal line at 2/3 of the frame height, counting both directions
+DEFAULT_COUNT_LINES = [
+    {'name': 'line', 'start': [0.0, 0.66], 'end': [1.0, 0.66], 'direction': 'any'}
+]
+
+
+def parse_count_lines(lines_config: Optional[List[Dict[str, Any]]],
+                      frame_shape: Tuple[int, ...]) -> List[Dict[str, Any]]:
+    """
+    Counting lines in pixel coordinates
+
+    Args:
+        lines_config: Lines with 'start'/'end' as [x, y] fractions of the
+            frame size and optional 'name' and 'direction' (defaults to
+            DEFAULT_COUNT_LINES)
+        frame_shape: Shape of the frame the lines are drawn on
+
+    Returns:
+        List of line dictionaries with 'name', 'start', 'end' ([2] float
+        arrays, whole pixels), 'direction', and 'open_start'/'open_end':
+        an endpoint on the frame border extends the line past it, so tracks
+        extrapolated out of the frame still cross a full-width line
+    """
+    h, w = frame_shape[:2]
+    scale = np.array([w, h], dtype=np.float64)
+    lines = []
+    for i, line in enumerate(lines_config or DEFAULT_COUNT_LINES):
+        start_fraction = np.asarray(line['start'], dtype=np.float64).reshape(2)
+        end_fraction = np.asarray(line['end'], dtype=np.float64).reshape(2)
+        start = np.floor(start_fraction * scale)
+        end = np.floor(end_fraction * scale)
+        if np.array_equal(start, end):
+            continue
+        lines.append({
+            'name': str(line.get('name') or f"line_{i + 1}"),
+            'start': start,
+            'end': end,
+            'direction': line.get('direction', 'any'),
+            'open_start': bool(np.any((start_fraction <= 0) | (start_fraction >= 1))),
+            'open_end': bool(np.any((end_fraction <= 0) | (end_fraction >= 1)))
+        })
+    return lines
+
+
+def line_sides(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    [N, L] cross product of each line direction with (point - line start)
+
+    Positive values are on one side of the line, negative on the other.
+    For a left-to-right horizontal line, positive is below it (image y
+    grows downward).
+    """
+    d = ends - starts  # [L, 2]
+    offset = points[:, None, :] - starts[None, :, :]  # [N, L, 2]
+    return d[None, :, 0] * offset[..., 1] - d[None, :, 1] * offset[..., 0]
+
+
+def segment_crossings(prev: np.ndarray, curr: np.ndarray, starts: np.ndarray,
+                      ends: np.ndarray, open_starts: Optional[np.ndarray] = None,
+                      open_ends: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Which movement segments prev -> curr cross which counting lines
+
+    A point exactly on a line counts as being on its negative side, so a
+    track that stops on the line crosses it once, not twice. For a
+    horizontal line this is the original check
+    `y_prev > line_y >= y_curr or y_prev <= line_y < y_curr`.
+
+    Args:
+        prev: [N, 2] previous points
+        curr: [N, 2] current points
+        starts: [L, 2] line start points
+        ends: [L, 2] line end points
+        open_starts: [L] lines that extend past their start point
+        open_ends: [L] lines that extend past their end point
+
+    Returns:
+        [N, L] True where the segment crosses the line between its endpoints
+    """
+    side_prev = line_sides(prev, starts, ends)
+    side_curr = line_sides(curr, starts, ends)
+    crossed = (side_prev > 0) != (side_curr > 0)
+
+    # Where the movement meets the (infinite) line, as a fraction of the
+    # line; NaN where the segment does not cross it
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = side_prev / (side_prev - side_curr)
+        hit = prev[:, None, :] + s[..., None] * (curr - prev)[:, None, :]
+    d = ends - starts
+    u = np.einsum('nlk,lk->nl', hit - starts[None], d) / np.einsum('lk,lk->l', d, d)
+
+    u_min = np.zeros(len(starts)) if open_starts is None else np.where(open_starts, -np.inf, 0.0)
+    u_max = np.ones(len(starts)) if open_ends is None else np.where(open_ends, np.inf, 1.0)
+    return crossed & (u >= u_min) & (u <= u_max)
+
+
+def _direction_vectors(directions: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """([K] 'any' mask, [K, 2] unit vectors) of line or zone directions"""
+    vectors = [direction_vector(direction) for direction in directions]
+    any_direction = np.array([v is None for v in vectors], dtype=bool)
+    unit_vectors = np.array([v if v is not None else (0.0, 0.0) for v in vectors],
+                            dtype=np.float64).reshape(-1, 2)
+    return any_direction, unit_vectors
+
+
+def _bits(count: int) -> np.ndarray:
+    """[count] uint64 masks 1 << i"""
+    return np.left_shift(np.uint64(1), np.arange(count, dtype=np.uint64))
+
+
+class CountingEngine:
+    """Line-crossing and zone counting for all tracks of a TrackStore"""
+
+    def __init__(self, store: TrackStore, lines: Optional[List[Dict[str, Any]]] = None,
+                 zones: Optional[List[Dict[str, Any]]] = None,
+                 min_movement: float = 50, min_frames: int = 5):
+        """
+        Initialize counting engine
+
+        Args:
+            store: Track store of the tracker
+            lines: Counting lines from parse_count_lines() (pixel coordinates)
+            zones: Counting zones from parse_zones(); zone i has raster label i + 1
+            min_movement: Pixels a track has to move after entering to be
+                counted (zones may override it)
+            min_frames: Frames a track has to be seen (in the zone) first
+        """
+        self.store = store
+        self.min_movement = float(min_movement)
+        self.min_frames = int(min_frames)
+        for name, shape, dtype, fill in _STORE_FIELDS:
+            if not hasattr(store, name):
+                store.add_field(name, shape, dtype, fill)
+        self.set_lines(lines or [])
+        self.set_zones(zones or [])
+
+    def set_lines(self, lines: List[Dict[str, Any]]):
+        """Replace the counting lines (counts restart at zero)"""
+        if len(lines) > MAX_COUNT_LINES:
+            raise ValueError(f"At most {MAX_COUNT_LINES} counting lines are supported, got {len(lines)}")
+        self.lines = list(lines)
+        self.line_names = [line['name'] for line in lines]
+        self.starts = np.array([line['start'] for line in lines], dtype=np.float64).reshape(-1, 2)
+        self.ends = np.array([line['end'] for line in lines], dtype=np.float64).reshape(-1, 2)
+        self.open_starts = np.array([line.get('open_start', False) for line in lines], dtype=bool)
+        self.open_ends = np.array([line.get('open_end', False) for line in lines], dtype=bool)
+        self.line_any_direction, self.line_unit_vectors = _direction_vectors(
+            [line.get('direction', 'any') for line in lines])
+        self.line_bits = _bits(len(lines))
+        self.line_counts = np.zeros(len(lines), dtype=np.int64)
+
+    def set_zones(self, zones: List[Dict[str, Any]]):
+        """Replace the counting zones (counts restart at zero)"""
+        if len(zones) > MAX_COUNT_ZONES:
+            raise ValueError(f"At most {MAX_COUNT_ZONES} counting zones are supported, got {len(zones)}")
+        self.zone_names = [zone['name'] for zone in zones]
+        self.zone_directions = [zone['direction'] for zone in zones]
+        self.zone_any_direction, self.zone_unit_vectors = _direction_vectors(self.zone_directions)
+        self.zone_min_movement = np.array(
+            [zone['min_movement'] if zone.get('min_movement') is not None else self.min_movement
+             for zone in zones], dtype=np.float64)
+        self.zone_bits = _bits(len(zones))
+        self.zone_counts = np.zeros(len(zones), dtype=np.int64)
+        # Plain lane_points config: original rule, see count_zones()
+        self.count_from_track_start = len(zones) == 1 and bool(zones[0].get('track_start'))
+
+    def count_line_crossings(self, slots: Optional[np.ndarray] = None,
+                             eligible: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count tracks whose last movement crossed a counting line
+
+        Each track counts once per line; tracks crossing a line get
+        FLAG_CROSSED.
+
+        Args:
+            slots: Slots to evaluate (defaults to all stored tracks)
+            eligible: [N] mask of the slots that may be counted
+
+        Returns:
+            (track_ids, line_indices) of the crossings on this frame, ordered
+            by track ID then line
+        """
+        store = self.store
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.intp))
+        if slots is None:
+            slots = store.active_slots()
+        slots = np.asarray(slots, dtype=np.intp)
+        if eligible is not None:
+            slots = slots[np.asarray(eligible, dtype=bool)]
+        slots = slots[store.trajectory_count[slots] >= 2]
+        if len(slots) == 0 or len(self.lines) == 0:
+            return empty
+
+        points = store.recent_points(slots, 2)
+        prev, curr = points[:, 0], points[:, 1]
+        crossed = segment_crossings(prev, curr, self.starts, self.ends,
+                                    self.open_starts, self.open_ends)
+
+        # Directed lines only count movement along their direction
+        along = (curr - prev) @ self.line_unit_vectors.T
+        crossed &= self.line_any_direction[None, :] | (along > 0)
+        crossed &= (store.crossed_lines[slots, None] & self.line_bits[None, :]) == 0
+
+        rows, lines = np.nonzero(crossed)
+        if len(rows) == 0:
+            return empty
+
+        np.bitwise_or.at(store.crossed_lines, slots[rows], self.line_bits[lines])
+        store.flags[slots[rows]] |= np.uint8(FLAG_CROSSED)
+        np.add.at(self.line_counts, lines, 1)
+
+        track_ids = store.track_ids[slots[rows]]
+        order = np.lexsort((lines, track_ids))
+        return track_ids[order], lines[order]
+
+    def count_zones(self, labels: np.ndarray, slots: Optional[np.ndarray] = None,
+                    active: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Update zone state for all tracks and count the ones that qualify
+
+        Entering a (different) zone restarts the movement measurement. Each
+        track counts once per zone; setting FLAG_COUNTED is left to the
+        caller, which counts each vehicle once overall.
+
+        For the single zone of a plain lane_points config (track_start),
+        labels and active are ignored: every track counts once it has
+        min_frames trajectory points and has moved min_movement along the
+        zone direction from the first of them, as before named zones.
+
+        Args:
+            labels: [N] zone label at each slot's box centre (0 = outside,
+                from LaneMaskRaster)
+            slots: Slots the labels belong to (defaults to all stored tracks)
+            active: [N] tracks seen this frame (others keep their state)
+
+        Returns:
+            (track_ids, zone_indices) of the tracks counted on this frame
+        """
+        store = self.store
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.intp))
+        if slots is None:
+            slots = store.active_slots()
+        slots = np.asarray(slots, dtype=np.intp)
+        if self.count_from_track_start:
+            return self._count_from_track_start(slots)
+
+        labels = np.asarray(labels).astype(np.int32).reshape(len(slots))
+        inside = (labels > 0) & (labels <= len(self.zone_names))
+        if active is not None:
+            inside &= np.asarray(active, dtype=bool)
+        if not np.any(inside):
+            return empty
+
+        rows = np.flatnonzero(inside)
+        slots = slots[rows]
+        labels = labels[rows]
+        zones = labels - 1
+        centers = store.centers(slots)
+
+        entered = store.zone_label[slots] != labels
+        store.zone_entry[slots[entered]] = centers[entered]
+        store.zone_label[slots[entered]] = labels[entered]
+        store.zone_frames[slots[entered]] = 0
+        store.zone_frames[slots] += 1
+
+        movement = self._zone_movement(centers - store.zone_entry[slots], zones)
+        ready = ((store.zone_frames[slots] >= self.min_frames)
+                 & (movement >= self.zone_min_movement[zones])
+                 & ((store.zone_counted[slots] & self.zone_bits[zones]) == 0))
+        return self._record_zone_counts(slots[ready], zones[ready])
+
+    def _count_from_track_start(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """count_zones() for a single track_start zone"""
+        store = self.store
+        slots = slots[((store.zone_counted[slots] & self.zone_bits[0]) == 0)
+                      & (store.trajectory_count[slots] >= self.min_frames)]
+        zones = np.zeros(len(slots), dtype=np.intp)
+        movement = self._zone_movement(self._track_start_displacement(slots), zones)
+        ready = movement >= self.zone_min_movement[0]
+        return self._record_zone_counts(slots[ready], zones[ready])
+
+    def _zone_movement(self, displacement: np.ndarray, zones: np.ndarray) -> np.ndarray:
+        """[N] movement along each zone's direction (distance for 'any')"""
+        return np.where(self.zone_any_direction[zones],
+                        np.linalg.norm(displacement, axis=1),
+                        np.einsum('ij,ij->i', displacement, self.zone_unit_vectors[zones]))
+
+    def _record_zone_counts(self, slots: np.ndarray,
+                            zones: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mark slots as counted in zones and return (track_ids, zone_indices)"""
+        np.bitwise_or.at(self.store.zone_counted, slots, self.zone_bits[zones])
+        np.add.at(self.zone_counts, zones, 1)
+        return self.store.track_ids[slots], zones
+
+    def _track_start_displacement(self, slots: np.ndarray) -> np.ndarray:
+        """
+        [N, 2] movement of each slot since the first trajectory point it had
+        when first evaluated
+        """
+        store = self.store
+        new = slots[np.isnan(store.track_entry[slots, 0])]
+        store.track_entry[new] = store.first_points(new)
+        current = store.trajectories[slots, store.trajectory_head[slots]]
+        return current - store.track_entry[slots]
+
+    def count_zone_entries(self, slots: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Count tracks that moved min_movement pixels down since entering
+
+        The entry point is the oldest trajectory point held when a track is
+        first evaluated with min_frames points; counted tracks get
+        FLAG_COUNTED.
+
+        Returns:
+            IDs of the tracks counted on this frame
+        """
+        store = self.store
+        if slots is None:
+            slots = store.active_slots()
+        slots = np.asarray(slots, dtype=np.intp)
+        slots = slots[((store.flags[slots] & FLAG_COUNTED) == 0)
+                      & (store.trajectory_count[slots] >= self.min_frames)]
+        if len(slots) == 0:
+            return np.array([], dtype=np.int64)
+
+        counted = slots[self._track_start_displacement(slots)[:, 1] >= self.min_movement]
+        store.flags[counted] |= np.uint8(FLAG_COUNTED)
+        return store.track_ids[counted]
+
+    def moving_towards(self, slots: np.ndarray, min_frames: int = 5,
+                       direction: Sequence[float] = (0.0, 1.0),
+                       min_speed: float = 0.5) -> np.ndarray:
+        """
+        [N] True where the average movement over the last min_frames points
+        along direction exceeds min_speed pixels per frame
+
+        The default direction is down the frame, towards the camera.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        if len(slots) == 0 or min_frames < 2:
+            return np.zeros(len(slots), dtype=bool)
+
+        points = self.store.recent_points(slots, min_frames)
+        movement = (points[:, -1] - points[:, 0]) @ np.asarray(direction, dtype=np.float64)
+        # NaN (too few points) compares False
+        return (self.store.trajectory_count[slots] >= min_frames) & \
+            (movement / (min_frames - 1) > min_speed)
+
+    def reset_counts(self):
+        """Zero the per-line and per-zone counts; tracks already counted are not counted again"""
+        self.line_counts[:] = 0
+        self.zone_counts[:] = 0
+
+    def clear_crossings(self):
+        """Forget which lines every track crossed, so they can be counted again"""
+        self.store.crossed_lines[:] = 0
+        self.store.flags &= ~np.uint8(FLAG_CROSSED)
+
+    def get_line_counts(self) -> List[Dict[str, Any]]:
+        """Per-line counts for metrics and the API"""
+        return [{
+            'name': name,
+            'start': line['start'].tolist(),
+            'end': line['end'].tolist(),
+            'direction': line['direction'] if isinstance(line['direction'], str)
+            else list(line['direction']),
+            'count': int(count)
+        } for name, line, count in zip(self.line_names, self.lines, self.line_counts.tolist())]
+
+    def get_zone_counts(self) -> List[Dict[str, Any]]:
+        """Per-zone counts for metrics and the API"""
+        return [{
+            'name': name,
+            'direction': direction if isinstance(direction, str) else list(direction),
+            'count': int(count)
+        } for name, direction, count in zip(self.zone_names, self.zone_directions,
+                                            self.zone_counts.tolist())]
@@ -0,0 +1,148 @@
+"""
+Constant-velocity Kalman filter for bounding boxes
+
+Boxes are tracked as (center x, center y, aspect ratio, height) plus the
+velocity of each, as in SORT/ByteTrack. Process and measurement noise
+scale with the box height, so small (distant) vehicles are not held to
+the same pixel tolerance as large ones. All operations take stacked
+states of many tracks and run as batched NumPy.
+"""
+import numpy as np
+from typing import Tuple
+
+
+def xyxy_to_xyah(boxes: np.ndarray) -> np.ndarray:
+    """[N, 4] boxes [x1, y1, x2, y2] -> [N, 4] [cx, cy, w / h, h]"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    w = boxes[:, 2] - boxes[:, 0]
+    h = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    return np.column_stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w / h, h])
+
+
+def xyah_to_xyxy(states: np.ndarray) -> np.ndarray:
+    """[N, >=4] states [cx, cy, w / h, h, ...] -> [N, 4] boxes [x1, y1, x2, y2]"""
+    states = np.atleast_2d(np.asarray(states, dtype=np.float64))
+    h = np.maximum(states[:, 3], 0.0)
+    w = np.maximum(states[:, 2], 0.0) * h
+    return np.column_stack([states[:, 0] - w / 2, states[:, 1] - h / 2,
+                            states[:, 0] + w / 2, states[:, 1] + h / 2])
+
+
+class KalmanBoxFilter:
+    """Batched constant-velocity Kalman filter in (cx, cy, a, h) space"""
+
+    def __init__(self, std_weight_position: float = 1.0 / 20,
+                 std_weight_velocity: float = 1.0 / 160):
+        """
+        Initialize filter
+
+        Args:
+            std_weight_position: Position noise as a fraction of box height
+            std_weight_velocity: Velocity noise as a fraction of box height
+        """
+        ndim = 4
+        self.motion_matrix = np.eye(2 * ndim)
+        self.motion_matrix[:ndim, ndim:] = np.eye(ndim)
+        self.update_matrix = np.eye(ndim, 2 * ndim)
+        self.std_weight_position = std_weight_position
+        self.std_weight_velocity = std_weight_velocity
+
+    def initiate(self, measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Start tracks from unassociated measurements
+
+        Args:
+            measurements: [N, 4] boxes in (cx, cy, a, h)
+
+        Returns:
+            Tuple of ([N, 8] means with zero velocity, [N, 8, 8] covariances)
+        """
+        measurements = np.asarray(measurements, dtype=np.float64).reshape(-1, 4)
+        means = np.hstack([measurements, np.zeros_like(measurements)])
+
+        h = measurements[:, 3]
+        std = np.column_stack([
+            2 * self.std_weight_position * h,
+            2 * self.std_weight_position * h,
+            np.full_like(h, 1e-2),
+            2 * self.std_weight_position * h,
+            10 * self.std_weight_velocity * h,
+            10 * self.std_weight_velocity * h,
+            np.full_like(h, 1e-5),
+            10 * self.std_weight_velocity * h,
+        ])
+        return means, self._diag(std ** 2)
+
+    def predict(self, means: np.ndarray, covariances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Advance tracks by one frame
+
+        Args:
+            means: [N, 8] state means
+            covariances: [N, 8, 8] state covariances
+
+        Returns:
+            Predicted (means, covariances)
+        """
+        if len(means) == 0:
+            return means, covariances
+
+        h = means[:, 3]
+        std = np.column_stack([
+            self.std_weight_position * h,
+            self.std_weight_position * h,
+            np.full_like(h, 1e-2),
+            self.std_weight_position * h,
+            self.std_weight_velocity * h,
+            self.std_weight_velocity * h,
+            np.full_like(h, 1e-5),
+            self.std_weight_velocity * h,
+        ])
+        F = self.motion_matrix
+        means = means @ F.T
+        covariances = F @ covariances @ F.T + self._diag(std ** 2)
+        return means, covariances
+
+    def update(self, means: np.ndarray, covariances: np.ndarray,
+               measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Correct tracks with their associated measurements
+
+        Args:
+            means: [N, 8] predicted state means
+            covariances: [N, 8, 8] predicted state covariances
+            measurements: [N, 4] boxes in (cx, cy, a, h), one per track
+
+        Returns:
+            Corrected (means, covariances)
+        """
+        if len(means) == 0:
+            return means, covariances
+
+        H = self.update_matrix
+        h = means[:, 3]
+        std = np.column_stack([
+            self.std_weight_position * h,
+            self.std_weight_position * h,
+            np.full_like(h, 1e-1),
+            self.std_weight_position * h,
+        ])
+        projected_cov = H @ covariances @ H.T + self._diag(std ** 2)
+        PHt = covariances @ H.T  # [N, 8, 4]
+
+        # Kalman gain K = P H^T S^-1, solved as S K^T = H P
+        gain = np.linalg.solve(projected_cov, np.transpose(PHt, (0, 2, 1)))
+        gain = np.transpose(gain, (0, 2, 1))  # [N, 8, 4]
+
+        innovation = measurements - means @ H.T
+        means = means + np.einsum('nij,nj->ni', gain, innovation)
+        covariances = covariances - gain @ projected_cov @ np.transpose(gain, (0, 2, 1))
+        return means, covariances
+
+    @staticmethod
+    def _diag(variances: np.ndarray) -> np.ndarray:
+        """[N, D] variances -> [N, D, D] diagonal matrices"""
+        n, d = variances.shape
+        out = np.zeros((n, d, d))
+        out[:, np.arange(d), np.arange(d)] = variances
+        return out
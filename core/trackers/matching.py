@@ -0,0 +1,550 @@
+"""
+Track-to-detection matching engine
+
+Builds the full track x detection cost matrix in one NumPy broadcast
+(center distance, optionally blended with 1 - IoU) and solves it with a
+vectorized greedy assignment or the Hungarian algorithm. With many tracks
+only pairs in neighbouring cells of a spatial grid are costed, and the
+solvers run on that sparse structure. Includes a micro-benchmark over
+synthetic scenes:
+
+    python -m core.trackers.matching --tracks 10 100 500
+    python -m core.trackers.matching --grid --tracks 25 50 100 200 400 800
+"""
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from ..detectors.nms import bbox_iou
+from .spatial_grid import neighbour_pairs
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    linear_sum_assignment = None
+
+MATCHING_SOLVERS = ('greedy', 'hungarian')
+
+
+def center_distances(track_boxes: np.ndarray, det_boxes: np.ndarray) -> np.ndarray:
+    """
+    Euclidean distances between box centers
+
+    Args:
+        track_boxes: [N, 4] array of boxes in format [x1, y1, x2, y2]
+        det_boxes: [M, 4] array of boxes in format [x1, y1, x2, y2]
+
+    Returns:
+        [N, M] array of distances
+    """
+    track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    det_centers = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+    dx = np.subtract.outer(track_centers[:, 0], det_centers[:, 0])
+    dy = np.subtract.outer(track_centers[:, 1], det_centers[:, 1])
+    dx *= dx
+    dy *= dy
+    dx += dy
+    return np.sqrt(dx, out=dx)
+
+
+def association_cost(track_boxes: np.ndarray, det_boxes: np.ndarray,
+                     max_distance: float, iou_weight: float = 0.0) -> np.ndarray:
+    """
+    Cost of assigning each detection to each track
+
+    The cost is the center distance normalized by max_distance, blended
+    with 1 - IoU by iou_weight. Pairs whose centers are max_distance or
+    more apart are gated out with an infinite cost.
+
+    Returns:
+        [N, M] cost matrix (inf where gated)
+    """
+    cost = center_distances(track_boxes, det_boxes)
+    cost /= max_distance
+    gated = cost >= 1.0
+    if iou_weight > 0:
+        cost *= 1 - iou_weight
+        cost += iou_weight * (1 - bbox_iou(track_boxes, det_boxes))
+    cost[gated] = np.inf
+    return cost
+
+
+def greedy_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lowest-cost-first greedy assignment, independent of row order
+
+    Each round matches every pair that is the other's cheapest option
+    (mutual best), then drops the matched rows and columns. Picking pairs
+    one by one in order of cost produces the same result, since no pair
+    cheaper than a mutual best can share its row or column.
+
+    Args:
+        cost: [N, M] cost matrix, inf for forbidden pairs
+
+    Returns:
+        Tuple of (row indices, column indices) of the matched pairs
+    """
+    rows = np.arange(cost.shape[0])
+    cols = np.arange(cost.shape[1])
+    matched_rows = []
+    matched_cols = []
+
+    while len(rows) and len(cols):
+        sub = cost[np.ix_(rows, cols)]
+        best_col = np.argmin(sub, axis=1)
+        best_row = np.argmin(sub, axis=0)
+        row_index = np.arange(len(rows))
+        mutual = (best_row[best_col] == row_index) & np.isfinite(sub[row_index, best_col])
+        if not mutual.any():
+            break
+
+        matched_rows.append(rows[mutual])
+        matched_cols.append(cols[best_col[mutual]])
+
+        keep_cols = np.ones(len(cols), dtype=bool)
+        keep_cols[best_col[mutual]] = False
+        rows = rows[~mutual]
+        cols = cols[keep_cols]
+
+    if not matched_rows:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def hungarian_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-total-cost assignment (scipy.optimize.linear_sum_assignment)
+
+    Forbidden pairs get a cost above any feasible total and are dropped
+    from the result.
+
+    Returns:
+        Tuple of (row indices, column indices) of the matched pairs
+    """
+    finite = np.isfinite(cost)
+    if not finite.any():
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    big = float(cost[finite].max()) * (min(cost.shape) + 1) + 1.0
+    rows, cols = linear_sum_assignment(np.where(finite, cost, big))
+    valid = finite[rows, cols]
+    return rows[valid], cols[valid]
+
+
+def iou_cost(track_boxes: np.ndarray, det_boxes: np.ndarray, min_iou: float) -> np.ndarray:
+    """
+    1 - IoU between tracks and detections, gated out (inf) below min_iou
+
+    Returns:
+        [N, M] cost matrix
+    """
+    cost = 1 - bbox_iou(track_boxes, det_boxes)
+    cost[cost > 1 - min_iou] = np.inf
+    return cost
+
+
+def pairwise_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """[K] IoU of boxes1[k] with boxes2[k]"""
+    w = np.clip(np.minimum(boxes1[:, 2], boxes2[:, 2]) - np.maximum(boxes1[:, 0], boxes2[:, 0]),
+                0, None)
+    h = np.clip(np.minimum(boxes1[:, 3], boxes2[:, 3]) - np.maximum(boxes1[:, 1], boxes2[:, 1]),
+                0, None)
+    intersection = w * h
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return intersection / (area1 + area2 - intersection + 1e-6)
+
+
+def sparse_association_cost(track_boxes: np.ndarray, det_boxes: np.ndarray,
+                            max_distance: float,
+                            iou_weight: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    association_cost() for the pairs in neighbouring grid cells only
+
+    Returns:
+        Tuple of (track indices, detection indices, costs) of the pairs that
+        pass the max_distance gate
+    """
+    track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    det_centers = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+    rows, cols = neighbour_pairs(track_centers, det_centers, max_distance)
+
+    delta = track_centers[rows] - det_centers[cols]
+    cost = np.sqrt(np.einsum('ij,ij->i', delta, delta)) / max_distance
+    gated = cost < 1.0
+    rows, cols, cost = rows[gated], cols[gated], cost[gated]
+    if iou_weight > 0:
+        cost = ((1 - iou_weight) * cost
+                + iou_weight * (1 - pairwise_iou(track_boxes[rows], det_boxes[cols])))
+    return rows, cols, cost
+
+
+def sparse_greedy_assignment(rows: np.ndarray, cols: np.ndarray, cost: np.ndarray,
+                             num_rows: int, num_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    greedy_assignment() on a sparse list of (row, column, cost) pairs
+
+    Pairs are sorted by cost once (ties by row, then column, as argmin
+    breaks them in the dense solver); each round the first remaining pair
+    of every row and of every column is its cheapest, and the pairs that
+    are first for both are matched.
+
+    Returns:
+        Tuple of (row indices, column indices) of the matched pairs
+    """
+    order = np.lexsort((cols, rows, cost))
+    rows, cols = rows[order], cols[order]
+    row_first = np.empty(num_rows, dtype=np.intp)
+    col_first = np.empty(num_cols, dtype=np.intp)
+    row_used = np.zeros(num_rows, dtype=bool)
+    col_used = np.zeros(num_cols, dtype=bool)
+    matched_rows = []
+    matched_cols = []
+
+    while len(rows):
+        # Writing positions in reverse leaves each row's first position
+        positions = np.arange(len(rows))
+        row_first[rows[::-1]] = positions[::-1]
+        col_first[cols[::-1]] = positions[::-1]
+        best = (row_first[rows] == positions) & (col_first[cols] == positions)
+        if not best.any():
+            break
+
+        matched_rows.append(rows[best])
+        matched_cols.append(cols[best])
+        row_used[rows[best]] = True
+        col_used[cols[best]] = True
+        keep = ~(row_used[rows] | col_used[cols])
+        rows, cols = rows[keep], cols[keep]
+
+    if not matched_rows:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def _local_index(labels: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index of each value among the distinct values of its label group
+
+    Returns:
+        Tuple of ([K] local indices, distinct (label, value) keys sorted)
+    """
+    keys = labels.astype(np.int64) * size + values
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    group_start = np.searchsorted(unique_keys, (unique_keys // size) * size)
+    return inverse - group_start[inverse], unique_keys
+
+
+def sparse_hungarian_assignment(rows: np.ndarray, cols: np.ndarray, cost: np.ndarray,
+                                num_rows: int, num_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    hungarian_assignment() on a sparse list of (row, column, cost) pairs
+
+    The pairs split into connected groups of tracks and detections that
+    compete with each other; each group is solved on its own small dense
+    matrix, and groups with a single pair are matched directly.
+
+    Returns:
+        Tuple of (row indices, column indices) of the matched pairs
+    """
+    if len(rows) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    graph = coo_matrix((np.ones(len(rows)), (rows, num_rows + cols)),
+                       shape=(num_rows + num_cols, num_rows + num_cols))
+    _, labels = connected_components(graph, directed=False)
+    pair_labels = labels[rows]
+    sizes = np.bincount(pair_labels)
+
+    single = sizes[pair_labels] == 1
+    matched_rows = [rows[single]]
+    matched_cols = [cols[single]]
+
+    multi = np.flatnonzero(~single)
+    multi = multi[np.argsort(pair_labels[multi], kind='stable')]
+    group_labels = pair_labels[multi]
+    local_rows, _ = _local_index(group_labels, rows[multi], num_rows)
+    local_cols, _ = _local_index(group_labels, cols[multi], num_cols)
+    # Gated pairs cost more than any feasible assignment in their group
+    forbidden = float(cost.max()) * (min(num_rows, num_cols) + 1) + 1.0
+
+    bounds = np.flatnonzero(np.diff(group_labels)) + 1
+    for group in np.split(np.arange(len(multi)), bounds):
+        if len(group) == 0:
+            continue
+        lr, lc = local_rows[group], local_cols[group]
+        dense = np.full((lr.max() + 1, lc.max() + 1), forbidden)
+        dense[lr, lc] = cost[multi[group]]
+        r, c = linear_sum_assignment(dense)
+        valid = dense[r, c] < forbidden
+        # Map local indices back through the group's own pairs
+        row_of = np.empty(dense.shape[0], dtype=np.intp)
+        col_of = np.empty(dense.shape[1], dtype=np.intp)
+        row_of[lr] = rows[multi[group]]
+        col_of[lc] = cols[multi[group]]
+        matched_rows.append(row_of[r[valid]])
+        matched_cols.append(col_of[c[valid]])
+
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+_SOLVER_FUNCTIONS = {
+    'greedy': greedy_assignment,
+    'hungarian': hungarian_assignment,
+}
+
+
+def resolve_solver(solver: str) -> str:
+    """Validate a solver name, falling back to greedy when scipy is missing"""
+    if solver not in MATCHING_SOLVERS:
+        raise ValueError(
+            f"Unknown matching solver '{solver}', expected one of {MATCHING_SOLVERS}")
+
+    if solver == 'hungarian' and linear_sum_assignment is None:
+        print("scipy not available, falling back to greedy matching")
+        return 'greedy'
+    return solver
+
+
+def assign(cost: np.ndarray, solver: str = 'greedy') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Solve an assignment problem
+
+    Args:
+        cost: [N, M] cost matrix, inf for forbidden pairs
+        solver: One of MATCHING_SOLVERS (already resolved)
+
+    Returns:
+        Tuple of ([K, 2] matched (row, column) pairs, unmatched rows,
+        unmatched columns)
+    """
+    num_rows, num_cols = cost.shape
+    if num_rows == 0 or num_cols == 0:
+        return np.empty((0, 2), dtype=int), np.arange(num_rows), np.arange(num_cols)
+
+    rows, cols = _SOLVER_FUNCTIONS[solver](cost)
+    unmatched_rows = np.setdiff1d(np.arange(num_rows), rows)
+    unmatched_cols = np.setdiff1d(np.arange(num_cols), cols)
+    return np.column_stack([rows, cols]).astype(int), unmatched_rows, unmatched_cols
+
+
+class MatchingEngine:
+    """Configurable association: cost matrix and assignment solver"""
+
+    def __init__(self, max_distance: float = 100, solver: str = 'greedy',
+                 iou_weight: float = 0.0, grid_min_tracks: Optional[int] = 200):
+        """
+        Initialize matching engine
+
+        Args:
+            max_distance: Center distance (pixels) at which pairs are gated out
+            solver: One of MATCHING_SOLVERS
+            iou_weight: Weight of 1 - IoU in the cost (0 = center distance only)
+            grid_min_tracks: Use the spatial grid (sparse costs) from this many
+                tracks on; below it the dense cost matrix is cheaper (None or
+                0 always uses the dense path)
+        """
+        self.max_distance = float(max_distance)
+        self.solver = resolve_solver(solver)
+        self.iou_weight = float(np.clip(iou_weight, 0.0, 1.0))
+        self.grid_min_tracks = grid_min_tracks
+
+    def cost(self, track_boxes: np.ndarray, det_boxes: np.ndarray) -> np.ndarray:
+        """[N, M] association cost between tracks and detections"""
+        return association_cost(track_boxes, det_boxes, self.max_distance, self.iou_weight)
+
+    def __call__(self, track_boxes: np.ndarray,
+                 det_boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Match detections to tracks
+
+        Args:
+            track_boxes: [N, 4] array of track boxes in format [x1, y1, x2, y2]
+            det_boxes: [M, 4] array of detection boxes in format [x1, y1, x2, y2]
+
+        Returns:
+            Tuple of ([K, 2] matched (track index, detection index) pairs,
+            unmatched track indices, unmatched detection indices)
+        """
+        track_boxes = np.asarray(track_boxes, dtype=np.float64).reshape(-1, 4)
+        det_boxes = np.asarray(det_boxes, dtype=np.float64).reshape(-1, 4)
+        if len(track_boxes) == 0 or len(det_boxes) == 0:
+            return (np.empty((0, 2), dtype=int), np.arange(len(track_boxes)),
+                    np.arange(len(det_boxes)))
+
+        if self.grid_min_tracks and len(track_boxes) >= self.grid_min_tracks:
+            return self._match_sparse(track_boxes, det_boxes)
+        return assign(self.cost(track_boxes, det_boxes), self.solver)
+
+    def _match_sparse(self, track_boxes: np.ndarray,
+                      det_boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Match on the grid's neighbouring pairs only"""
+        rows, cols, cost = sparse_association_cost(
+            track_boxes, det_boxes, self.max_distance, self.iou_weight)
+        if self.solver == 'hungarian':
+            rows, cols = sparse_hungarian_assignment(
+                rows, cols, cost, len(track_boxes), len(det_boxes))
+        else:
+            rows, cols = sparse_greedy_assignment(
+                rows, cols, cost, len(track_boxes), len(det_boxes))
+
+        unmatched_tracks = np.setdiff1d(np.arange(len(track_boxes)), rows)
+        unmatched_dets = np.setdiff1d(np.arange(len(det_boxes)), cols)
+        return np.column_stack([rows, cols]).astype(int), unmatched_tracks, unmatched_dets
+
+
+def match_loop(track_boxes: np.ndarray, det_boxes: np.ndarray,
+               max_distance: float) -> List[Tuple[int, int]]:
+    """
+    Reference per-pair matcher the tracker used before MatchingEngine:
+    for each track in order, the nearest unmatched detection within
+    max_distance (kept for the benchmark)
+    """
+    matches = []
+    matched = set()
+    for i, track_box in enumerate(track_boxes.tolist()):
+        track_center = np.array([(track_box[0] + track_box[2]) / 2,
+                                 (track_box[1] + track_box[3]) / 2])
+        best_match, min_distance = None, float('inf')
+        for j, det_box in enumerate(det_boxes.tolist()):
+            if j in matched:
+                continue
+            det_center = np.array([(det_box[0] + det_box[2]) / 2,
+                                   (det_box[1] + det_box[3]) / 2])
+            distance = np.linalg.norm(track_center - det_center)
+            if distance < min_distance and distance < max_distance:
+                min_distance = distance
+                best_match = j
+        if best_match is not None:
+            matches.append((i, best_match))
+            matched.add(best_match)
+    return matches
+
+
+def synthetic_tracking_scene(num_tracks: int = 100, width: int = 1920, height: int = 1080,
+                             motion: float = 12.0, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Track boxes and next-frame detections for a dense junction: boxes move
+    by a few pixels, ~5% of tracks are missed and ~5% new vehicles appear
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 1, (num_tracks, 2)) * [width, height]
+    sizes = rng.uniform(20, 140, (num_tracks, 2))
+    track_boxes = np.column_stack([centers - sizes / 2, centers + sizes / 2])
+
+    moved = centers + rng.normal(0, motion, centers.shape)
+    seen = rng.uniform(0, 1, num_tracks) > 0.05
+    num_new = max(1, num_tracks // 20)
+    new_centers = rng.uniform(0, 1, (num_new, 2)) * [width, height]
+    new_sizes = rng.uniform(20, 140, (num_new, 2))
+    det_centers = np.vstack([moved[seen], new_centers])
+    det_sizes = np.vstack([sizes[seen], new_sizes])
+    det_boxes = np.column_stack([det_centers - det_sizes / 2, det_centers + det_sizes / 2])
+
+    order = rng.permutation(len(det_boxes))
+    return track_boxes, det_boxes[order]
+
+
+def benchmark_matching(scenes: List[Tuple[np.ndarray, np.ndarray]], max_distance: float = 100,
+                       repeats: int = 20, include_loop: bool = True) -> Dict[str, Dict]:
+    """
+    Compare matchers on the same scenes
+
+    Returns:
+        Dictionary of matcher name -> {'mean_ms', 'matched'}
+    """
+    configs = {
+        'greedy': MatchingEngine(max_distance, 'greedy'),
+        'greedy+iou': MatchingEngine(max_distance, 'greedy', iou_weight=0.5),
+    }
+    if linear_sum_assignment is not None:
+        configs['hungarian'] = MatchingEngine(max_distance, 'hungarian')
+
+    results = {}
+    if include_loop:
+        start = time.perf_counter()
+        loop_repeats = max(1, repeats // 10)
+        for _ in range(loop_repeats):
+            matched = [match_loop(t, d, max_distance) for t, d in scenes]
+        elapsed = time.perf_counter() - start
+        results['loop'] = {
+            'mean_ms': elapsed / (loop_repeats * len(scenes)) * 1000,
+            'matched': int(sum(len(m) for m in matched))
+        }
+
+    for name, engine in configs.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            matched = [engine(t, d)[0] for t, d in scenes]
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'mean_ms': elapsed / (repeats * len(scenes)) * 1000,
+            'matched': int(sum(len(m) for m in matched))
+        }
+    return results
+
+
+def benchmark_grid(track_counts: List[int], max_distance: float = 100,
+                   repeats: int = 20) -> Dict[int, Dict[str, float]]:
+    """
+    Dense cost matrix vs spatial grid for each solver and track count
+
+    Returns:
+        Dictionary of track count -> {'<solver>_dense', '<solver>_grid'} mean ms
+    """
+    solvers = ['greedy'] + (['hungarian'] if linear_sum_assignment is not None else [])
+    results = {}
+    for num_tracks in track_counts:
+        scenes = [synthetic_tracking_scene(num_tracks, seed=seed) for seed in range(5)]
+        results[num_tracks] = {}
+        for solver in solvers:
+            for mode, grid_min_tracks in (('dense', None), ('grid', 1)):
+                engine = MatchingEngine(max_distance, solver, grid_min_tracks=grid_min_tracks)
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    for t, d in scenes:
+                        engine(t, d)
+                elapsed = time.perf_counter() - start
+                results[num_tracks][f'{solver}_{mode}'] = elapsed / (repeats * len(scenes)) * 1000
+    return results
+
+
+def main():
+    """Run the matching micro-benchmark"""
+    parser = argparse.ArgumentParser(description="Track matching micro-benchmark")
+    parser.add_argument("--tracks", type=int, nargs='*', default=[10, 100, 500],
+                        help="Concurrent track counts to benchmark")
+    parser.add_argument("--max-distance", type=float, default=100, help="Gating distance")
+    parser.add_argument("--repeats", type=int, default=20, help="Timing repeats")
+    parser.add_argument("--no-loop", action="store_true",
+                        help="Skip the per-pair reference matcher")
+    parser.add_argument("--grid", action="store_true",
+                        help="Compare the dense cost matrix with the spatial grid")
+    args = parser.parse_args()
+
+    if args.grid:
+        results = benchmark_grid(args.tracks, args.max_distance, args.repeats)
+        columns = list(next(iter(results.values())))
+        print(f"{'tracks':>8}" + ''.join(f"{name:>16}" for name in columns))
+        for num_tracks, r in results.items():
+            print(f"{num_tracks:>8}" + ''.join(f"{r[name]:>16.3f}" for name in columns))
+        for solver in sorted({name.rsplit('_', 1)[0] for name in columns}):
+            faster = [n for n, r in results.items() if r[f'{solver}_grid'] < r[f'{solver}_dense']]
+            print(f"{solver}: grid faster from {min(faster)} tracks" if faster
+                  else f"{solver}: dense faster at every size")
+        return
+
+    print(f"{'tracks':>8}{'matcher':>14}{'mean ms':>10}{'matched':>9}")
+    for num_tracks in args.tracks:
+        scenes = [synthetic_tracking_scene(num_tracks, seed=seed) for seed in range(5)]
+        results = benchmark_matching(scenes, args.max_distance, args.repeats,
+                                     include_loop=not args.no_loop)
+        for name, r in results.items():
+            print(f"{num_tracks:>8}{name:>14}{r['mean_ms']:>10.3f}{r['matched']:>9}")
+
+
+if __name__ == "__main__":
+    main()
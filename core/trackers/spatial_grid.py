@@ -0,0 +1,72 @@
+"""
+Uniform spatial grid for track association
+
+Tracks and detections are bucketed into square cells of side cell_size.
+With cell_size equal to the matching gate (max_distance), any pair closer
+than the gate lies in the same or an adjacent cell, so only the 3x3
+neighbourhood of each track's cell has to be searched. The candidate pairs
+form a sparse cost structure whose size grows with traffic density rather
+than with tracks x detections.
+"""
+import numpy as np
+from typing import Tuple
+
+# Offsets of a cell's 3x3 neighbourhood
+_NEIGHBOURS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+
+def grid_cells(points: np.ndarray, cell_size: float) -> np.ndarray:
+    """[N, 2] integer (column, row) cell of each point"""
+    return np.floor(np.asarray(points, dtype=np.float64) / cell_size).astype(np.int64)
+
+
+def neighbour_pairs(track_points: np.ndarray, det_points: np.ndarray,
+                    cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All (track, detection) pairs whose cells are the same or adjacent
+
+    Detections are sorted by cell key once; each track then looks up its
+    nine neighbour cells with searchsorted, and the matching runs of
+    detections are expanded without a Python loop over tracks.
+
+    Args:
+        track_points: [N, 2] track centres
+        det_points: [M, 2] detection centres
+        cell_size: Cell side in pixels
+
+    Returns:
+        Tuple of (track indices, detection indices) of the candidate pairs
+    """
+    empty = (np.array([], dtype=np.intp), np.array([], dtype=np.intp))
+    if len(track_points) == 0 or len(det_points) == 0:
+        return empty
+
+    track_cells = grid_cells(track_points, cell_size)
+    det_cells = grid_cells(det_points, cell_size)
+
+    # Row-major cell keys with a one-cell margin, so neighbour offsets
+    # never wrap into the next row
+    low = np.minimum(track_cells.min(axis=0), det_cells.min(axis=0)) - 1
+    width = int(max(track_cells[:, 0].max(), det_cells[:, 0].max()) - low[0] + 2)
+    track_keys = (track_cells[:, 1] - low[1]) * width + (track_cells[:, 0] - low[0])
+    det_keys = (det_cells[:, 1] - low[1]) * width + (det_cells[:, 0] - low[0])
+
+    order = np.argsort(det_keys, kind='stable')
+    sorted_keys = det_keys[order]
+    track_index = np.arange(len(track_points))
+
+    rows, cols = [], []
+    for dx, dy in _NEIGHBOURS:
+        keys = track_keys + dy * width + dx
+        start = np.searchsorted(sorted_keys, keys, side='left')
+        counts = np.searchsorted(sorted_keys, keys, side='right') - start
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        run_starts = np.repeat(start - (np.cumsum(counts) - counts), counts)
+        rows.append(np.repeat(track_index, counts))
+        cols.append(order[run_starts + np.arange(total)])
+
+    if not rows:
+        return empty
+    return np.concatenate(rows), np.concatenate(cols)
@@ -0,0 +1,294 @@
+"""
+Array-backed per-track state
+
+TrackStore keeps every tracker field in preallocated NumPy arrays indexed
+by slot: boxes, velocities, ages, flags and a fixed-size ring of
+trajectory points per slot. Removing a track resets its slot and
+returns it to a free list, so all per-track state is dropped together and
+memory is bounded by the peak number of concurrent tracks, however long
+the process runs. Trackers and the counting engine add their own per-slot
+fields (e.g. Kalman state, zone entry points) with add_field().
+
+TrackFieldView and TrackFlagSet give dict- and set-like access by track ID
+for code that used the tracker's former dicts and sets.
+"""
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CLASS_NAMES = ('vehicle', 'ambulance')
+
+# Per-track flag bits
+FLAG_COUNTED = 1 << 0   # Counted by zone counting
+FLAG_CROSSED = 1 << 1   # Crossed the counting line
+FLAG_VELOCITY = 1 << 2  # Has a velocity estimate
+
+
+def class_code(class_name: str) -> int:
+    """Index of a class name in CLASS_NAMES (unknown names are vehicles)"""
+    return 1 if class_name == 'ambulance' else 0
+
+
+class TrackStore:
+    """Slot arrays for all live tracks, with a free list for recycling slots"""
+
+    def __init__(self, capacity: int = 64, trajectory_length: int = 20):
+        """
+        Initialize track store
+
+        Args:
+            capacity: Initial number of track slots (doubles when full)
+            trajectory_length: Trajectory points kept per track
+        """
+        self.trajectory_length = max(2, int(trajectory_length))
+        self.capacity = 0
+        self._fields: Dict[str, Tuple[Tuple[int, ...], Any, Any]] = {}
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+
+        self.add_field('track_ids', dtype=np.int64, fill=-1)
+        self.add_field('boxes', (4,))
+        self.add_field('confidences')
+        self.add_field('class_codes', dtype=np.int8)
+        self.add_field('velocities', (2,))
+        self.add_field('ages', dtype=np.int32)
+        self.add_field('disappeared', dtype=np.int32)
+        self.add_field('flags', dtype=np.uint8)
+        self.add_field('last_frame', dtype=np.int64, fill=-1)
+        self.add_field('last_center', (2,))
+        self.add_field('trajectories', (self.trajectory_length, 2))
+        self.add_field('trajectory_head', dtype=np.int32, fill=-1)
+        self.add_field('trajectory_count', dtype=np.int32)
+
+        self._allocate(max(1, int(capacity)))
+
+    def add_field(self, name: str, shape: Tuple[int, ...] = (), dtype=np.float64, fill=0):
+        """
+        Add a per-slot array, available as an attribute of the store
+
+        Args:
+            name: Attribute name
+            shape: Shape of one slot's value
+            dtype: Array dtype
+            fill: Value of free slots
+        """
+        self._fields[name] = (tuple(shape), dtype, fill)
+        setattr(self, name, np.full((self.capacity,) + tuple(shape), fill, dtype=dtype))
+
+    def _allocate(self, capacity: int):
+        """Grow every field to capacity, keeping existing state"""
+        old = self.capacity
+        for name, (shape, dtype, fill) in self._fields.items():
+            array = np.full((capacity,) + shape, fill, dtype=dtype)
+            array[:old] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, track_id) -> bool:
+        return track_id in self._slots
+
+    def add(self, track_id: int, bbox: Sequence[float], class_name: str,
+            confidence: float, frame_index: int) -> int:
+        """
+        Store a new track
+
+        Returns:
+            The track's slot
+        """
+        if not self._free:
+            self._allocate(2 * self.capacity)
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+
+        self.track_ids[slot] = track_id
+        self.boxes[slot] = bbox
+        self.confidences[slot] = confidence
+        self.class_codes[slot] = class_code(class_name)
+        center = (self.boxes[slot, :2] + self.boxes[slot, 2:]) / 2
+        self.last_frame[slot] = frame_index
+        self.last_center[slot] = center
+        self.push_trajectory(np.array([slot]), center[None])
+        return slot
+
+    def remove(self, track_id: int) -> bool:
+        """Drop a track and all its state; False if it is not stored"""
+        slot = self._slots.pop(track_id, None)
+        if slot is None:
+            return False
+        for name, (_, _, fill) in self._fields.items():
+            getattr(self, name)[slot] = fill
+        self._free.append(slot)
+        return True
+
+    def slot(self, track_id: int) -> Optional[int]:
+        """Slot of a track, or None if it is not stored"""
+        return self._slots.get(track_id)
+
+    def slots_for(self, track_ids: Sequence[int]) -> np.ndarray:
+        """Slots of stored tracks, in the given order"""
+        return np.fromiter((self._slots[t] for t in track_ids), dtype=np.intp,
+                           count=len(track_ids))
+
+    def active_slots(self) -> np.ndarray:
+        """Slots of all stored tracks, oldest track first"""
+        slots = np.flatnonzero(self.track_ids >= 0)
+        return slots[np.argsort(self.track_ids[slots], kind='stable')]
+
+    def ids(self) -> List[int]:
+        """IDs of all stored tracks, oldest first"""
+        return self.track_ids[self.active_slots()].tolist()
+
+    def centers(self, slots: np.ndarray) -> np.ndarray:
+        """[N, 2] box centres of the given slots"""
+        boxes = self.boxes[slots]
+        return (boxes[:, :2] + boxes[:, 2:]) / 2
+
+    def push_trajectory(self, slots: np.ndarray, points: np.ndarray):
+        """Append one point to the trajectory ring of each slot"""
+        if len(slots) == 0:
+            return
+        head = (self.trajectory_head[slots] + 1) % self.trajectory_length
+        self.trajectories[slots, head] = points
+        self.trajectory_head[slots] = head
+        self.trajectory_count[slots] = np.minimum(
+            self.trajectory_count[slots] + 1, self.trajectory_length)
+
+    def trajectory(self, slot: int) -> np.ndarray:
+        """[K, 2] trajectory points of one slot, oldest first"""
+        count = int(self.trajectory_count[slot])
+        if count == 0:
+            return np.empty((0, 2))
+        head = int(self.trajectory_head[slot])
+        order = np.arange(head - count + 1, head + 1) % self.trajectory_length
+        return self.trajectories[slot, order]
+
+    def recent_points(self, slots: np.ndarray, count: int) -> np.ndarray:
+        """
+        The last count trajectory points of each slot, oldest first
+
+        Returns:
+            [N, count, 2] points; rows with fewer points are padded with NaN
+            at the front
+        """
+        offsets = np.arange(count - 1, -1, -1)
+        index = (self.trajectory_head[slots, None] - offsets) % self.trajectory_length
+        points = self.trajectories[np.asarray(slots)[:, None], index]
+        missing = offsets[None, :] >= self.trajectory_count[slots, None]
+        points[missing] = np.nan
+        return points
+
+    def first_points(self, slots: np.ndarray) -> np.ndarray:
+        """[N, 2] oldest trajectory point still held for each slot"""
+        count = self.trajectory_count[slots]
+        index = (self.trajectory_head[slots] - count + 1) % self.trajectory_length
+        return self.trajectories[slots, index]
+
+    def as_dicts(self, slots: Optional[np.ndarray] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Tracks as {id: {'bbox', 'class', 'confidence'}} dictionaries
+
+        The result is a snapshot that later updates do not change.
+        """
+        if slots is None:
+            slots = self.active_slots()
+        return {
+            track_id: {'bbox': bbox, 'class': CLASS_NAMES[code], 'confidence': confidence}
+            for track_id, bbox, code, confidence in zip(
+                self.track_ids[slots].tolist(), self.boxes[slots].tolist(),
+                self.class_codes[slots].tolist(), self.confidences[slots].tolist())
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        """Slot usage and array memory"""
+        return {
+            'tracks': len(self._slots),
+            'capacity': self.capacity,
+            'free_slots': len(self._free),
+            'nbytes': int(sum(getattr(self, name).nbytes for name in self._fields))
+        }
+
+
+class TrackFieldView:
+    """Dict-like access to one scalar field of a TrackStore by track ID"""
+
+    def __init__(self, store: TrackStore, field: str):
+        self.store = store
+        self.field = field
+
+    def __getitem__(self, track_id):
+        slot = self.store.slot(track_id)
+        if slot is None:
+            raise KeyError(track_id)
+        return getattr(self.store, self.field)[slot].item()
+
+    def __setitem__(self, track_id, value):
+        slot = self.store.slot(track_id)
+        if slot is None:
+            raise KeyError(track_id)
+        getattr(self.store, self.field)[slot] = value
+
+    def get(self, track_id, default=None):
+        slot = self.store.slot(track_id)
+        return default if slot is None else getattr(self.store, self.field)[slot].item()
+
+    def __contains__(self, track_id) -> bool:
+        return track_id in self.store
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.store.ids())
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def keys(self) -> List[int]:
+        return self.store.ids()
+
+    def items(self) -> List[Tuple[int, Any]]:
+        slots = self.store.active_slots()
+        return list(zip(self.store.track_ids[slots].tolist(),
+                        getattr(self.store, self.field)[slots].tolist()))
+
+
+class TrackFlagSet:
+    """
+    Set-like view of the live tracks that have a flag bit set
+
+    Adding the ID of a track that is not stored does nothing: a removed
+    track's ID is never reused.
+    """
+
+    def __init__(self, store: TrackStore, flag: int):
+        self.store = store
+        self.flag = flag
+
+    def __contains__(self, track_id) -> bool:
+        slot = self.store.slot(track_id)
+        return slot is not None and bool(self.store.flags[slot] & self.flag)
+
+    def add(self, track_id):
+        slot = self.store.slot(track_id)
+        if slot is not None:
+            self.store.flags[slot] |= self.flag
+
+    def discard(self, track_id):
+        slot = self.store.slot(track_id)
+        if slot is not None:
+            self.store.flags[slot] &= ~np.uint8(self.flag)
+
+    def clear(self):
+        self.store.flags &= ~np.uint8(self.flag)
+
+    def mask(self, slots: np.ndarray) -> np.ndarray:
+        """[N] True where the slot has the flag"""
+        return (self.store.flags[slots] & self.flag) != 0
+
+    def __iter__(self) -> Iterator[int]:
+        slots = self.store.active_slots()
+        return iter(self.store.track_ids[slots[self.mask(slots)]].tolist())
+
+    def __len__(self) -> int:
+        slots = self.store.active_slots()
+        return int(np.count_nonzero(self.mask(slots)))
@@ -51,6 +51,7 @@ class DashboardAPI:
         app.router.add_get('/api/status', self.get_status)
         app.router.add_get('/api/metrics/current', self.get_current_metrics)
         app.router.add_get('/api/metrics/history', self.get_metrics_history)
+        app.router.add_get('/api/metrics/zones', self.get_zone_metrics)
         app.router.add_get('/api/stream/stats', self.get_stream_stats)
         app.router.add_post('/api/stream/settings',
                             self.update_stream_settings)
@@ -111,6 +112,27 @@ class DashboardAPI:
         current = self.metrics_history[-1]
         return web.json_response(current)
 
+    async def get_zone_metrics(self, request: web.Request) -> web.Response:
+        """
+        Get current per-zone (or, without a lane config, per-line) vehicle counts.
+
+        Returns:
+            JSON response with the count of every configured zone and counting line
+        """
+        if not self.metrics_history:
+            return web.json_response({
+                'error': 'No metrics available yet',
+                'timestamp': datetime.now().isoformat()
+            }, status=404)
+
+        current = self.metrics_history[-1]
+        return web.json_response({
+            'timestamp': current.get('timestamp'),
+            'vehicle_count': current.get('vehicle_count', 0),
+            'zones': current.get('zones', []),
+            'lines': current.get('lines', [])
+        })
+
     async def get_metrics_history(self, request: web.Request) -> web.Response:
         """
         Get historical metrics data.
@@ -298,6 +320,7 @@ if __name__ == '__main__':
         print("  GET  /api/status")
         print("  GET  /api/metrics/current")
         print("  GET  /api/metrics/history?limit=100")
+        print("  GET  /api/metrics/zones")
         print("  GET  /api/stream/stats")
         print("  POST /api/stream/settings")
         print("  GET  /api/config")
@@ -4,6 +4,9 @@ Runs traffic detection and streams frames to connected clients via WebSocket.
 """
 
 from core.detectors.traffic_detector import ONNXTrafficDetector
+from core.detectors.session_registry import get_session_registry
+from core.detectors.frame_buffers import FrameBufferRing
+from dashboard.backend.frame_pipeline import FramePipeline, END_OF_STREAM, BLOCK, default_drop_policy
 import os
 import sys
 import logging
@@ -46,12 +49,14 @@ class DetectionStreamingRunner:
 
     Features:
     - In-process detection (no subprocess overhead)
+    - Capture, inference, render/encode and writer stages on separate threads
     - Real-time frame streaming to connected clients
     - Metrics broadcasting
     - Safe cleanup and shutdown
     """
 
-    def __init__(self, streamer, stream_manager, event_loop=None):
+    def __init__(self, streamer, stream_manager, event_loop=None,
+                 queue_size: int = 4, drop_policy: Optional[str] = None):
         """
         Initialize the detection streaming runner.
 
@@ -59,6 +64,9 @@ class DetectionStreamingRunner:
             streamer: DashboardStreamer instance (for WebSocket broadcast)
             stream_manager: StreamManager instance (for frame encoding)
             event_loop: Optional asyncio event loop (will be auto-detected if not provided)
+            queue_size: Capacity of each queue between pipeline stages
+            drop_policy: 'drop_oldest' or 'block' (default: drop_oldest for
+                cameras and streams, block for video files)
         """
         self.streamer = streamer
         self.stream_manager = stream_manager
@@ -67,6 +75,18 @@ class DetectionStreamingRunner:
         self.detection_thread = None
         self.event_loop = event_loop  # Store event loop reference
 
+        # Staged capture -> inference -> render -> writer pipeline
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.pipeline = None
+        self._frame_count = 0
+        # Frames are decoded into preallocated buffers (see _capture_frame)
+        self._capture_buffers = None
+        self._capture_shape = None
+
+        # Called with every metrics dict that is broadcast (e.g. API history)
+        self.metrics_callbacks = []
+
         # Store reference to socket.io server for event loop access
         if streamer and hasattr(streamer, 'sio'):
             self.sio = streamer.sio
@@ -119,6 +139,14 @@ class DetectionStreamingRunner:
 
         self.is_running = False
 
+        # Stop pipeline stages before releasing the detector's sessions
+        if self.pipeline:
+            self.pipeline.stop()
+
+        # Wait for thread to finish
+        if self.detection_thread and self.detection_thread.is_alive():
+            self.detection_thread.join(timeout=5)
+
         # Stop detector
         if self.detector:
             try:
@@ -126,10 +154,6 @@ class DetectionStreamingRunner:
             except Exception as e:
                 logger.error(f"Error stopping detector: {e}")
 
-        # Wait for thread to finish
-        if self.detection_thread and self.detection_thread.is_alive():
-            self.detection_thread.join(timeout=5)
-
         logger.info("Detection streaming runner stopped")
 
     def reset_counters(self):
@@ -166,10 +190,15 @@ class DetectionStreamingRunner:
                 logger.info("Lane filtering disabled")
                 detector_kwargs['lane_config_path'] = None
 
-            # Create detector with appropriate configuration
+            # Create detector with appropriate configuration. Tracker and
+            # counters start fresh; the model sessions come already warmed
+            # up from the session registry after the first start.
             logger.info(f"Creating detector with kwargs: {detector_kwargs}")
             self.detector = ONNXTrafficDetector(**detector_kwargs)
-            logger.info("✅ Detector created successfully")
+            registry_stats = get_session_registry().get_stats()
+            logger.info(
+                f"✅ Detector created successfully (sessions loaded: "
+                f"{registry_stats['loads']}, reused: {registry_stats['hits']})")
 
             # Set environment variable for headless mode
             os.environ['DASHBOARD_MODE'] = '1'
@@ -189,7 +218,6 @@ class DetectionStreamingRunner:
 
             logger.info(f"Video properties: {width}x{height} @ {fps} FPS")
 
-            frame_count = 0
             # ✅ OPTIMIZED: Increase FPS for smoother video (20-25 FPS for smooth playback)
             # Higher FPS = smoother video, but more bandwidth
             # Tradeoff: 25 FPS is smooth enough for most users
@@ -201,121 +229,45 @@ class DetectionStreamingRunner:
             # Metrics every ~10 FPS (100ms at 30fps)
             metric_interval = max(1, int(fps / 10))
 
-            # Detection loop
-            logger.info("Starting detection loop...")
-            while self.is_running:
-                try:
-                    ret, frame = cap.read()
+            # Capture, inference, render/encode and writer run on their own
+            # threads. Live sources drop the oldest queued frame when a stage
+            # falls behind; files never drop frames.
+            drop_policy = self.drop_policy or default_drop_policy(source)
+            self.pipeline = FramePipeline(self.queue_size, drop_policy)
+            # A captured frame lives until it is encoded: two queues, one
+            # frame in each of capture, inference and render. That bound only
+            # holds when queues block; with DROP_OLDEST capture keeps reading
+            # while later stages still hold frames, so a ring would overwrite
+            # a frame mid-inference and every frame gets its own array instead
+            self._capture_buffers = (FrameBufferRing(2 * self.queue_size + 3)
+                                     if drop_policy == BLOCK else None)
+            self._capture_shape = None
+            self.pipeline.add_stage('capture', lambda: self._capture_frame(cap))
+            self.pipeline.add_stage(
+                'inference',
+                lambda frame: self._infer_frame(frame, frame_broadcast_interval, metric_interval))
+            self.pipeline.add_stage('render', self._render_packet)
+            self.pipeline.add_stage('writer', self._write_packet)
 
-                    if not ret:
-                        logger.info("End of video or read error")
-                        break
-                except Exception as e:
-                    logger.error(
-                        f"❌ Error reading frame from video: {e}", exc_info=True)
-                    break
-
-                try:
-                    # Run detection on frame with super detailed logging
-                    sys.stdout.write(
-                        f"[FRAME_PROCESS] Starting frame {frame_count} processing\n")
-                    sys.stdout.flush()
-                    logger.debug(f"Processing frame {frame_count}...")
-
-                    sys.stdout.write(
-                        f"[FRAME_PROCESS] Calling detector.process_frame()\n")
-                    sys.stdout.flush()
-                    output_frame = self.detector.process_frame(frame)
-
-                    sys.stdout.write(
-                        f"[FRAME_PROCESS] process_frame() returned successfully\n")
-                    sys.stdout.flush()
-                    logger.debug(f"Frame {frame_count} processed successfully")
-
-                    # If process_frame returns None, skip this frame
-                    if output_frame is None:
-                        logger.debug(
-                            f"Frame {frame_count} returned None, skipping")
-                        continue
+            logger.info("Starting detection loop...")
+            self._frame_count = 0
+            self.pipeline.start()
+            while self.is_running and self.pipeline.is_alive():
+                self.pipeline.join(timeout=0.5)
 
-                    frame_count += 1
+            # Stop requested or source exhausted: wind down every stage
+            self.pipeline.stop()
+            self.pipeline.join(timeout=5)
 
-                    # Get detection results from detector attributes
-                    logger.debug(
-                        f"Getting detector attributes for frame {frame_count}")
-                    vehicle_count = getattr(self.detector, 'vehicle_count', 0)
-                    tracked_objects = getattr(self.detector, 'tracker', {})
-                    if hasattr(tracked_objects, 'objects'):
-                        detected_count = len(tracked_objects.objects)
-                    else:
-                        detected_count = 0
-                    logger.debug(
-                        f"Detected {vehicle_count} vehicles, {detected_count} tracked objects")
-
-                    # Broadcast frame at interval (not every frame to reduce bandwidth)
-                    if frame_count % frame_broadcast_interval == 0:
-                        # Encode frame to base64 JPEG
-                        frame_base64 = self._encode_frame(output_frame)
-
-                        # Prepare metadata
-                        metadata = {
-                            'frame_count': frame_count,
-                            'fps': getattr(self.detector, 'fps', 0),
-                            'timestamp': datetime.now().isoformat(),
-                            'vehicle_count': vehicle_count
-                        }
-
-                        # Broadcast to WebSocket (with error handling)
-                        try:
-                            loop = self._get_event_loop()
-                            if loop and loop.is_running():
-                                asyncio.run_coroutine_threadsafe(
-                                    self.streamer.broadcast_frame(
-                                        frame_base64, metadata),
-                                    loop
-                                )
-                            else:
-                                logger.debug(
-                                    "Event loop not running for frame broadcast")
-                        except Exception as be:
-                            logger.debug(f"Frame broadcast error: {be}")
-
-                    # Broadcast metrics periodically
-                    if frame_count % metric_interval == 0:
-                        try:
-                            loop = self._get_event_loop()
-                            if loop and loop.is_running():
-                                asyncio.run_coroutine_threadsafe(
-                                    self._broadcast_metrics(),
-                                    loop
-                                )
-                            else:
-                                logger.info(
-                                    f"⚠️ Event loop issue: loop={loop}, running={loop.is_running() if loop else 'N/A'}")
-                        except Exception as me:
-                            logger.error(
-                                f"❌ Metrics broadcast error: {me}", exc_info=True)
-
-                except Exception as e:
-                    sys.stdout.write(
-                        f"[FRAME_PROCESS_ERROR] Exception during frame processing: {type(e).__name__}: {e}\n")
-                    sys.stdout.flush()
-                    sys.stderr.write(
-                        f"[FRAME_PROCESS_ERROR] Exception during frame processing: {type(e).__name__}: {e}\n")
-                    sys.stderr.flush()
-                    logger.error(
-                        f"❌ CRITICAL: Error processing frame {frame_count}: {e}", exc_info=True)
-                    import traceback
-                    logger.error(f"Stack trace:\n{traceback.format_exc()}")
-                    logger.error(
-                        "Stopping detection due to frame processing error")
-                    # Don't continue on critical errors - stop detection
-                    break
+            if self.pipeline.error is not None:
+                logger.error(
+                    f"Detection stopped due to pipeline error: {self.pipeline.error}")
 
             # Cleanup
             cap.release()
             logger.info(
-                f"Detection loop ended. Processed {frame_count} frames.")
+                f"Detection loop ended. Processed {self._frame_count} frames.")
+            logger.info(f"Pipeline stats: {self.pipeline.get_stats()}")
 
         except Exception as e:
             logger.error(f"🔴 DETECTION LOOP EXCEPTION: {e}", exc_info=True)
@@ -338,6 +290,160 @@ class DetectionStreamingRunner:
                     logger.warning(
                         f"Error during detector cleanup: {cleanup_error}")
 
+    def _capture_frame(self, cap):
+        """
+        Capture stage: decode the next frame, into a preallocated buffer when
+        the pipeline blocks instead of dropping frames
+        """
+        buffer = None
+        if self._capture_buffers is not None and self._capture_shape is not None:
+            buffer = self._capture_buffers.next(self._capture_shape)
+        try:
+            ret, frame = cap.read(buffer)
+        except Exception as e:
+            logger.error(
+                f"❌ Error reading frame from video: {e}", exc_info=True)
+            return END_OF_STREAM
+
+        if not ret:
+            logger.info("End of video or read error")
+            return END_OF_STREAM
+        # Buffers are only reused once the frame size is known
+        self._capture_shape = frame.shape
+        return frame
+
+    def _infer_frame(self, frame, frame_broadcast_interval: int, metric_interval: int):
+        """
+        Inference stage: run detection and decide what to send
+
+        Frames are only annotated when they are broadcast to at least one
+        connected client; otherwise the detector runs headless.
+
+        Returns:
+            Packet dictionary for the render stage, or None when this frame is
+            neither broadcast nor followed by a metrics update
+        """
+        frame_count = self._frame_count
+        # Broadcast frame at interval (not every frame to reduce bandwidth)
+        broadcast = ((frame_count + 1) % frame_broadcast_interval == 0
+                     and self.has_viewers())
+        try:
+            # Run detection on frame with super detailed logging
+            sys.stdout.write(
+                f"[FRAME_PROCESS] Starting frame {frame_count} processing\n")
+            sys.stdout.flush()
+            logger.debug(f"Processing frame {frame_count}...")
+
+            sys.stdout.write(
+                f"[FRAME_PROCESS] Calling detector.detect_frame()\n")
+            sys.stdout.flush()
+            result = self.detector.detect_frame(frame)
+            output_frame = None
+            if result is not None and broadcast:
+                # The raw frame is not used after detection: annotate it in place
+                output_frame = self.detector.render(frame, result, in_place=True)
+
+            sys.stdout.write(
+                f"[FRAME_PROCESS] detect_frame() returned successfully\n")
+            sys.stdout.flush()
+            logger.debug(f"Frame {frame_count} processed successfully")
+
+        except Exception as e:
+            sys.stdout.write(
+                f"[FRAME_PROCESS_ERROR] Exception during frame processing: {type(e).__name__}: {e}\n")
+            sys.stdout.flush()
+            sys.stderr.write(
+                f"[FRAME_PROCESS_ERROR] Exception during frame processing: {type(e).__name__}: {e}\n")
+            sys.stderr.flush()
+            logger.error(
+                f"❌ CRITICAL: Error processing frame {frame_count}: {e}", exc_info=True)
+            logger.error(
+                "Stopping detection due to frame processing error")
+            # Don't continue on critical errors - stop detection
+            raise
+
+        # If detect_frame returns None, skip this frame
+        if result is None:
+            logger.debug(
+                f"Frame {frame_count} returned None, skipping")
+            return None
+
+        frame_count += 1
+        self._frame_count = frame_count
+
+        vehicle_count = result['vehicle_count']
+        logger.debug(
+            f"Detected {vehicle_count} vehicles, {len(result['tracks'])} tracked objects")
+
+        # Broadcast metrics periodically
+        metrics = frame_count % metric_interval == 0
+        if not broadcast and not metrics:
+            return None
+
+        return {
+            'frame': output_frame,
+            'metadata': {
+                'frame_count': frame_count,
+                'fps': getattr(self.detector, 'fps', 0),
+                'timestamp': datetime.now().isoformat(),
+                'vehicle_count': vehicle_count
+            },
+            'metrics': metrics
+        }
+
+    def has_viewers(self) -> bool:
+        """True when at least one client is connected to receive frames"""
+        return bool(getattr(self.streamer, 'clients', None))
+
+    def _render_packet(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        """Render/encode stage: JPEG + base64 encode frames that are broadcast"""
+        if packet['frame'] is not None:
+            packet['frame_base64'] = self._encode_frame(packet['frame'])
+            # The raw frame is not needed past this stage
+            packet['frame'] = None
+        return packet
+
+    def _write_packet(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        """Writer stage: hand frames and metrics to the WebSocket server"""
+        if 'frame_base64' in packet:
+            # Broadcast to WebSocket (with error handling)
+            try:
+                loop = self._get_event_loop()
+                if loop and loop.is_running():
+                    asyncio.run_coroutine_threadsafe(
+                        self.streamer.broadcast_frame(
+                            packet['frame_base64'], packet['metadata']),
+                        loop
+                    )
+                else:
+                    logger.debug(
+                        "Event loop not running for frame broadcast")
+            except Exception as be:
+                logger.debug(f"Frame broadcast error: {be}")
+
+        if packet['metrics']:
+            try:
+                loop = self._get_event_loop()
+                if loop and loop.is_running():
+                    asyncio.run_coroutine_threadsafe(
+                        self._broadcast_metrics(),
+                        loop
+                    )
+                else:
+                    logger.info(
+                        f"⚠️ Event loop issue: loop={loop}, running={loop.is_running() if loop else 'N/A'}")
+            except Exception as me:
+                logger.error(
+                    f"❌ Metrics broadcast error: {me}", exc_info=True)
+
+        return packet
+
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """Per-stage throughput and per-queue depth of the running pipeline"""
+        if self.pipeline is None:
+            return {}
+        return self.pipeline.get_stats()
+
     def _encode_frame(self, frame) -> str:
         """
         Encode frame to base64 JPEG with optimized compression.
@@ -398,9 +504,25 @@ class DetectionStreamingRunner:
                 'ambulance_stable': getattr(self.detector, 'ambulance_stable', False),
                 'ambulance_confidence': getattr(self.detector, 'ambulance_confidence', 0.0),
                 'mode': mode,
-                'video_source': getattr(self.detector, 'video_source', 'detection')
+                'video_source': getattr(self.detector, 'video_source', 'detection'),
+                'zones': self.detector.get_zone_counts() if hasattr(
+                    self.detector, 'get_zone_counts') else [],
+                'lines': self.detector.get_line_counts() if hasattr(
+                    self.detector, 'get_line_counts') else [],
+                'pipeline': self.get_pipeline_stats(),
+                'frame_copies': self.detector.get_copy_stats() if hasattr(
+                    self.detector, 'get_copy_stats') else {},
+                'ambulance_features': self.detector.get_feature_stats() if hasattr(
+                    self.detector, 'get_feature_stats') else {},
+                'ambulance_schedule': self.detector.get_ambulance_schedule_stats() if hasattr(
+                    self.detector, 'get_ambulance_schedule_stats') else {},
+                'tracker': self.detector.get_tracker_stats() if hasattr(
+                    self.detector, 'get_tracker_stats') else {}
             }
 
+            for callback in self.metrics_callbacks:
+                callback(dict(metrics))
+
             await self.streamer.broadcast_metrics(metrics)
 
         except Exception as e:
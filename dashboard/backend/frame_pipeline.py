@@ -0,0 +1,334 @@
+"""
+Staged Frame Pipeline
+Runs capture, inference, render/encode and writer stages on their own threads,
+connected by bounded queues, so decoding and encoding no longer stall inference.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Queue drop policies
+DROP_OLDEST = 'drop_oldest'   # Live sources: keep the newest frames
+BLOCK = 'block'               # Files: never drop, slow the producer down
+DROP_POLICIES = (DROP_OLDEST, BLOCK)
+
+LIVE_SOURCE_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+
+class _EndOfStream:
+    """Marker passed down the pipeline when the source is exhausted"""
+
+    def __repr__(self):
+        return 'END_OF_STREAM'
+
+
+END_OF_STREAM = _EndOfStream()
+
+
+def is_live_source(source: str) -> bool:
+    """Camera indices and network streams are live; everything else is a file"""
+    source = str(source)
+    return source.isdigit() or source.lower().startswith(LIVE_SOURCE_PREFIXES)
+
+
+def default_drop_policy(source: str) -> str:
+    """Drop the oldest frame for live sources, never drop for files"""
+    return DROP_OLDEST if is_live_source(source) else BLOCK
+
+
+class FrameQueue:
+    """
+    Bounded queue between two pipeline stages.
+
+    Features:
+    - DROP_OLDEST: a full queue discards its oldest item to make room
+    - BLOCK: a full queue makes the producer wait
+    - Depth, high-water mark and drop statistics
+    """
+
+    def __init__(self, name: str, maxsize: int = 4, drop_policy: str = BLOCK):
+        """
+        Initialize the queue.
+
+        Args:
+            name: Queue name (for statistics)
+            maxsize: Maximum number of queued items
+            drop_policy: DROP_OLDEST or BLOCK
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.drop_policy = drop_policy
+        self._items = deque()
+        self._condition = threading.Condition()
+
+        self.stats = {
+            'put': 0,
+            'dropped': 0,
+            'max_depth': 0
+        }
+
+    def put(self, item: Any, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Add an item.
+
+        END_OF_STREAM is never dropped.
+
+        Args:
+            item: Item to queue
+            stop_event: Stops waiting on a full BLOCK queue when set
+
+        Returns:
+            False if the pipeline was stopped before the item could be queued
+        """
+        with self._condition:
+            while len(self._items) >= self.maxsize:
+                if self.drop_policy == DROP_OLDEST and item is not END_OF_STREAM:
+                    self._items.popleft()
+                    self.stats['dropped'] += 1
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._condition.wait(timeout=0.1)
+
+            self._items.append(item)
+            self.stats['put'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self._items))
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: float = 0.1) -> Any:
+        """
+        Take the oldest item.
+
+        Returns:
+            The item, or None if the queue stayed empty for timeout seconds
+        """
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout=timeout)
+                if not self._items:
+                    return None
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and drop statistics"""
+        stats = dict(self.stats)
+        stats.update({
+            'depth': len(self._items),
+            'maxsize': self.maxsize,
+            'drop_policy': self.drop_policy
+        })
+        return stats
+
+
+class PipelineStage:
+    """
+    One pipeline stage running on its own thread.
+
+    A stage without an input queue is a source: its function is called
+    repeatedly with no arguments and returns END_OF_STREAM when exhausted.
+    Other stages call their function on every item from the input queue.
+    Returning None drops the item; anything else goes to the output queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        input_queue: Optional[FrameQueue] = None,
+        output_queue: Optional[FrameQueue] = None
+    ):
+        """
+        Initialize the stage.
+
+        Args:
+            name: Stage name (for logging and statistics)
+            func: Work function
+            input_queue: Queue to read from (None for a source stage)
+            output_queue: Queue to write results to (None for a sink stage)
+        """
+        self.name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.thread = None
+        self.error = None
+
+        self.stats = {
+            'processed': 0,
+            'errors': 0,
+            'busy_time': 0.0,
+            'start_time': None,
+            'end_time': None
+        }
+
+    def start(self, stop_event: threading.Event):
+        """Start the stage thread"""
+        self.stats['start_time'] = time.time()
+        self.thread = threading.Thread(
+            target=self._run, args=(stop_event,),
+            name=f"pipeline-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _run(self, stop_event: threading.Event):
+        """Stage loop"""
+        try:
+            while not stop_event.is_set():
+                if self.input_queue is None:
+                    item = None
+                else:
+                    item = self.input_queue.get()
+                    if item is None:
+                        continue
+                    if item is END_OF_STREAM:
+                        break
+
+                start = time.perf_counter()
+                result = self.func() if self.input_queue is None else self.func(item)
+                self.stats['busy_time'] += time.perf_counter() - start
+
+                if result is END_OF_STREAM:
+                    break
+                if result is None:
+                    continue
+
+                self.stats['processed'] += 1
+                if self.output_queue is not None:
+                    if not self.output_queue.put(result, stop_event):
+                        break
+
+        except Exception as e:
+            # A failing stage stops the whole pipeline
+            self.error = e
+            self.stats['errors'] += 1
+            logger.error(f"❌ Pipeline stage '{self.name}' failed: {e}", exc_info=True)
+            stop_event.set()
+
+        finally:
+            self.stats['end_time'] = time.time()
+            # Let the downstream stages drain and finish
+            if self.output_queue is not None:
+                self.output_queue.put(END_OF_STREAM, stop_event)
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and utilisation of this stage"""
+        start = self.stats['start_time']
+        end = self.stats['end_time'] or time.time()
+        elapsed = max(end - start, 1e-6) if start else 0.0
+        processed = self.stats['processed']
+
+        return {
+            'processed': processed,
+            'errors': self.stats['errors'],
+            'throughput_fps': processed / elapsed if elapsed else 0.0,
+            'avg_ms': self.stats['busy_time'] / processed * 1000 if processed else 0.0,
+            'busy_ratio': self.stats['busy_time'] / elapsed if elapsed else 0.0,
+            'input_depth': len(self.input_queue) if self.input_queue is not None else 0,
+            'running': self.is_alive()
+        }
+
+
+class FramePipeline:
+    """
+    Chain of stages connected by bounded queues.
+
+    Features:
+    - One thread per stage
+    - Configurable queue size and drop policy
+    - END_OF_STREAM propagates from the source and drains every stage
+    - Per-stage throughput and per-queue depth statistics
+    """
+
+    def __init__(self, maxsize: int = 4, drop_policy: str = BLOCK):
+        """
+        Initialize the pipeline.
+
+        Args:
+            maxsize: Size of every queue between stages
+            drop_policy: Policy of every queue (DROP_OLDEST or BLOCK)
+        """
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.stages: List[PipelineStage] = []
+        self.queues: List[FrameQueue] = []
+        self.stop_event = threading.Event()
+
+    def add_stage(self, name: str, func: Callable) -> PipelineStage:
+        """
+        Append a stage; every stage after the first reads the previous one's output.
+
+        Args:
+            name: Stage name
+            func: Work function (no arguments for the first, source stage)
+
+        Returns:
+            The new stage
+        """
+        input_queue = None
+        if self.stages:
+            input_queue = FrameQueue(
+                f"{self.stages[-1].name}->{name}", self.maxsize, self.drop_policy)
+            self.queues.append(input_queue)
+            self.stages[-1].output_queue = input_queue
+
+        stage = PipelineStage(name, func, input_queue=input_queue)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        """Start every stage, last stage first so consumers are ready"""
+        self.stop_event.clear()
+        for stage in reversed(self.stages):
+            stage.start(self.stop_event)
+        logger.info(
+            f"Frame pipeline started: {' -> '.join(s.name for s in self.stages)} "
+            f"(queue size {self.maxsize}, {self.drop_policy})")
+
+    def stop(self):
+        """Ask every stage to stop"""
+        self.stop_event.set()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for every stage thread"""
+        deadline = None if timeout is None else time.time() + timeout
+        for stage in self.stages:
+            if stage.thread is None:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            stage.thread.join(remaining)
+
+    def is_alive(self) -> bool:
+        """True while any stage is still running"""
+        return any(stage.is_alive() for stage in self.stages)
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """First stage error, if any"""
+        for stage in self.stages:
+            if stage.error is not None:
+                return stage.error
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistics of every stage and queue"""
+        return {
+            'stages': {stage.name: stage.get_stats() for stage in self.stages},
+            'queues': {queue.name: queue.get_stats() for queue in self.queues}
+        }
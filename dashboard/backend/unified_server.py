@@ -72,6 +72,10 @@ class UnifiedDashboardServer:
         self.api = DashboardAPI(self.streamer, self.stream_manager)
         self.detection_controller = DetectionController(
             self.streamer, self.stream_manager)
+        # Keep the REST metrics history in step with the WebSocket metrics
+        if self.detection_controller.detection_runner is not None:
+            self.detection_controller.detection_runner.metrics_callbacks.append(
+                self.api.add_metrics)
 
         # ============================================================
         # TRAFFIC SIGNAL SYSTEM COMPONENTS
@@ -436,6 +440,7 @@ Examples:
     print("     GET  /api/status              - System status")
     print("     GET  /api/metrics/current     - Current metrics")
     print("     GET  /api/metrics/history     - Historical metrics")
+    print("     GET  /api/metrics/zones       - Per-zone vehicle counts")
     print("\n  🚦 Signal Endpoints:")
     print("     GET  /api/signals/status      - Signal status")
     print("     POST /api/signals/ambulance   - Trigger ambulance")
@@ -9,11 +9,14 @@ from .video_config_manager import (
     load_video_config,
     list_configured_videos
 )
+from .detection_config import load_detection_config, get_detection_setting
 
 __all__ = [
     "get_video_config_path",
     "get_master_config_path",
     "has_video_config",
     "load_video_config",
-    "list_configured_videos"
+    "list_configured_videos",
+    "load_detection_config",
+    "get_detection_setting"
 ]
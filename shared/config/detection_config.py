@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Detection Configuration Loader
+
+Reads the `detection` section of config/detection_config.yaml.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Project root: shared/config/ -> two levels up
+PROJECT_ROOT = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DETECTION_CONFIG_PATH = os.path.join(
+    PROJECT_ROOT, "config", "detection_config.yaml")
+
+_config_cache: Dict[str, Dict[str, Any]] = {}
+
+
+def load_detection_config(config_path: Optional[str] = None, reload: bool = False) -> Dict[str, Any]:
+    """
+    Load the detection configuration.
+
+    Args:
+        config_path: Path to the YAML file (defaults to config/detection_config.yaml)
+        reload: Re-read the file even if it was loaded before
+
+    Returns:
+        The `detection` section as a dictionary, or an empty dictionary if the
+        file is missing, unreadable, or PyYAML is not installed
+    """
+    config_path = os.path.abspath(config_path or DEFAULT_DETECTION_CONFIG_PATH)
+
+    if not reload and config_path in _config_cache:
+        return _config_cache[config_path]
+
+    config: Dict[str, Any] = {}
+    if yaml is None:
+        print("⚠️ PyYAML not installed, using default detection settings")
+    elif os.path.exists(config_path):
+        try:
+            with open(config_path, 'r') as f:
+                data = yaml.safe_load(f) or {}
+            config = data.get('detection', {}) or {}
+        except Exception as e:
+            print(f"⚠️ Error reading detection config {config_path}: {e}")
+    else:
+        print(f"⚠️ Detection config not found at {config_path}, using defaults")
+
+    _config_cache[config_path] = config
+    return config
+
+
+def get_detection_setting(section: str, default: Any = None,
+                          config_path: Optional[str] = None) -> Any:
+    """
+    Get one top-level entry of the detection configuration.
+
+    Args:
+        section: Key inside the `detection` section (e.g. "onnxruntime")
+        default: Value returned when the key is missing
+        config_path: Optional path to the YAML file
+
+    Returns:
+        The configured value or default
+    """
+    return load_detection_config(config_path).get(section, default)
@@ -0,0 +1,107 @@
+"""
+Unit tests for core.trackers.counting
+"""
+import numpy as np
+
+from core.trackers.counting import CountingEngine, parse_count_lines, segment_crossings
+from core.trackers.track_store import TrackStore, FLAG_CROSSED
+
+
+def _store_with_track(points, track_id=0):
+    """Store holding one track that moved through points"""
+    store = TrackStore(capacity=2)
+    x, y = points[0]
+    store.add(track_id, [x - 5, y - 5, x + 5, y + 5], 'vehicle', 0.9, 0)
+    slot = store.slot(track_id)
+    for x, y in points[1:]:
+        store.boxes[slot] = [x - 5, y - 5, x + 5, y + 5]
+        store.push_trajectory(np.array([slot]), np.array([[x, y]], dtype=np.float64))
+    return store
+
+
+def _zone(name, direction='down', min_movement=None):
+    return {'name': name, 'points': None, 'direction': direction, 'min_movement': min_movement}
+
+
+def test_horizontal_line_matches_original_check():
+    rng = np.random.default_rng(0)
+    line_y = 300.0
+    prev = rng.uniform(0, 600, (2000, 2))
+    curr = prev + rng.normal(0, 40, (2000, 2))
+    # Points exactly on the line
+    prev[::50, 1] = line_y
+    curr[::70, 1] = line_y
+
+    crossed = segment_crossings(prev, curr, np.array([[0.0, line_y]]), np.array([[600.0, line_y]]),
+                                np.array([True]), np.array([True]))[:, 0]
+
+    y_prev, y_curr = prev[:, 1], curr[:, 1]
+    expected = ((y_prev > line_y) & (line_y >= y_curr)) | ((y_prev <= line_y) & (line_y < y_curr))
+    np.testing.assert_array_equal(crossed, expected)
+
+
+def test_line_segment_bounds_and_direction():
+    starts = np.array([[100.0, 0.0]])
+    ends = np.array([[100.0, 100.0]])
+    prev = np.array([[90.0, 50.0], [90.0, 150.0]])
+    curr = np.array([[110.0, 50.0], [110.0, 150.0]])
+
+    # The second movement passes below the end of the segment
+    assert segment_crossings(prev, curr, starts, ends)[:, 0].tolist() == [True, False]
+
+    lines = [{'name': 'right', 'start': starts[0], 'end': ends[0], 'direction': 'right'}]
+    store = _store_with_track([(110, 50), (90, 50)])
+    engine = CountingEngine(store, lines=lines)
+    ids, _ = engine.count_line_crossings()
+    assert len(ids) == 0
+
+
+def test_track_counts_once_per_line():
+    store = _store_with_track([(50, 100), (50, 400)])
+    lines = parse_count_lines([
+        {'name': 'a', 'start': [0.0, 0.5], 'end': [1.0, 0.5]},
+        {'name': 'b', 'start': [0.0, 0.6], 'end': [1.0, 0.6]},
+    ], (480, 640))
+    engine = CountingEngine(store, lines=lines)
+
+    ids, line_indices = engine.count_line_crossings()
+    assert ids.tolist() == [0, 0]
+    assert line_indices.tolist() == [0, 1]
+    assert store.flags[store.slot(0)] & FLAG_CROSSED
+
+    # Same segment again: already counted on both lines
+    ids, _ = engine.count_line_crossings()
+    assert len(ids) == 0
+    assert [line['count'] for line in engine.get_line_counts()] == [1, 1]
+
+
+def test_zone_counts_after_min_frames_and_movement():
+    store = _store_with_track([(50, 0)])
+    engine = CountingEngine(store, zones=[_zone('lane')], min_movement=50, min_frames=5)
+    slot = store.slot(0)
+    counted_on = []
+    for frame in range(10):
+        y = 20.0 * frame
+        store.boxes[slot] = [45, y - 5, 55, y + 5]
+        ids, _ = engine.count_zones(np.array([1]), np.array([slot]))
+        if len(ids):
+            counted_on.append(frame)
+
+    # Movement reaches 50 px at frame 3, frames_in_zone reaches 5 at frame 4
+    assert counted_on == [4]
+    assert engine.get_zone_counts()[0]['count'] == 1
+
+
+def test_zone_state_is_dropped_with_the_track():
+    store = _store_with_track([(50, 0)])
+    engine = CountingEngine(store, zones=[_zone('lane')], min_frames=1, min_movement=0)
+    slot = store.slot(0)
+    ids, _ = engine.count_zones(np.array([1]), np.array([slot]))
+    assert ids.tolist() == [0]
+
+    store.remove(0)
+    store.add(1, [45, -5, 55, 5], 'vehicle', 0.9, 1)
+    assert store.slot(1) == slot
+    assert store.zone_counted[slot] == 0 and store.zone_label[slot] == 0
+    ids, _ = engine.count_zones(np.array([1]), np.array([slot]))
+    assert ids.tolist() == [1]
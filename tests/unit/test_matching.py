@@ -0,0 +1,108 @@
+"""
+Unit tests for the assignment solvers in core.trackers.matching
+"""
+import numpy as np
+import pytest
+
+from core.trackers.matching import (assign, greedy_assignment, hungarian_assignment,
+                                    linear_sum_assignment)
+
+requires_scipy = pytest.mark.skipif(linear_sum_assignment is None, reason='needs scipy')
+SOLVERS = ['greedy', pytest.param('hungarian', marks=requires_scipy)]
+
+
+def _sequential_greedy(cost):
+    """Reference greedy: pairs one by one by (cost, row, column), skipping used ones"""
+    rows, cols = np.nonzero(np.isfinite(cost))
+    order = np.lexsort((cols, rows, cost[rows, cols]))
+    used_rows, used_cols, matches = set(), set(), set()
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            matches.add((r, c))
+    return matches
+
+
+def _pairs(rows, cols):
+    return set(zip(rows.tolist(), cols.tolist()))
+
+
+def test_greedy_matches_sequential_greedy_with_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        shape = rng.integers(1, 9, 2)
+        # Few distinct values, so most rows and columns have tied minima
+        cost = rng.integers(0, 4, shape).astype(np.float64)
+        cost[rng.uniform(0, 1, shape) < 0.3] = np.inf
+
+        assert _pairs(*greedy_assignment(cost)) == _sequential_greedy(cost)
+
+
+def test_greedy_is_independent_of_row_order():
+    rng = np.random.default_rng(1)
+    cost = rng.uniform(0, 1, (30, 25))
+    cost[cost > 0.6] = np.inf
+    order = rng.permutation(30)
+
+    rows, cols = greedy_assignment(cost[order])
+    assert _pairs(order[rows], cols) == _pairs(*greedy_assignment(cost))
+
+
+def test_greedy_never_matches_gated_pairs():
+    inf = np.inf
+    cost = np.array([[0.5, inf, inf],
+                     [0.1, inf, inf],
+                     [inf, inf, inf]])
+
+    rows, cols = greedy_assignment(cost)
+    # Row 0 loses column 0 and has no finite pair left
+    assert _pairs(rows, cols) == {(1, 0)}
+
+    rows, cols = greedy_assignment(np.full((2, 2), inf))
+    assert len(rows) == 0 and len(cols) == 0
+
+
+@requires_scipy
+def test_hungarian_minimizes_total_cost_over_feasible_pairs():
+    inf = np.inf
+    # Greedy takes (0, 0) and leaves row 1 unmatched; two matches are better
+    cost = np.array([[1.0, 2.0],
+                     [3.0, inf]])
+
+    assert _pairs(*greedy_assignment(cost)) == {(0, 0)}
+    assert _pairs(*hungarian_assignment(cost)) == {(0, 1), (1, 0)}
+
+
+@requires_scipy
+def test_hungarian_drops_gated_pairs():
+    inf = np.inf
+    cost = np.array([[1.0, inf],
+                     [2.0, inf],
+                     [inf, inf]])
+
+    assert _pairs(*hungarian_assignment(cost)) == {(0, 0)}
+    rows, cols = hungarian_assignment(np.full((3, 2), inf))
+    assert len(rows) == 0 and len(cols) == 0
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+@pytest.mark.parametrize('shape', [(0, 0), (0, 3), (4, 0)])
+def test_assign_with_no_rows_or_columns(solver, shape):
+    matches, unmatched_rows, unmatched_cols = assign(np.empty(shape), solver)
+
+    assert matches.shape == (0, 2)
+    assert unmatched_rows.tolist() == list(range(shape[0]))
+    assert unmatched_cols.tolist() == list(range(shape[1]))
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_assign_reports_unmatched_rows_and_columns(solver):
+    inf = np.inf
+    cost = np.array([[inf, 0.2, inf],
+                     [inf, inf, inf]])
+
+    matches, unmatched_rows, unmatched_cols = assign(cost, solver)
+    assert matches.tolist() == [[0, 1]]
+    assert unmatched_rows.tolist() == [1]
+    assert unmatched_cols.tolist() == [0, 2]
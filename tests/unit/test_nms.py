@@ -0,0 +1,25 @@
+"""
+Unit tests for core.detectors.nms
+"""
+import numpy as np
+
+from core.detectors.nms import nms_numpy, offset_boxes_by_class
+
+
+def test_class_offset_separates_negative_boxes():
+    # Unclipped boxes: NMS runs before clipping to the frame
+    boxes = np.array([[-50, -50, 10, 10], [-60, -60, 0, 0]], dtype=np.float32)
+    class_ids = np.array([0, 1])
+
+    shifted = offset_boxes_by_class(boxes, class_ids)
+
+    assert shifted[1, 0] > shifted[0, 2]
+    assert sorted(nms_numpy(boxes, np.array([0.9, 0.8]), 0.1, class_ids).tolist()) == [0, 1]
+
+
+def test_same_class_still_suppressed():
+    boxes = np.array([[-50, -50, 10, 10], [-48, -48, 12, 12]], dtype=np.float32)
+
+    keep = nms_numpy(boxes, np.array([0.9, 0.8]), 0.5, np.array([1, 1]))
+
+    assert keep.tolist() == [0]
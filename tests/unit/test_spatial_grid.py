@@ -0,0 +1,66 @@
+"""
+Unit tests for core.trackers.spatial_grid and the grid path of MatchingEngine
+"""
+import numpy as np
+import pytest
+
+from core.trackers.matching import MatchingEngine, linear_sum_assignment, synthetic_tracking_scene
+from core.trackers.spatial_grid import neighbour_pairs
+
+requires_scipy = pytest.mark.skipif(linear_sum_assignment is None, reason='needs scipy')
+
+
+def _match_both_paths(solver, iou_weight, seed, num_tracks=300):
+    """Matches of the dense and the grid path on one synthetic scene"""
+    track_boxes, det_boxes = synthetic_tracking_scene(num_tracks, motion=30.0, seed=seed)
+    dense = MatchingEngine(100, solver, iou_weight, grid_min_tracks=None)
+    sparse = MatchingEngine(100, solver, iou_weight, grid_min_tracks=1)
+    cost = dense.cost(track_boxes, det_boxes)
+    return cost, dense(track_boxes, det_boxes), sparse(track_boxes, det_boxes)
+
+
+def test_neighbour_pairs_include_every_pair_within_cell_size():
+    rng = np.random.default_rng(0)
+    cell_size = 50.0
+    for _ in range(20):
+        # Negative coordinates and points exactly on cell borders included
+        tracks = rng.uniform(-300, 300, (60, 2))
+        dets = rng.uniform(-300, 300, (70, 2))
+        dets[:10] = np.round(dets[:10] / cell_size) * cell_size
+
+        rows, cols = neighbour_pairs(tracks, dets, cell_size)
+        pairs = set(zip(rows.tolist(), cols.tolist()))
+        distances = np.linalg.norm(tracks[:, None] - dets[None], axis=2)
+        close = set(zip(*(i.tolist() for i in np.nonzero(distances < cell_size))))
+
+        assert close <= pairs
+        assert len(pairs) == len(rows)  # no duplicates
+
+
+def test_neighbour_pairs_with_no_points():
+    rows, cols = neighbour_pairs(np.empty((0, 2)), np.ones((3, 2)), 10.0)
+    assert len(rows) == 0 and len(cols) == 0
+
+
+@pytest.mark.parametrize('iou_weight', [0.0, 0.3])
+@pytest.mark.parametrize('seed', range(5))
+def test_grid_greedy_matches_dense_greedy(iou_weight, seed):
+    _, (dense, dense_tracks, dense_dets), (sparse, sparse_tracks, sparse_dets) = \
+        _match_both_paths('greedy', iou_weight, seed)
+
+    assert set(map(tuple, dense.tolist())) == set(map(tuple, sparse.tolist()))
+    np.testing.assert_array_equal(dense_tracks, sparse_tracks)
+    np.testing.assert_array_equal(dense_dets, sparse_dets)
+
+
+@requires_scipy
+@pytest.mark.parametrize('iou_weight', [0.0, 0.3])
+@pytest.mark.parametrize('seed', range(5))
+def test_grid_hungarian_matches_dense_total_cost(iou_weight, seed):
+    cost, (dense, _, _), (sparse, _, _) = _match_both_paths('hungarian', iou_weight, seed)
+
+    # Equal-cost optima may pair differently; size and total cost may not differ
+    assert len(dense) == len(sparse)
+    assert np.isfinite(cost[sparse[:, 0], sparse[:, 1]]).all()
+    assert cost[sparse[:, 0], sparse[:, 1]].sum() == pytest.approx(
+        cost[dense[:, 0], dense[:, 1]].sum())
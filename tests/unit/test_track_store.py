@@ -0,0 +1,85 @@
+"""
+Unit tests for core.trackers.track_store
+"""
+import numpy as np
+
+from core.detectors.detections import Detections
+from core.trackers.centroid import ONNXVehicleTracker
+from core.trackers.track_store import TrackStore, FLAG_COUNTED, FLAG_CROSSED
+
+
+def _push(store, slot, points):
+    for point in points:
+        store.push_trajectory(np.array([slot]), np.array([point], dtype=np.float64))
+
+
+def test_remove_resets_every_field_including_added_ones():
+    store = TrackStore(capacity=2, trajectory_length=4)
+    store.add_field('extra', (3,), fill=np.nan)
+    store.add_field('code', dtype=np.int8, fill=7)
+    slot = store.add(5, [0, 0, 10, 10], 'ambulance', 0.9, 3)
+    _push(store, slot, [[1, 1], [2, 2], [3, 3], [4, 4], [5, 5]])
+    store.extra[slot] = [1, 2, 3]
+    store.code[slot] = 1
+    store.flags[slot] = FLAG_COUNTED | FLAG_CROSSED
+    store.velocities[slot] = [4, 2]
+    store.ages[slot] = 12
+    store.disappeared[slot] = 3
+
+    assert store.remove(5)
+    assert not store.remove(5)
+    for name, (_, _, fill) in store._fields.items():
+        np.testing.assert_array_equal(getattr(store, name)[slot],
+                                      np.full_like(getattr(store, name)[slot], fill),
+                                      err_msg=name)
+
+    # The recycled slot starts from scratch
+    assert store.add(6, [20, 20, 30, 30], 'vehicle', 0.5, 4) == slot
+    np.testing.assert_array_equal(store.trajectory(slot), [[25, 25]])
+    assert store.flags[slot] == 0 and store.code[slot] == 7
+    assert np.isnan(store.extra[slot]).all()
+    assert 5 not in store and store.ids() == [6]
+
+
+def test_trajectory_ring_order_after_wraparound():
+    store = TrackStore(capacity=2, trajectory_length=4)
+    long_slot = store.add(0, [-5, -5, 5, 5], 'vehicle', 0.9, 0)
+    _push(store, long_slot, [[i, 10 * i] for i in range(1, 10)])
+    short_slot = store.add(1, [95, 95, 105, 105], 'vehicle', 0.9, 0)
+    _push(store, short_slot, [[101, 101]])
+
+    expected = [[i, 10 * i] for i in range(6, 10)]
+    np.testing.assert_array_equal(store.trajectory(long_slot), expected)
+    np.testing.assert_array_equal(store.trajectory(short_slot), [[100, 100], [101, 101]])
+
+    slots = np.array([long_slot, short_slot])
+    recent = store.recent_points(slots, 3)
+    np.testing.assert_array_equal(recent[0], expected[1:])
+    np.testing.assert_array_equal(recent[1], [[np.nan, np.nan], [100, 100], [101, 101]])
+    # More points than the ring holds: padded at the front
+    np.testing.assert_array_equal(store.recent_points(slots[:1], 6)[0],
+                                  [[np.nan, np.nan]] * 2 + expected)
+
+    np.testing.assert_array_equal(store.first_points(slots), [[6, 60], [100, 100]])
+
+
+def test_store_stays_bounded_under_track_churn():
+    tracker = ONNXVehicleTracker(max_disappeared=5, capacity=32)
+    rng = np.random.default_rng(0)
+    # 20 lanes; each vehicle crosses the frame in 40 frames, then a new one enters
+    lanes = np.arange(20) * 60.0 + 30
+    starts = -rng.integers(0, 40, len(lanes))
+
+    stats = []
+    for frame in range(3000):
+        y = ((frame - starts) % 40) * 25.0
+        boxes = np.column_stack([lanes - 15, y - 15, lanes + 15, y + 15])
+        tracker.update(Detections(boxes, np.full(len(lanes), 0.9), np.full(len(lanes), 2)))
+        if frame in (500, 2999):
+            stats.append(tracker.get_store_stats())
+
+    # Every wraparound jumps beyond max_distance and starts a new ID
+    assert tracker.next_id > 1000
+    assert stats[0]['capacity'] == stats[1]['capacity'] == 32
+    assert stats[0]['nbytes'] == stats[1]['nbytes']
+    assert len(tracker.store._slots) + len(tracker.store._free) == tracker.store.capacity
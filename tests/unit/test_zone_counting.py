@@ -0,0 +1,100 @@
+"""
+Unit tests for zone counting: core.detectors.zone_counter and
+CountingEngine.count_zones()
+"""
+import numpy as np
+
+from core.detectors.zone_counter import parse_zones
+from core.trackers.counting import CountingEngine
+from core.trackers.track_store import TrackStore
+
+SQUARE = [[0, 0], [100, 0], [100, 100], [0, 100]]
+
+
+class _Track:
+    """One track moving through a store, counted with count_zones()"""
+
+    def __init__(self, zones, **engine_args):
+        self.store = TrackStore(capacity=2)
+        self.engine = CountingEngine(self.store, zones=zones, **engine_args)
+        self.slot = None
+
+    def step(self, x, y, label, active=True):
+        box = [x - 5, y - 5, x + 5, y + 5]
+        if self.slot is None:
+            self.slot = self.store.add(0, box, 'vehicle', 0.9, 0)
+        else:
+            self.store.boxes[self.slot] = box
+            self.store.push_trajectory(np.array([self.slot]), np.array([[x, y]], dtype=np.float64))
+        ids, zones = self.engine.count_zones(np.array([label]), np.array([self.slot]),
+                                             np.array([active]))
+        return list(zip(ids.tolist(), zones.tolist()))
+
+
+def test_parse_zones_marks_plain_lane_config():
+    plain = parse_zones({'lane_points': SQUARE})
+    named = parse_zones({'zones': [{'name': 'a', 'points': SQUARE}]})
+
+    assert [zone['name'] for zone in plain] == ['lane']
+    assert plain[0]['track_start'] and plain[0]['direction'] == 'down'
+    assert not named[0]['track_start']
+
+
+def test_plain_lane_config_counts_from_first_trajectory_point():
+    track = _Track(parse_zones({'lane_points': SQUARE}))
+    # Outside the raster and not seen this frame: the original rule tests neither
+    results = [track.step(50, y, label=0, active=False) for y in (0, 15, 30, 45, 60)]
+
+    assert results == [[], [], [], [], [(0, 0)]]
+    np.testing.assert_array_equal(track.store.track_entry[track.slot], [50, 0])
+    # Counted once
+    assert track.step(50, 200, label=0) == []
+
+
+def test_plain_lane_config_needs_min_frames_points():
+    track = _Track(parse_zones({'lane_points': SQUARE}))
+    results = [track.step(50, y, label=1) for y in (0, 100, 200, 300)]
+
+    # Far enough after two points, but only counted with five
+    assert results == [[], [], [], []]
+    assert track.step(50, 400, label=1) == [(0, 0)]
+
+
+def test_named_zone_requires_membership():
+    track = _Track(parse_zones({'zones': [{'name': 'a', 'points': SQUARE}]}))
+    results = [track.step(50, 60 * i, label=0) for i in range(8)]
+
+    assert all(result == [] for result in results)
+    assert track.engine.zone_counts.tolist() == [0]
+
+
+def test_named_zone_measures_from_zone_entry():
+    zones = parse_zones({'zones': [{'name': 'a', 'points': SQUARE},
+                                   {'name': 'b', 'points': SQUARE}]})
+    track = _Track(zones, min_frames=1)
+    # 40 px down through zone a, then into zone b
+    assert [track.step(50, y, label=1) for y in (0, 20, 40)] == [[], [], []]
+    assert track.step(50, 60, label=2) == []
+
+    np.testing.assert_array_equal(track.store.zone_entry[track.slot], [50, 60])
+    assert track.step(50, 100, label=2) == []
+    assert track.step(50, 110, label=2) == [(0, 1)]
+
+
+def test_named_zone_counts_frames_in_zone_not_trajectory_length():
+    track = _Track(parse_zones({'zones': [{'name': 'a', 'points': SQUARE}]}))
+    # Long trajectory before entering the zone
+    for y in range(0, 100, 10):
+        track.step(50, y, label=0)
+
+    results = [track.step(50, 100 + 30 * i, label=1) for i in range(5)]
+    assert results == [[], [], [], [], [(0, 0)]]
+
+
+def test_named_zone_keeps_state_while_track_is_not_seen():
+    track = _Track(parse_zones({'zones': [{'name': 'a', 'points': SQUARE}]}))
+    track.step(50, 0, label=1)
+    for _ in range(10):
+        track.step(50, 100, label=1, active=False)
+
+    assert track.store.zone_frames[track.slot] == 1